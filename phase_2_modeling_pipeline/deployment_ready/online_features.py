@@ -0,0 +1,172 @@
+# phase_2_modeling_pipeline/deployment_ready/online_features.py
+
+"""
+online_features.py
+-------------------
+Stateful online feature service for the deployed XGBoost model.
+
+Keeps a 24-slot ring buffer of hourly readings per meter, so callers only send
+raw readings (timestamp, energy, temperature) instead of precomputed lag and
+rolling features. Time and cyclical features are derived from the timestamp,
+and `lag_1h`, `lag_24h` and `roll_mean_24h` are read from the buffer in O(1).
+
+Note: in `02_feature_engineering.py` the 24h rolling mean includes the row's own
+energy value, which is unknown when forecasting. Online, `roll_mean_24h` is the
+mean of the 24 most recent observed readings.
+
+Readings must arrive hourly and without gaps, since the lags are read by slot
+position. A missing hour is rejected unless the service is created with
+`gap_fill` (ffill | interpolate | zero, as in `02_feature_engineering.py`), in
+which case the skipped hours are written explicitly before the new reading.
+Predictions are only served for the hour right after the last reading.
+
+Author: Mantas Valantinavicius
+"""
+
+import numpy as np
+import pandas as pd
+
+from predict_from_input import get_predictor
+
+WINDOW = 24
+STEP = pd.Timedelta(hours=1)
+GAP_FILL_METHODS = ("none", "ffill", "interpolate", "zero")
+
+
+class MeterState:
+    """Ring buffer of the last 24 hourly readings of one meter, with a running sum."""
+
+    def __init__(self):
+        self.buffer = np.zeros(WINDOW)
+        self.pos = 0            # next slot to write == slot of the oldest reading once full
+        self.count = 0
+        self.total = 0.0
+        self.last_timestamp = None
+
+    def push(self, timestamp, energy_kWh: float, gap_fill="none"):
+        """Append the reading for `timestamp`, which must be the hour after the last one."""
+        timestamp = pd.Timestamp(timestamp)
+        if self.last_timestamp is not None:
+            missing = self.missing_hours(timestamp)
+            if missing:
+                if gap_fill not in GAP_FILL_METHODS:
+                    raise ValueError(f"❌ Unknown gap_fill '{gap_fill}'. Use one of {list(GAP_FILL_METHODS)}.")
+                if gap_fill == "none":
+                    raise ValueError(f"❌ Gap in readings: {timestamp} follows {self.last_timestamp} "
+                                     f"({missing} missing hour(s)); pass gap_fill to fill them")
+                self._fill(missing, energy_kWh, gap_fill)
+        self._write(energy_kWh)
+        self.last_timestamp = timestamp
+
+    def missing_hours(self, timestamp) -> int:
+        """Number of hours skipped between the last reading and `timestamp` (0 if contiguous)."""
+        delta = pd.Timestamp(timestamp) - self.last_timestamp
+        if delta <= pd.Timedelta(0):
+            raise ValueError(f"❌ Out-of-order reading: {timestamp} is not after {self.last_timestamp}")
+        if delta % STEP:
+            raise ValueError(f"❌ Reading at {timestamp} is not on the hourly grid of {self.last_timestamp}")
+        return delta // STEP - 1
+
+    def _fill(self, missing: int, next_energy: float, method: str):
+        last = self.lag_1h()
+        for i in range(1, missing + 1):
+            if method == "ffill":
+                self._write(last)
+            elif method == "zero":
+                self._write(0.0)
+            else:
+                self._write(last + (next_energy - last) * i / (missing + 1))
+
+    def _write(self, energy_kWh: float):
+        self.total += energy_kWh - self.buffer[self.pos]
+        self.buffer[self.pos] = energy_kWh
+        self.pos = (self.pos + 1) % WINDOW
+        self.count = min(self.count + 1, WINDOW)
+
+    @property
+    def ready(self) -> bool:
+        return self.count == WINDOW
+
+    def lag_1h(self) -> float:
+        return self.buffer[self.pos - 1]
+
+    def lag_24h(self) -> float:
+        return self.buffer[self.pos]
+
+    def roll_mean_24h(self) -> float:
+        return self.total / WINDOW
+
+
+def time_features(timestamp) -> dict:
+    """Calendar and cyclical features, identical to `02_feature_engineering.add_time_features`."""
+    ts = pd.Timestamp(timestamp)
+    hour, dow = ts.hour, ts.dayofweek
+    return {
+        "hour": hour,
+        "day_of_week": dow,
+        "month": ts.month,
+        "is_weekend": int(dow >= 5),
+        "hour_sin": np.sin(2 * np.pi * hour / 24),
+        "hour_cos": np.cos(2 * np.pi * hour / 24),
+        "dow_sin": np.sin(2 * np.pi * dow / 7),
+        "dow_cos": np.cos(2 * np.pi * dow / 7),
+    }
+
+
+class OnlineFeatureService:
+    """
+    Per-meter online feature state in front of the XGBoost model.
+
+    Usage:
+        service = OnlineFeatureService()
+        service.warm_start("meter-1", history_df)           # or 24 x observe()
+        service.predict("meter-1", "2024-06-02 10:00", 23.5)
+        service.observe("meter-1", "2024-06-02 10:00", 0.81)
+    """
+
+    def __init__(self, predictor=None, gap_fill="none"):
+        if gap_fill not in GAP_FILL_METHODS:
+            raise ValueError(f"❌ Unknown gap_fill '{gap_fill}'. Use one of {list(GAP_FILL_METHODS)}.")
+        self.gap_fill = gap_fill
+        self.predictor = predictor or get_predictor()
+        self.features = self.predictor.features
+        self.meters = {}
+
+    def state(self, meter_id) -> MeterState:
+        if meter_id not in self.meters:
+            self.meters[meter_id] = MeterState()
+        return self.meters[meter_id]
+
+    def observe(self, meter_id, timestamp, energy_kWh: float):
+        """Record an actual hourly reading for a meter."""
+        self.state(meter_id).push(timestamp, float(energy_kWh), gap_fill=self.gap_fill)
+
+    def warm_start(self, meter_id, history: pd.DataFrame):
+        """Seed a meter's buffer from its most recent 24 hours of history (`timestamp`, `energy_kWh` columns)."""
+        history = history.assign(timestamp=pd.to_datetime(history["timestamp"])).sort_values("timestamp")
+        history = history[history["timestamp"] > history["timestamp"].max() - WINDOW * STEP]
+        for ts, energy in zip(history["timestamp"], history["energy_kWh"]):
+            self.observe(meter_id, ts, energy)
+
+    def features_for(self, meter_id, timestamp, temperature_C: float) -> np.ndarray:
+        """Build the model input row for `timestamp` from the meter's buffer."""
+        state = self.meters.get(meter_id)
+        if state is None or not state.ready:
+            seen = 0 if state is None else state.count
+            raise ValueError(f"❌ Meter '{meter_id}' needs {WINDOW} readings before predicting (has {seen}).")
+
+        expected = state.last_timestamp + STEP
+        if pd.Timestamp(timestamp) != expected:
+            raise ValueError(f"❌ Meter '{meter_id}' can only predict {expected} (the hour after its last "
+                             f"reading), not {timestamp}; observe the readings in between first.")
+
+        row = time_features(timestamp)
+        row["temperature_C"] = temperature_C
+        row["lag_1h"] = state.lag_1h()
+        row["lag_24h"] = state.lag_24h()
+        row["roll_mean_24h"] = state.roll_mean_24h()
+        return np.array([[row[f] for f in self.features]], dtype=float)
+
+    def predict(self, meter_id, timestamp, temperature_C: float) -> float:
+        """Predict energy use (kWh) for a meter at `timestamp`."""
+        return float(self.predictor.predict_array(self.features_for(meter_id, timestamp, temperature_C))[0])
@@ -5,12 +5,18 @@ predict_from_input.py
 ----------------------
 Loads the trained XGBoost model and performs predictions on new input data.
 
+`XGBoostPredictor` loads the model and feature list once, validates the schema
+once and predicts directly on NumPy arrays. `get_predictor()` returns a shared,
+warm instance that the module-level helpers reuse across calls.
+
 Author: Mantas Valantinavicius
 """
 
 import pandas as pd
+import numpy as np
 import xgboost as xgb
 import json
+from functools import lru_cache
 from pathlib import Path
 
 # === CONFIG ===
@@ -27,16 +33,91 @@ def load_model_and_features():
 
     return model, features
 
+
+class XGBoostPredictor:
+    """
+    Long-lived predictor: parses the model and feature list once and keeps the
+    booster warm for repeated batch predictions.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, features_path=FEATURES_PATH):
+        self.model = xgb.XGBRegressor()
+        self.model.load_model(model_path)
+        self.booster = self.model.get_booster()
+
+        with open(features_path, "r") as f:
+            self.features = json.load(f)
+        self.feature_index = {name: i for i, name in enumerate(self.features)}
+        self._column_orders = {}
+
+        self._validate_schema()
+
+    def _validate_schema(self):
+        if self.booster.num_features() != len(self.features):
+            raise ValueError(
+                f"❌ Model expects {self.booster.num_features()} features, "
+                f"feature_columns.json lists {len(self.features)}"
+            )
+        if self.booster.feature_names and list(self.booster.feature_names) != self.features:
+            raise ValueError("❌ feature_columns.json does not match the feature names stored in the model")
+
+    def _column_order(self, columns) -> np.ndarray:
+        """Cached positions of the model features within `columns`."""
+        key = tuple(columns)
+        if key not in self._column_orders:
+            missing = [f for f in self.features if f not in key]
+            if missing:
+                raise ValueError(f"❌ Missing features in input data: {missing}")
+            position = {name: i for i, name in enumerate(key)}
+            self._column_orders[key] = np.array([position[f] for f in self.features])
+        return self._column_orders[key]
+
+    def predict_array(self, X, columns=None) -> np.ndarray:
+        """
+        Predict on a 2D array.
+
+        Parameters:
+            X: Array of shape (n_rows, n_columns)
+            columns (list, optional): Column names of `X` when they are not in
+                `self.features` order; the reordering is cached per column layout
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if columns is not None and list(columns) != self.features:
+            X = X[:, self._column_order(columns)]
+        if X.shape[1] != len(self.features):
+            raise ValueError(f"❌ Expected {len(self.features)} feature columns, got {X.shape[1]}")
+        return self.booster.inplace_predict(X)
+
+    def predict_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Predict on a DataFrame containing (at least) the feature columns."""
+        X = df.iloc[:, self._column_order(df.columns)].to_numpy(dtype=np.float32)
+        return self.predict_array(X)
+
+    def predict_records(self, records: list[dict]) -> np.ndarray:
+        """Predict on a list of feature dicts without building a DataFrame."""
+        try:
+            X = np.array([[rec[f] for f in self.features] for rec in records], dtype=np.float32)
+        except KeyError as e:
+            raise ValueError(f"❌ Missing features in input data: {e}")
+        return self.predict_array(X)
+
+
+@lru_cache(maxsize=None)
+def get_predictor(model_path=MODEL_PATH, features_path=FEATURES_PATH) -> XGBoostPredictor:
+    """Return a shared predictor, loading the model on first use only."""
+    return XGBoostPredictor(model_path, features_path)
+
+
 def predict_from_csv(csv_path):
-    model, features = load_model_and_features()
+    predictor = get_predictor()
 
     df = pd.read_csv(csv_path)
-    if not all(f in df.columns for f in features):
+    if not all(f in df.columns for f in predictor.features):
         raise ValueError("❌ Input CSV must contain all required features!")
 
-    df_input = df[features]
-    predictions = model.predict(df_input)
-    df["prediction_kWh"] = predictions
+    df["prediction_kWh"] = predictor.predict_frame(df[predictor.features])
 
     return df
 
@@ -45,14 +126,11 @@ def predict_from_dict_list(data: list[dict]) -> pd.DataFrame:
     Accepts a list of dictionaries as input and returns a DataFrame with predictions.
     Each dict must contain all required feature keys.
     """
-    model, features = load_model_and_features()
+    predictor = get_predictor()
 
+    predictions = predictor.predict_records(data)
     df = pd.DataFrame(data)
-    if not all(f in df.columns for f in features):
-        raise ValueError("❌ Missing features in input data")
-
-    df_input = df[features]
-    df["prediction_kWh"] = model.predict(df_input)
+    df["prediction_kWh"] = predictions
 
     return df
 
@@ -0,0 +1,207 @@
+# phase_2_modeling_pipeline/deployment_ready/serve.py
+
+"""
+serve.py
+---------
+Local HTTP inference server around the XGBoost bundle.
+
+Requests are handled asynchronously; every row is queued and a background task
+coalesces concurrent rows into micro-batches (up to `--max-batch-size` rows or
+`--max-wait-ms` after the first queued row) before a single `predict` call.
+Built on the standard library only (asyncio streams), no web framework needed.
+
+Endpoints:
+    GET  /health    -> {"status": "ok", "features": [...]}
+    POST /predict   -> body: one feature dict, or {"instances": [dict, ...]}
+                       reply: {"predictions": [kWh, ...]}
+
+Usage:
+    python serve.py --port 8080 --max-batch-size 64 --max-wait-ms 5
+
+Author: Mantas Valantinavicius
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+import numpy as np
+
+from predict_from_input import get_predictor
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """Coalesces queued single rows into batched `predict_array` calls."""
+
+    def __init__(self, predictor, max_batch_size=64, max_wait_ms=5.0):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, rows: np.ndarray) -> list:
+        """Queue rows (shape n x n_features) and wait for their predictions."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row in rows:
+            future = loop.create_future()
+            self.queue.put_nowait((row, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            X = np.stack([row for row, _ in batch])
+            try:
+                # Run the model off the event loop so new requests keep queueing meanwhile
+                predictions = await loop.run_in_executor(None, self.predictor.predict_array, X)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), value in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(float(value))
+
+
+class InferenceServer:
+    """Minimal keep-alive HTTP/1.1 server exposing the micro-batched predictor."""
+
+    def __init__(self, predictor=None, max_batch_size=64, max_wait_ms=5.0):
+        self.predictor = predictor or get_predictor()
+        self.batcher = MicroBatcher(self.predictor, max_batch_size, max_wait_ms)
+
+    def _rows_from_payload(self, payload) -> np.ndarray:
+        records = payload.get("instances", [payload]) if isinstance(payload, dict) else payload
+        if not isinstance(records, list) or not records:
+            raise ValueError("Expected a feature dict, a list of dicts or {'instances': [...]}")
+        try:
+            return np.array([[rec[f] for f in self.predictor.features] for rec in records], dtype=np.float32)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Missing or invalid feature: {e}")
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok", "features": self.predictor.features}
+        if path != "/predict":
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST for /predict"}
+        try:
+            rows = self._rows_from_payload(json.loads(body or b"null"))
+        except (ValueError, json.JSONDecodeError) as e:
+            return 400, {"error": str(e)}
+        return 200, {"predictions": await self.batcher.submit(rows)}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                # A malformed request gets a 400 and the connection is closed, since the
+                # stream position of the next request can no longer be trusted
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(f"negative Content-Length: {length}")
+                except ValueError as e:
+                    await self._respond(writer, 400, {"error": f"Malformed request: {e}"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length)
+
+                try:
+                    status, payload = await self._route(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    logging.exception("❌ Prediction failed")
+                    status, payload = 500, {"error": str(e)}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        logging.info(f"🚀 Serving XGBoost predictions on http://{host}:{port} "
+                     f"(max batch {self.batcher.max_batch_size}, max wait {self.batcher.max_wait * 1000:.1f} ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Micro-batching HTTP server for the XGBoost bundle")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum rows per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Maximum time to wait for more rows after the first one is queued")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli_args()
+    server = InferenceServer(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        logging.info("👋 Server stopped.")
@@ -3,7 +3,7 @@
 """
 01_load_data.py
 ----------------
-Loads raw energy and weather data from CSV and returns a cleaned DataFrame.
+Loads raw energy and weather data (CSV, Parquet, Feather or SQLite) and returns a cleaned DataFrame.
 Reads Phase 1 output and stores cleaned data for Phase 2 modeling.
 
 Author: Mantas Valantinavicius
@@ -12,8 +12,13 @@ Date: 2025-05-16
 
 import pandas as pd
 import logging
+import re
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 import yaml
+from storage import read_table, write_table
+from instrumentation import instrumented
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -35,23 +40,141 @@ def load_config(config_path=None):
     return config
 
 
+def _validate_table_name(table):
+    """SQLite identifiers cannot be bound as parameters, so only allow plain names."""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", str(table)):
+        raise ValueError(f"❌ Invalid SQLite table name: {table!r}")
+    return table
+
+
+def ensure_sqlite_indexes(conn, table):
+    """Create the (sector, timestamp) and timestamp indexes used by range queries."""
+    table = _validate_table_name(table)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_sector_ts ON {table} (sector, timestamp)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_ts ON {table} (timestamp)")
+    conn.commit()
+
+
+def import_csv_to_sqlite(csv_path, db_path, table, chunksize=100_000):
+    """
+    Build a local SQLite stand-in for the metering DB from a CSV file.
+
+    The CSV is streamed in chunks, timestamps are stored as ISO-8601 text (which
+    sorts chronologically) and the range-query indexes are created afterwards.
+    An existing table of the same name is replaced, so re-running the import
+    does not duplicate rows.
+    """
+    table = _validate_table_name(table)
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunksize)):
+            chunk["timestamp"] = pd.to_datetime(chunk["timestamp"]).dt.strftime("%Y-%m-%d %H:%M:%S")
+            chunk.to_sql(table, conn, if_exists="replace" if i == 0 else "append", index=False)
+        conn.commit()
+        ensure_sqlite_indexes(conn, table)
+
+    logging.info(f"🗄️  Imported {csv_path} into {db_path} (table: {table})")
+    return db_path
+
+
+def build_sqlite_query(source):
+    """
+    Build the SELECT for a SQLite source, pushing the time-range and sector
+    filters down to the database so only the requested window is read.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    table = _validate_table_name(source["table"])
+    clauses, params = [], []
+
+    sectors = source.get("sectors") or []
+    if sectors:
+        clauses.append(f"sector IN ({', '.join('?' for _ in sectors)})")
+        params.extend(sectors)
+    if source.get("start"):
+        clauses.append("timestamp >= ?")
+        params.append(pd.Timestamp(source["start"]).strftime("%Y-%m-%d %H:%M:%S"))
+    if source.get("end"):
+        clauses.append("timestamp < ?")
+        params.append(pd.Timestamp(source["end"]).strftime("%Y-%m-%d %H:%M:%S"))
+
+    columns = ", ".join(_validate_table_name(c) for c in source["columns"]) if source.get("columns") else "*"
+    sql = f"SELECT {columns} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY timestamp"
+    return sql, params
+
+
+def has_sqlite_indexes(conn, table) -> bool:
+    names = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,))}
+    return {f"idx_{table}_sector_ts", f"idx_{table}_ts"} <= names
+
+
+def load_sqlite(config):
+    """
+    Load a time window from a SQLite table using indexed, chunked cursor reads.
+
+    The window is deliberately returned as one DataFrame: the later stages work on
+    whole series. The chunks bound the cursor fetch, and each chunk's ISO-8601
+    text timestamps are parsed before the next one is read, so the raw strings of
+    the whole window are never held at once.
+
+    The database is opened read-only; the range-query indexes are created by
+    `import_csv_to_sqlite`, not on every read.
+    """
+    source = config["data_source"]
+    db_path = Path(source["path"]).resolve()
+
+    if not db_path.exists():
+        raise FileNotFoundError(f"❌ SQLite database not found: {db_path}")
+
+    sql, params = build_sqlite_query(source)
+    chunksize = source.get("chunksize", 100_000)
+    logging.info(f"📥 Loading data from SQLite: {db_path} ({sql})")
+
+    with closing(sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)) as conn:
+        if not has_sqlite_indexes(conn, source["table"]):
+            logging.warning(f"⚠ Table '{source['table']}' has no (sector, timestamp) / timestamp indexes; "
+                            f"range queries will scan the whole table (see import_csv_to_sqlite)")
+        chunks = []
+        for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunksize):
+            if "timestamp" in chunk.columns:
+                chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], errors="coerce")
+            chunks.append(chunk)
+
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    logging.info(f"✅ Loaded {len(df)} rows and {df.shape[1]} columns.")
+    return df
+
+
+@instrumented("01_load_data.load_data")
 def load_data(config):
-    """Load raw data from CSV."""
+    """Load raw data from a CSV, Parquet or Feather file, or a SQLite table."""
     source_type = config["data_source"]["type"]
+
+    if source_type == "sqlite":
+        return load_sqlite(config)
+
     file_path = Path(config["data_source"]["path"]).resolve()
 
-    if source_type != "csv":
-        raise ValueError("Only 'csv' data source is currently supported.")
+    if source_type not in ("csv", "parquet", "feather"):
+        raise ValueError("Only 'csv', 'parquet', 'feather' and 'sqlite' data sources are currently supported.")
 
     if not file_path.exists():
         raise FileNotFoundError(f"❌ Data file not found: {file_path}")
 
-    logging.info(f"📥 Loading data from CSV: {file_path}")
-    df = pd.read_csv(file_path)
+    logging.info(f"📥 Loading data from {source_type}: {file_path}")
+    df = read_table(file_path, columns=config["data_source"].get("columns"), resolve=False)
     logging.info(f"✅ Loaded {len(df)} rows and {df.shape[1]} columns.")
     return df
 
 
+@instrumented("01_load_data.clean_data")
 def clean_data(df):
     """Clean the data: drop missing values, format timestamp."""
     logging.info("🧹 Cleaning data...")
@@ -72,8 +195,6 @@ if __name__ == "__main__":
     df_cleaned = clean_data(df_raw)
 
     # Save cleaned file
-    output_path = Path(config["data_output"]["cleaned_path"]).resolve()
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df_cleaned.to_csv(output_path, index=False)
+    output_path = write_table(df_cleaned, Path(config["data_output"]["cleaned_path"]).resolve(), config)
 
     logging.info(f"💾 Cleaned data saved to: {output_path}")
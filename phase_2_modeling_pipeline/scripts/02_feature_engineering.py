@@ -6,28 +6,50 @@
 Adds time-based, cyclical, lag, and rolling features to the cleaned dataset.
 Saves the processed feature set for modeling.
 
+With `--incremental`, only rows newer than the last processed timestamp are
+featurized and appended to the feature store. The state file next to the store
+keeps the readings of the last 24h (timestamped) together with the frequency
+and gap-fill settings of the full run, and the new rows go through the same
+`add_lag_features` as `run`, so their features match a full re-run.
+
+Panel mode (`features.series_cols` in phase2_config.yaml, or `--series-cols
+site_id`) handles many series in one frame, e.g. a concatenated fleet of sites:
+rows are laid out contiguously per series and in time order, and lags and the
+rolling mean are computed in one vectorized pass over the whole frame, with the
+first rows of every series masked so no value crosses a series boundary.
+
+Lags are defined in time, not rows: each series is placed on a regular grid at
+the data frequency (inferred, or `features.frequency`), so `lag_24h` is the
+reading 24 hours earlier even when rows were dropped during cleaning or the
+data is at 10-minute resolution. Missing grid slots stay NaN (the row's lag is
+then dropped) unless `features.gap_fill` fills them (`ffill`, `interpolate`
+or `zero`, up to `features.gap_fill_limit` consecutive slots).
+
 Author: Mantas Valantinavicius
 """
 
 import pandas as pd
 import numpy as np
+import argparse
+import json
 import logging
+import yaml
 from pathlib import Path
+from storage import CONFIG_PATH, append_table, read_table, table_path, write_table
+from instrumentation import instrumented
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Look-back of each lag / trailing rolling-mean feature, in time
+LAG_FEATURES = {"lag_1h": pd.Timedelta("1h"), "lag_24h": pd.Timedelta("24h")}
+ROLLING_FEATURES = {"roll_mean_24h": pd.Timedelta("24h")}
+# Longest look-back of the lag/rolling features: the history kept in the incremental state
+LOOKBACK = max([*LAG_FEATURES.values(), *ROLLING_FEATURES.values()])
+GAP_FILL_METHODS = ("none", "ffill", "interpolate", "zero")
 
-def run(df: pd.DataFrame, variant: str = "mixed") -> pd.DataFrame:
-    logging.info(f"🚀 Running feature engineering for variant: {variant}")
-
-    # Validate required column
-    if "energy_kWh" not in df.columns:
-        raise ValueError(f"'energy_kWh' column not found. Available columns: {df.columns.tolist()}")
-
-    # Ensure timestamp format and sort
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df = df.sort_values("timestamp").reset_index(drop=True)
 
+def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add calendar and cyclical features; these depend on the row's timestamp only."""
     # Time-based features
     df["hour"] = df["timestamp"].dt.hour
     df["day_of_week"] = df["timestamp"].dt.dayofweek
@@ -39,33 +61,332 @@ def run(df: pd.DataFrame, variant: str = "mixed") -> pd.DataFrame:
     df["hour_cos"] = np.cos(2 * np.pi * df["hour"] / 24)
     df["dow_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
     df["dow_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
+    return df
+
+
+def load_feature_settings() -> dict:
+    """The `features` section (with defaults) of the Phase 2 config."""
+    with open(CONFIG_PATH, "r") as file:
+        config = yaml.safe_load(file) or {}
+    settings = {"series_cols": [], "frequency": None, "gap_fill": "none", "gap_fill_limit": None}
+    settings.update({k: v for k, v in (config.get("features") or {}).items() if v is not None})
+    settings["series_cols"] = list(settings["series_cols"] or [])
+    return settings
+
+
+def sort_panel(df: pd.DataFrame, series_cols=()) -> tuple:
+    """
+    Order rows by series, then timestamp, so every series is one contiguous block.
+
+    Returns:
+        tuple: (sorted frame, position of each row within its series)
+    """
+    series_cols = list(series_cols)
+    timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    if series_cols:
+        codes = df.groupby(series_cols, sort=True, observed=True).ngroup().to_numpy()
+        order = np.lexsort((timestamps, codes))
+    else:
+        codes = np.zeros(len(df), dtype=np.int64)
+        order = np.argsort(timestamps, kind="stable")
+    df = df.iloc[order].reset_index(drop=True)
+    codes, timestamps = codes[order], timestamps[order]
+
+    same_series = codes[1:] == codes[:-1]
+    if (same_series & (timestamps[1:] == timestamps[:-1])).any():
+        where = f"within a series of {series_cols}" if series_cols else "in the series"
+        raise ValueError(f"❌ Duplicate timestamps {where}; lags would be ambiguous")
+    starts = np.flatnonzero(np.concatenate([[True], ~same_series])) if len(df) else np.array([], dtype=np.int64)
+    lengths = np.diff(np.append(starts, len(df)))
+    position = np.arange(len(df)) - np.repeat(starts, lengths)
+    return df, position
+
+
+def infer_step(timestamps: np.ndarray, position: np.ndarray) -> int:
+    """Most common spacing (ns) between consecutive readings of the same series; 1h if unknown."""
+    diffs = np.diff(timestamps)[position[1:] > 0]
+    if not len(diffs):
+        return pd.Timedelta("1h").value
+    values, counts = np.unique(diffs, return_counts=True)
+    return int(values[np.argmax(counts)])
+
+
+def steps_for(window: pd.Timedelta, step: int, name: str) -> int:
+    if window.value % step:
+        raise ValueError(f"❌ {name} ({window}) is not a multiple of the data frequency ({pd.Timedelta(step)})")
+    return window.value // step
+
+
+def fill_gaps(values: np.ndarray, grid_start: np.ndarray, method="none", limit=None) -> np.ndarray:
+    """
+    Fill NaN slots of a concatenated per-series grid, never across series.
+
+    Parameters:
+        grid_start (np.ndarray): Grid index of the first slot of each slot's series
+        method (str): none | ffill | interpolate | zero
+        limit (int, optional): Only fill gaps of at most this many consecutive slots
+    """
+    if method not in GAP_FILL_METHODS:
+        raise ValueError(f"❌ Unknown gap_fill '{method}'. Use one of {list(GAP_FILL_METHODS)}.")
+    observed = ~np.isnan(values)
+    if method == "none" or observed.all():
+        return values
+
+    index = np.arange(len(values))
+    prev_obs = np.maximum.accumulate(np.where(observed, index, -1))
+    next_obs = np.minimum.accumulate(np.where(observed, index, len(values))[::-1])[::-1]
+    # Gaps before a series' first reading have nothing (in that series) to fill from
+    fillable = ~observed & (prev_obs >= grid_start)
+    if limit is not None:
+        fillable &= (next_obs - prev_obs - 1) <= limit
+
+    filled = values.copy()
+    if method == "ffill":
+        filled[fillable] = values[prev_obs[fillable]]
+    elif method == "zero":
+        filled[fillable] = 0.0
+    else:
+        # Linear between the surrounding readings; a gap with no later reading in the series is left as is
+        fillable &= (next_obs < len(values)) & (grid_start[np.minimum(next_obs, len(values) - 1)] == grid_start)
+        obs_index = np.flatnonzero(observed)
+        filled[fillable] = np.interp(index[fillable], obs_index, values[obs_index])
+    return filled
+
+
+def add_lag_features(df: pd.DataFrame, position: np.ndarray, frequency=None,
+                     gap_fill="none", gap_fill_limit=None) -> pd.DataFrame:
+    """
+    Time-based lag and rolling features over a frame sorted by `sort_panel`.
+
+    Every series is laid on a regular grid at the data frequency and the grids
+    are concatenated, so a row's slot is `series offset + (timestamp - series
+    start) / step` - an O(1) index computation instead of a per-row lookup.
+    Energy is scattered onto the grid, optionally gap-filled, and each lag is a
+    gather at `slot - k`; the rolling mean is one rolling pass over the grid.
+    Look-backs that would reach before the start of a series are NaN.
+    """
+    timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    step = pd.Timedelta(frequency).value if frequency else infer_step(timestamps, position)
+
+    # Grid slot of every row
+    series_id = np.cumsum(position == 0) - 1
+    first_row = np.flatnonzero(position == 0)
+    offset = timestamps - timestamps[first_row][series_id]
+    if (offset % step).any():
+        raise ValueError(f"❌ Timestamps are not on a regular {pd.Timedelta(step)} grid; "
+                         f"resample the data or set features.frequency")
+    slot_in_series = offset // step
+    last_row = np.append(first_row[1:] - 1, len(df) - 1)
+    grid_len = slot_in_series[last_row] + 1
+    grid_offset = np.concatenate([[0], np.cumsum(grid_len)[:-1]])
+    slot = grid_offset[series_id] + slot_in_series
+
+    grid = np.full(int(grid_len.sum()), np.nan)
+    grid[slot] = df["energy_kWh"].to_numpy(dtype=float)
+    grid_start = np.repeat(grid_offset, grid_len)
+    grid = fill_gaps(grid, grid_start, gap_fill, gap_fill_limit)
+
+    for name, window in LAG_FEATURES.items():
+        k = steps_for(window, step, name)
+        values = np.full(len(df), np.nan)
+        valid = slot_in_series >= k
+        values[valid] = grid[slot[valid] - k]
+        df[name] = values
+
+    for name, window in ROLLING_FEATURES.items():
+        w = steps_for(window, step, name)
+        rolled = pd.Series(grid).rolling(window=w).mean().to_numpy()[slot]
+        df[name] = np.where(slot_in_series >= w - 1, rolled, np.nan)
+    return df
+
 
-    # Lag features
-    df["lag_1h"] = df["energy_kWh"].shift(1)
-    df["lag_24h"] = df["energy_kWh"].shift(24)
+@instrumented("02_feature_engineering.run")
+def run(df: pd.DataFrame, variant: str = "mixed", series_cols=None, frequency=None,
+        gap_fill="none", gap_fill_limit=None) -> pd.DataFrame:
+    """
+    Add time, lag and rolling features.
 
-    # Rolling average
-    df["roll_mean_24h"] = df["energy_kWh"].rolling(window=24).mean()
+    Parameters:
+        series_cols (list, optional): Series ID columns (e.g. `["site_id"]`) for panel
+            data; lags are computed within each series. Default: one series.
+        frequency (str, optional): Data frequency, e.g. "1h" or "10min"; inferred when omitted
+        gap_fill (str): How missing grid slots feed the lags: none | ffill | interpolate | zero
+        gap_fill_limit (int, optional): Longest gap (in slots) that is filled
+
+    Returns:
+        pd.DataFrame: Feature rows, ordered by series and timestamp
+    """
+    logging.info(f"🚀 Running feature engineering for variant: {variant}")
+
+    # Validate required column
+    if "energy_kWh" not in df.columns:
+        raise ValueError(f"'energy_kWh' column not found. Available columns: {df.columns.tolist()}")
+    series_cols = list(series_cols or [])
+    missing = [c for c in series_cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"Series column(s) {missing} not found. Available columns: {df.columns.tolist()}")
+
+    # Ensure timestamp format and sort (contiguous per series)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df, position = sort_panel(df, series_cols)
+
+    df = add_time_features(df)
+
+    # Time-based lag features and rolling average, within each series
+    df = add_lag_features(df, position, frequency, gap_fill, gap_fill_limit)
 
     # Drop NaNs from lag/rolling
     df = df.dropna().reset_index(drop=True)
 
-    logging.info(f"✅ Feature engineering complete. Final shape: {df.shape}")
+    logging.info(f"✅ Feature engineering complete. Final shape: {df.shape}"
+                 + (f" ({df.groupby(series_cols, observed=True).ngroups} series)" if series_cols else ""))
     return df
 
 
+def build_state(df: pd.DataFrame, frequency=None, gap_fill="none", gap_fill_limit=None) -> dict:
+    """
+    Capture what `run_incremental` needs to continue the features after `df`'s last row.
+
+    The tail holds every reading of the last `LOOKBACK` plus the one before it, so
+    lags, the rolling mean and gap filling see the same values as on the full
+    history. The frequency is resolved (inferred if not given) and stored, so later
+    batches use the grid of the full run.
+    """
+    df = df[["timestamp", "energy_kWh"]].assign(timestamp=lambda d: pd.to_datetime(d["timestamp"]))
+    df, position = sort_panel(df)
+    if not len(df):
+        return {"last_timestamp": None, "frequency": frequency, "gap_fill": gap_fill,
+                "gap_fill_limit": gap_fill_limit, "tail": {"timestamp": [], "energy_kWh": []}}
+
+    timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    step = pd.Timedelta(frequency).value if frequency else infer_step(timestamps, position)
+    last = df["timestamp"].iloc[-1]
+    first_kept = max(int(np.searchsorted(timestamps, (last - LOOKBACK).value)) - 1, 0)
+    tail = df.iloc[first_kept:]
+    return {
+        "last_timestamp": str(last),
+        "frequency": str(pd.Timedelta(step)),
+        "gap_fill": gap_fill,
+        "gap_fill_limit": gap_fill_limit,
+        "tail": {"timestamp": tail["timestamp"].astype(str).tolist(),
+                 "energy_kWh": tail["energy_kWh"].astype(float).tolist()},
+    }
+
+
+def state_path(output_path) -> Path:
+    """Location of the tail-state file kept next to the feature store."""
+    return Path(output_path).with_suffix(".state.json")
+
+
+def load_state(path) -> dict:
+    with open(path, "r") as f:
+        state = json.load(f)
+    if "tail" not in state:
+        raise ValueError(f"❌ Feature state {path} has an outdated format; run once without --incremental")
+    return state
+
+
+def save_state(state: dict, path):
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+@instrumented("02_feature_engineering.run_incremental")
+def run_incremental(df_new: pd.DataFrame, state: dict, variant: str = "mixed") -> tuple:
+    """
+    Featurize only rows newer than `state["last_timestamp"]`.
+
+    The stored tail (the last 24h of readings) is prepended to the new readings
+    and both go through `add_lag_features` with the frequency and gap-fill
+    settings saved by the full run, so lags are taken on the same time grid and
+    the work is O(new rows + 24h) instead of the whole history. The new rows get
+    the same features as in `run` on the full history.
+
+    Returns:
+        tuple: (feature rows for the new data, updated state)
+    """
+    logging.info(f"🔁 Running incremental feature engineering for variant: {variant}")
+
+    if "energy_kWh" not in df_new.columns:
+        raise ValueError(f"'energy_kWh' column not found. Available columns: {df_new.columns.tolist()}")
+
+    df_new = df_new.copy()
+    df_new["timestamp"] = pd.to_datetime(df_new["timestamp"])
+    if state.get("last_timestamp"):
+        df_new = df_new[df_new["timestamp"] > pd.Timestamp(state["last_timestamp"])]
+    df_new, _ = sort_panel(df_new)
+
+    if df_new.empty:
+        logging.info("✅ No new rows to featurize.")
+        return df_new, state
+
+    stored = state.get("tail") or {"timestamp": [], "energy_kWh": []}
+    tail = pd.DataFrame({"timestamp": pd.to_datetime(pd.Series(stored["timestamp"], dtype=object)),
+                         "energy_kWh": np.asarray(stored["energy_kWh"], dtype=float)})
+    history, position = sort_panel(pd.concat([tail, df_new[["timestamp", "energy_kWh"]]], ignore_index=True))
+    history = add_lag_features(history, position, state.get("frequency"), state.get("gap_fill", "none"),
+                               state.get("gap_fill_limit"))
+
+    # New rows are all later than the tail, so they are the last rows of the sorted history
+    df_new = add_time_features(df_new)
+    for name in [*LAG_FEATURES, *ROLLING_FEATURES]:
+        df_new[name] = history[name].to_numpy()[len(tail):]
+
+    new_state = build_state(history, state.get("frequency"), state.get("gap_fill", "none"),
+                            state.get("gap_fill_limit"))
+
+    df_new = df_new.dropna().reset_index(drop=True)
+    logging.info(f"✅ Incremental feature engineering complete. New rows: {len(df_new)}")
+    return df_new, new_state
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Phase 2 feature engineering")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only featurize rows newer than the persisted state and append them")
+    parser.add_argument("--series-cols", nargs="+", default=None,
+                        help="Series ID column(s) for panel data, e.g. site_id (default: features.series_cols)")
+    parser.add_argument("--frequency", default=None, help="Data frequency, e.g. 1h or 10min (default: inferred)")
+    parser.add_argument("--gap-fill", choices=GAP_FILL_METHODS, default=None,
+                        help="Fill missing timestamps before computing lags (default: features.gap_fill)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_cli_args()
     input_path = Path("phase_2_modeling_pipeline/data/processed/cleaned_energy_data.csv")
     output_path = Path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
     variant = "mixed"
+    settings = load_feature_settings()
+    for key in ("series_cols", "frequency", "gap_fill"):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    series_cols = settings["series_cols"]
+    if args.incremental and series_cols:
+        logging.error("❌ Incremental mode keeps the state of a single series; run without --incremental for panel data.")
+        exit(1)
 
+    input_path = table_path(input_path)
     if not input_path.exists():
         logging.error(f"❌ Input file not found: {input_path.resolve()}")
         exit(1)
 
-    df_cleaned = pd.read_csv(input_path)
-    df_fe = run(df_cleaned, variant=variant)
+    state_file = state_path(table_path(output_path))
+    if args.incremental and state_file.exists() and table_path(output_path).exists():
+        state = load_state(state_file)
+        filters = [("timestamp", ">", state["last_timestamp"])] if state.get("last_timestamp") else None
+        df_new, state = run_incremental(read_table(input_path, filters=filters), state, variant=variant)
+        output_path = append_table(df_new, output_path)
+        logging.info(f"💾 Appended {len(df_new)} feature rows to: {output_path.resolve()}")
+    else:
+        if args.incremental:
+            logging.info("ℹ️  No feature state found, running full feature engineering.")
+        df_cleaned = read_table(input_path)
+        df_fe = run(df_cleaned, variant=variant, series_cols=series_cols, frequency=settings["frequency"],
+                    gap_fill=settings["gap_fill"], gap_fill_limit=settings["gap_fill_limit"])
+        state = build_state(df_cleaned, settings["frequency"], settings["gap_fill"], settings["gap_fill_limit"])
+
+        output_path = write_table(df_fe, output_path)
+        logging.info(f"💾 Feature-engineered data saved to: {output_path.resolve()}")
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df_fe.to_csv(output_path, index=False)
-    logging.info(f"💾 Feature-engineered data saved to: {output_path.resolve()}")
+    save_state(state, state_file)
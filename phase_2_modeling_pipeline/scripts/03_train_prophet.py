@@ -6,18 +6,32 @@
 Trains a Prophet model using the timestamp and energy_kWh columns.
 Saves model and forecast output.
 
+With `--batch`, fits one Prophet model per (sector, site_id) group in a process
+pool with bounded concurrency, warm-starting each fit from the parameters of the
+previous fit of that group when available, and reports per-model fit times.
+
 Author: Mantas Valantinavicius
 """
 
 import pandas as pd
+import numpy as np
 from prophet import Prophet
+from prophet.utilities import warm_start_params
 from pathlib import Path
-import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import json
+import os
 import logging
+import time
+from storage import read_table, table_path, write_table
+from prophet_compact import save_compact
+from instrumentation import instrumented, track
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
+@instrumented("03_train_prophet.run")
 def run(df: pd.DataFrame, variant: str = "mixed") -> Prophet:
     logging.info(f"🔮 Training Prophet model for variant: {variant}")
 
@@ -36,36 +50,134 @@ def run(df: pd.DataFrame, variant: str = "mixed") -> Prophet:
     )
 
     # Fit model
-    model.fit(prophet_df)
+    with track("03_train_prophet.fit", rows=len(prophet_df)):
+        model.fit(prophet_df)
 
     # Forecast same length as training set
-    future = model.make_future_dataframe(periods=0, freq="H")
-    forecast = model.predict(future)
-
-    # Save model
-    model_path = Path(f"phase_2_modeling_pipeline/models/prophet_model_{variant}.pkl")
-    model_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    future = model.make_future_dataframe(periods=0, freq="h")
+    with track("03_train_prophet.predict", rows=len(future)):
+        forecast = model.predict(future)
+
+    # Save model (compact JSON + npz, see prophet_compact.py)
+    model_path, _ = save_compact(model, Path(f"phase_2_modeling_pipeline/models/prophet_model_{variant}"))
     logging.info(f"✅ Model saved to: {model_path.resolve()}")
 
     # Save forecast
-    forecast_path = Path(f"phase_2_modeling_pipeline/results/predictions/prophet_forecast_{variant}.csv")
-    forecast_path.parent.mkdir(parents=True, exist_ok=True)
-    forecast.to_csv(forecast_path, index=False)
+    forecast_path = write_table(forecast, Path(f"phase_2_modeling_pipeline/results/predictions/prophet_forecast_{variant}.csv"))
     logging.info(f"📈 Forecast saved to: {forecast_path.resolve()}")
 
     return model
 
 
+BATCH_MODEL_DIR = Path("phase_2_modeling_pipeline/models/prophet_batch")
+BATCH_FORECAST_DIR = Path("phase_2_modeling_pipeline/results/predictions/prophet_batch")
+
+
+def _group_name(variant, key) -> str:
+    return "_".join([f"prophet_model_{variant}"] + [str(k) for k in key])
+
+
+@instrumented("03_train_prophet.fit_group", rows=lambda result, args, kwargs: result["rows"])
+def _fit_group(task) -> dict:
+    """Process-pool worker: fit, save and forecast one (sector, site) Prophet model."""
+    variant, key, prophet_df = task
+    name = _group_name(variant, key)
+    init_path = BATCH_MODEL_DIR / f"{name}.init.json"
+
+    init = None
+    if init_path.exists():
+        with open(init_path, "r") as f:
+            init = {k: np.asarray(v) if isinstance(v, list) else v for k, v in json.load(f).items()}
+
+    def fit(init_params):
+        model = Prophet(daily_seasonality=True, weekly_seasonality=True, yearly_seasonality=True)
+        return model.fit(prophet_df, init=init_params) if init_params else model.fit(prophet_df)
+
+    start = time.perf_counter()
+    try:
+        model = fit(init)
+    except Exception as e:
+        # Stale warm-start parameters (e.g. changed seasonality config): fall back to a cold fit
+        logging.warning(f"⚠ Warm start failed for {name} ({e}); refitting from scratch")
+        init = None
+        model = fit(None)
+    fit_seconds = time.perf_counter() - start
+
+    model_path, _ = save_compact(model, BATCH_MODEL_DIR / name)
+    params = {k: (v.tolist() if hasattr(v, "tolist") else v) for k, v in warm_start_params(model).items()}
+    with open(init_path, "w") as f:
+        json.dump(params, f)
+
+    forecast = model.predict(prophet_df[["ds"]])
+    write_table(forecast, BATCH_FORECAST_DIR / f"{name.replace('prophet_model', 'prophet_forecast')}.csv")
+
+    return {"group": name, "rows": len(prophet_df), "warm_start": init is not None,
+            "fit_seconds": round(fit_seconds, 3), "model_path": str(model_path)}
+
+
+@instrumented("03_train_prophet.run_batch")
+def run_batch(df: pd.DataFrame, variant: str = "mixed", group_cols=None, max_workers=None) -> pd.DataFrame:
+    """
+    Fit one Prophet model per group across a process pool.
+
+    Parameters:
+        group_cols (list, optional): Grouping columns; defaults to whichever of
+            `sector` / `site_id` are present
+        max_workers (int, optional): Upper bound on concurrent fits (default: CPU count)
+
+    Returns:
+        pd.DataFrame: Per-model fit report (rows, warm_start, fit_seconds, model_path)
+    """
+    if group_cols is None:
+        group_cols = [c for c in ("sector", "site_id") if c in df.columns]
+    if not group_cols:
+        raise ValueError("Batch training needs at least one of 'sector' / 'site_id' columns")
+
+    BATCH_MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    tasks = [
+        (variant, key if isinstance(key, tuple) else (key,),
+         group[["timestamp", "energy_kWh"]].rename(columns={"timestamp": "ds", "energy_kWh": "y"}))
+        for key, group in df.groupby(group_cols, sort=True)
+    ]
+    max_workers = min(max_workers or os.cpu_count(), len(tasks))
+    logging.info(f"🔮 Training {len(tasks)} Prophet models with up to {max_workers} concurrent fits")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fit_group, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            logging.info(f"✅ {result['group']}: {result['fit_seconds']:.2f}s "
+                         f"({'warm' if result['warm_start'] else 'cold'} start, {result['rows']} rows)")
+            results.append(result)
+
+    report = pd.DataFrame(results).sort_values("group").reset_index(drop=True)
+    report_path = Path(f"phase_2_modeling_pipeline/results/prophet_batch_fit_times_{variant}.csv")
+    report.to_csv(report_path, index=False)
+    logging.info(f"⏱️  Fit report saved to: {report_path.resolve()} (total fit time {report['fit_seconds'].sum():.1f}s)")
+    return report
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Prophet training")
+    parser.add_argument("--batch", action="store_true", help="Fit one model per (sector, site_id) in parallel")
+    parser.add_argument("--max-workers", type=int, default=None, help="Maximum concurrent fits in batch mode")
+    return parser.parse_args()
+
+
 # Entry point to run standalone
 if __name__ == "__main__":
-    input_path = Path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
+    args = parse_cli_args()
+    input_path = table_path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
     variant = "mixed"
 
     if not input_path.exists():
         logging.error(f"❌ Feature-engineered file not found: {input_path.resolve()}")
         exit(1)
 
-    df_fe = pd.read_csv(input_path)
-    model = run(df_fe, variant=variant)
+    if args.batch:
+        df_fe = read_table(input_path)
+        run_batch(df_fe, variant=variant, max_workers=args.max_workers)
+    else:
+        df_fe = read_table(input_path, columns=["timestamp", "energy_kWh"])
+        model = run(df_fe, variant=variant)
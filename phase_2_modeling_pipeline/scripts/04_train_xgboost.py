@@ -6,28 +6,68 @@
 Trains an XGBoost regression model on feature-engineered data.
 Saves model and predictions (with timestamp).
 
+With `--global`, fits one model across all series (sites) instead of one per
+variant: the series ID columns (`site_id`, `sector`) are passed to XGBoost as
+categorical features, the training matrix is a QuantileDMatrix built straight
+from the columnar frame, and trees are grown with the multi-threaded `hist`
+method. `--score` then predicts every site from the feature table in chunks
+with the saved global model.
+
+With `--external-memory`, the global model is trained out of core: feature
+files (a single table or a directory of partitions, e.g. one file per site)
+are streamed chunk by chunk through an XGBoost `DataIter` into an external-
+memory quantile matrix, so training memory is bounded by the chunk size and
+the on-disk page cache rather than the size of the fleet history.
+
+With `--update`, the saved per-variant model is not retrained: boosting
+continues from `xgboost_model_{variant}.json` for UPDATE_ROUNDS more trees on
+the feature rows newer than the last timestamp it was trained on. That
+timestamp and the training hyperparameters are kept in
+`xgboost_model_{variant}.state.json`, so the added trees use the same
+learning rate and depth as the original ones.
+
 Author: Mantas Valantinavicius
 """
 
 import pandas as pd
+import numpy as np
+import argparse
+import json
 import logging
+import os
+import shutil
+import tempfile
 from pathlib import Path
 import xgboost as xgb
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import train_test_split
 from math import sqrt
+from storage import SUFFIXES, iter_table, read_table, table_columns, table_path, write_table
+from instrumentation import instrumented, track
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+FEATURE_COLS = [
+    'hour', 'day_of_week', 'month', 'is_weekend',
+    'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+    'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
+]
+# Series ID columns used as categorical features by the global model, when present
+CATEGORICAL_COLS = ["site_id", "sector"]
+GLOBAL_PARAMS = {"tree_method": "hist", "max_depth": 5, "eta": 0.1, "max_bin": 256,
+                 "max_cat_to_onehot": 1, "seed": 42}
+GLOBAL_ROUNDS = 100
+# Per-variant model hyperparameters (saved in the training state for `update`)
+XGB_PARAMS = {"n_estimators": 100, "max_depth": 5, "learning_rate": 0.1, "random_state": 42}
+# Trees added per incremental update
+UPDATE_ROUNDS = 20
+
+@instrumented("04_train_xgboost.run")
 def run(df: pd.DataFrame, variant: str = "mixed") -> xgb.XGBRegressor:
     logging.info(f"⚙️  Training XGBoost model for variant: {variant}")
 
     target_col = "energy_kWh"
-    feature_cols = [
-        'hour', 'day_of_week', 'month', 'is_weekend',
-        'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
-        'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
-    ]
+    feature_cols = FEATURE_COLS
 
     df = df.dropna(subset=feature_cols + [target_col])
     df["timestamp"] = pd.to_datetime(df["timestamp"])
@@ -41,37 +81,391 @@ def run(df: pd.DataFrame, variant: str = "mixed") -> xgb.XGBRegressor:
         X, y, timestamps, test_size=0.2, random_state=42
     )
 
-    model = xgb.XGBRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42)
-    model.fit(X_train, y_train)
+    model = xgb.XGBRegressor(**XGB_PARAMS)
+    with track("04_train_xgboost.fit", rows=len(X_train)):
+        model.fit(X_train, y_train)
 
-    y_pred = model.predict(X_test)
+    with track("04_train_xgboost.predict", rows=len(X_test)):
+        y_pred = model.predict(X_test)
     rmse = sqrt(mean_squared_error(y_test, y_pred))
     logging.info(f"📉 XGBoost RMSE: {rmse:.4f}")
 
     model_path = Path(f"phase_2_modeling_pipeline/models/xgboost_model_{variant}.json")
     model_path.parent.mkdir(parents=True, exist_ok=True)
     model.save_model(model_path)
+    save_state({"last_timestamp": str(timestamps.max()), "rows": len(X_train), "params": XGB_PARAMS}, variant)
     logging.info(f"✅ Model saved to: {model_path.resolve()}")
 
-    pred_path = Path(f"phase_2_modeling_pipeline/results/predictions/xgboost_predictions_{variant}.csv")
     pred_df = pd.DataFrame({
         "timestamp": ts_test.values,
         "actual": y_test.values,
         "predicted": y_pred
     }).sort_values("timestamp")
-    pred_df.to_csv(pred_path, index=False)
+    pred_path = write_table(pred_df, Path(f"phase_2_modeling_pipeline/results/predictions/xgboost_predictions_{variant}.csv"))
     logging.info(f"📈 Predictions saved to: {pred_path.resolve()}")
 
     return model
 
 
+def state_path(variant="mixed") -> Path:
+    """Training state (last timestamp seen, rows, hyperparameters) kept next to the per-variant model."""
+    return Path(f"phase_2_modeling_pipeline/models/xgboost_model_{variant}.state.json")
+
+
+def load_state(variant="mixed") -> dict:
+    path = state_path(variant)
+    if not path.exists():
+        raise FileNotFoundError(f"❌ Training state not found: {path.resolve()} (run a full training first)")
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_state(state: dict, variant="mixed"):
+    with open(state_path(variant), "w") as f:
+        json.dump(state, f, indent=2)
+
+
+@instrumented("04_train_xgboost.update")
+def update(df_new: pd.DataFrame, variant: str = "mixed", num_boost_round=UPDATE_ROUNDS) -> xgb.XGBRegressor:
+    """
+    Continue boosting the saved model on rows newer than its training state.
+
+    The existing trees are kept and `num_boost_round` trees are added, fitted to
+    the residuals of the current model on the new rows, so the cost depends on
+    the new data only. The regressor is rebuilt with the saved training
+    hyperparameters, since `load_model` alone does not restore them.
+
+    The logged RMSE before the update is out of sample (the model has not seen
+    the new rows); the one after is in-sample on the rows just trained on.
+
+    Returns:
+        xgb.XGBRegressor: The updated model (also saved); unchanged when there are no new rows
+    """
+    model_path = Path(f"phase_2_modeling_pipeline/models/xgboost_model_{variant}.json")
+    state = load_state(variant)
+    model = xgb.XGBRegressor(**state.get("params", XGB_PARAMS))
+    model.load_model(model_path)
+
+    df_new = df_new.dropna(subset=FEATURE_COLS + ["energy_kWh"])
+    df_new = df_new[pd.to_datetime(df_new["timestamp"]) > pd.Timestamp(state["last_timestamp"])]
+    if df_new.empty:
+        logging.info(f"✅ No rows newer than {state['last_timestamp']}; model unchanged.")
+        return model
+
+    X_new, y_new = df_new[FEATURE_COLS], df_new["energy_kWh"]
+    rmse_before = sqrt(mean_squared_error(y_new, model.predict(X_new)))
+    trees_before = model.get_booster().num_boosted_rounds()
+
+    model.set_params(n_estimators=num_boost_round)
+    with track("04_train_xgboost.update_fit", rows=len(X_new)):
+        model.fit(X_new, y_new, xgb_model=model.get_booster())
+    rmse_after = sqrt(mean_squared_error(y_new, model.predict(X_new)))
+    logging.info(f"🔁 Added {model.get_booster().num_boosted_rounds() - trees_before} trees on {len(df_new)} new rows. "
+                 f"RMSE on new rows: {rmse_before:.4f} before (out of sample) -> {rmse_after:.4f} after (in-sample)")
+
+    model.save_model(model_path)
+    save_state({"last_timestamp": str(pd.to_datetime(df_new["timestamp"]).max()),
+                "rows": state.get("rows", 0) + len(df_new), "params": state.get("params", XGB_PARAMS)}, variant)
+    logging.info(f"✅ Model saved to: {model_path.resolve()}")
+    return model
+
+
+def holdout_cutoff(timestamps, test_size=0.2) -> pd.Timestamp:
+    """
+    First timestamp of the time-ordered hold-out: the last `test_size` of the distinct
+    timestamps across all series. Rows at or after it are held out, so no training
+    row's lags reach into the test period.
+    """
+    distinct = np.unique(pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype="datetime64[ns]"))
+    if len(distinct) < 2:
+        raise ValueError("❌ Need at least two distinct timestamps for a time-ordered hold-out")
+    return pd.Timestamp(distinct[min(int(len(distinct) * (1 - test_size)), len(distinct) - 1)])
+
+
+def global_model_paths(variant="global") -> tuple:
+    """(booster JSON, categorical levels JSON) of a global model."""
+    model_path = Path(f"phase_2_modeling_pipeline/models/xgboost_model_{variant}.json")
+    return model_path, model_path.with_name(f"{model_path.stem}.categories.json")
+
+
+def encode_categoricals(df: pd.DataFrame, levels: dict) -> pd.DataFrame:
+    """
+    Cast series ID columns to categoricals with fixed levels, so codes match training.
+
+    Values not seen in training become missing, which the trees route down their default branch.
+    """
+    df = df.copy()
+    for col, categories in levels.items():
+        values = df[col].astype(str)
+        df[col] = pd.Categorical(values.where(values.isin(categories)), categories=categories)
+    return df
+
+
+def global_features(df: pd.DataFrame, levels: dict) -> pd.DataFrame:
+    return encode_categoricals(df[FEATURE_COLS + list(levels)], levels)
+
+
+@instrumented("04_train_xgboost.run_global")
+def run_global(df: pd.DataFrame, variant: str = "global", n_jobs=None, num_boost_round=GLOBAL_ROUNDS) -> xgb.Booster:
+    """
+    Fit a single XGBoost model across all series.
+
+    The hold-out is time-ordered: the last 20% of timestamps across all series
+    (see `holdout_cutoff`), so it measures forecasting ahead rather than filling in.
+
+    Parameters:
+        n_jobs (int, optional): Training threads (default: CPU count)
+
+    Returns:
+        xgb.Booster: The trained global model
+    """
+    cat_cols = [c for c in CATEGORICAL_COLS if c in df.columns]
+    if not cat_cols:
+        raise ValueError(f"Global training needs at least one of {CATEGORICAL_COLS} columns")
+    n_jobs = n_jobs or os.cpu_count()
+    logging.info(f"🌐 Training global XGBoost model ({variant}) over {cat_cols} with {n_jobs} threads")
+
+    target_col = "energy_kWh"
+    df = df.dropna(subset=FEATURE_COLS + [target_col])
+    levels = {col: sorted(df[col].astype(str).unique()) for col in cat_cols}
+    logging.info("   " + ", ".join(f"{len(v)} {k} levels" for k, v in levels.items()))
+
+    cutoff = holdout_cutoff(df["timestamp"])
+    is_test = pd.to_datetime(df["timestamp"]).to_numpy() >= cutoff
+    train_idx, test_idx = np.flatnonzero(~is_test), np.flatnonzero(is_test)
+    logging.info(f"   Holding out {len(test_idx)} rows from {cutoff} on")
+    X = global_features(df, levels)
+    y = df[target_col].to_numpy(dtype=np.float32)
+
+    with track("04_train_xgboost.global_dmatrix", rows=len(train_idx)):
+        dtrain = xgb.QuantileDMatrix(X.iloc[train_idx], y[train_idx], enable_categorical=True,
+                                     max_bin=GLOBAL_PARAMS["max_bin"], nthread=n_jobs)
+    with track("04_train_xgboost.global_fit", rows=len(train_idx)):
+        booster = xgb.train(dict(GLOBAL_PARAMS, nthread=n_jobs), dtrain, num_boost_round=num_boost_round)
+    del dtrain
+
+    X_test = X.iloc[test_idx]
+    y_pred = booster.inplace_predict(X_test)
+    rmse = sqrt(mean_squared_error(y[test_idx], y_pred))
+    logging.info(f"📉 Global XGBoost RMSE: {rmse:.4f}")
+
+    model_path, levels_path = global_model_paths(variant)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    booster.save_model(model_path)
+    with open(levels_path, "w") as f:
+        json.dump(levels, f, indent=2)
+    logging.info(f"✅ Model saved to: {model_path.resolve()}")
+
+    test = df.iloc[test_idx]
+    pred_df = test[["timestamp"] + cat_cols].assign(actual=y[test_idx], predicted=y_pred)
+    pred_df = pred_df.sort_values(cat_cols + ["timestamp"])
+    pred_path = write_table(pred_df, Path(f"phase_2_modeling_pipeline/results/predictions/xgboost_predictions_{variant}.csv"))
+    logging.info(f"📈 Predictions saved to: {pred_path.resolve()}")
+
+    return booster
+
+
+def load_global_model(variant="global") -> tuple:
+    """Return (booster, categorical levels) of a saved global model."""
+    model_path, levels_path = global_model_paths(variant)
+    if not model_path.exists() or not levels_path.exists():
+        raise FileNotFoundError(f"❌ Global model not found: {model_path.resolve()}")
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    with open(levels_path, "r") as f:
+        levels = json.load(f)
+    return booster, levels
+
+
+@instrumented("04_train_xgboost.score_all_sites", rows=lambda result, args, kwargs: len(result))
+def score_all_sites(input_path, variant="global", chunksize=500_000, output_path=None) -> pd.DataFrame:
+    """
+    Predict every row (all sites) of a feature table, or a directory of partitions,
+    with the global model, streaming it in chunks.
+
+    Returns:
+        pd.DataFrame: timestamp, series ID columns and `predicted` (also written to `output_path`)
+    """
+    booster, levels = load_global_model(variant)
+    booster.set_param({"nthread": os.cpu_count()})
+    files = feature_partitions(input_path)
+    available = table_columns(files[0], resolve=False)
+    missing = [c for c in FEATURE_COLS + list(levels) if c not in available]
+    if missing:
+        raise ValueError(f"❌ Missing features in input data: {missing}")
+
+    parts = []
+    columns = ["timestamp"] + list(levels) + FEATURE_COLS
+    for path in files:
+        for chunk in iter_table(path, columns=columns, chunksize=chunksize, resolve=False):
+            predicted = booster.inplace_predict(global_features(chunk, levels))
+            parts.append(chunk[["timestamp"] + list(levels)].assign(predicted=predicted))
+    scores = pd.concat(parts, ignore_index=True)
+
+    output_path = output_path or Path(f"phase_2_modeling_pipeline/results/predictions/xgboost_scores_{variant}.csv")
+    output_path = write_table(scores, output_path)
+    logging.info(f"📈 Scored {len(scores)} rows for {scores[list(levels)].drop_duplicates().shape[0]} series: "
+                 f"{output_path.resolve()}")
+    return scores
+
+
+def feature_partitions(path) -> list:
+    """Feature files under `path`: the table itself, or every table file in a partition directory."""
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file() and p.suffix in SUFFIXES.values())
+    else:
+        files = [table_path(path)] if table_path(path).exists() else [path]
+    if not files or not files[0].exists():
+        raise FileNotFoundError(f"❌ No feature files found at: {path.resolve()}")
+    return files
+
+
+class FeatureChunkIter(xgb.DataIter):
+    """
+    Streams (features, target) chunks from feature files for external-memory training.
+
+    XGBoost calls `next` until it returns False, then `reset`, for every pass it
+    makes over the data; only the current chunk is held in memory. Rows before
+    `cutoff` are training rows; with `holdout=True` the rows from `cutoff` on
+    are streamed instead.
+    """
+
+    def __init__(self, files, levels: dict, cutoff, chunksize=500_000, holdout=False, cache_dir=None):
+        self.files = files
+        self.levels = levels
+        self.cutoff = pd.Timestamp(cutoff)
+        self.chunksize = chunksize
+        self.holdout = holdout
+        self.columns = ["timestamp", "energy_kWh"] + list(levels) + FEATURE_COLS
+        self._chunks = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, "xgb_cache") if cache_dir else None)
+
+    def chunks(self):
+        for path in self.files:
+            for chunk in iter_table(path, columns=self.columns, chunksize=self.chunksize, resolve=False):
+                test = pd.to_datetime(chunk["timestamp"]) >= self.cutoff
+                chunk = chunk[test if self.holdout else ~test].dropna(subset=FEATURE_COLS + ["energy_kWh"])
+                if len(chunk):
+                    yield chunk
+
+    def next(self, input_data) -> bool:
+        if self._chunks is None:
+            self._chunks = self.chunks()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        input_data(data=global_features(chunk, self.levels), label=chunk["energy_kWh"].to_numpy(dtype=np.float32))
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+@instrumented("04_train_xgboost.run_external_memory", rows=None)
+def run_external_memory(input_path, variant: str = "global", chunksize=500_000, n_jobs=None,
+                        num_boost_round=GLOBAL_ROUNDS) -> xgb.Booster:
+    """
+    Train the global model out of core from feature files.
+
+    Categorical levels and the distinct timestamps are collected in a first pass
+    that reads only the series ID and timestamp columns; the hold-out is the last
+    20% of timestamps across all files (see `holdout_cutoff`), as in `run_global`.
+    The quantile sketch and the histogram pages are then built from the streamed
+    training chunks, with pages cached in a temporary directory.
+
+    Parameters:
+        input_path: Feature table, or a directory of feature table partitions
+        chunksize (int): Rows per streamed chunk (bounds training memory)
+    """
+    files = feature_partitions(input_path)
+    cat_cols = [c for c in CATEGORICAL_COLS if c in table_columns(files[0], resolve=False)]
+    n_jobs = n_jobs or os.cpu_count()
+    logging.info(f"💽 Out-of-core XGBoost training ({variant}) from {len(files)} file(s), "
+                 f"{chunksize} rows per chunk, {n_jobs} threads")
+
+    levels, timestamps = {col: set() for col in cat_cols}, set()
+    for path in files:
+        for chunk in iter_table(path, columns=["timestamp"] + cat_cols, chunksize=chunksize, resolve=False):
+            timestamps.update(pd.to_datetime(chunk["timestamp"]).unique())
+            for col in cat_cols:
+                levels[col].update(chunk[col].astype(str).unique())
+    levels = {col: sorted(values) for col, values in levels.items()}
+    cutoff = holdout_cutoff(list(timestamps))
+    logging.info(f"   Holding out rows from {cutoff} on")
+
+    cache_dir = tempfile.mkdtemp(prefix="xgb_extmem_")
+    try:
+        with track("04_train_xgboost.extmem_dmatrix"):
+            dtrain = xgb.ExtMemQuantileDMatrix(
+                FeatureChunkIter(files, levels, cutoff, chunksize, cache_dir=cache_dir),
+                max_bin=GLOBAL_PARAMS["max_bin"], enable_categorical=True, nthread=n_jobs,
+            )
+        with track("04_train_xgboost.extmem_fit", rows=dtrain.num_row()):
+            booster = xgb.train(dict(GLOBAL_PARAMS, nthread=n_jobs), dtrain, num_boost_round=num_boost_round)
+        del dtrain
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    # Hold-out RMSE, streamed as well
+    squared_error, n_test = 0.0, 0
+    holdout = FeatureChunkIter(files, levels, cutoff, chunksize, holdout=True)
+    for chunk in holdout.chunks():
+        y_pred = booster.inplace_predict(global_features(chunk, levels))
+        squared_error += float(np.sum((chunk["energy_kWh"].to_numpy() - y_pred) ** 2))
+        n_test += len(chunk)
+    if n_test:
+        logging.info(f"📉 Out-of-core XGBoost RMSE: {sqrt(squared_error / n_test):.4f} ({n_test} hold-out rows)")
+
+    model_path, levels_path = global_model_paths(variant)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    booster.save_model(model_path)
+    with open(levels_path, "w") as f:
+        json.dump(levels, f, indent=2)
+    logging.info(f"✅ Model saved to: {model_path.resolve()}")
+    return booster
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="XGBoost training")
+    parser.add_argument("--global", dest="global_model", action="store_true",
+                        help="Fit one model across all sites with site/sector as categorical features")
+    parser.add_argument("--score", action="store_true", help="Score all sites with the saved global model")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Training threads for --global (default: CPU count)")
+    parser.add_argument("--external-memory", action="store_true",
+                        help="Train the global model out of core, streaming feature chunks")
+    parser.add_argument("--input", default=None,
+                        help="Feature table or directory of partitions for --external-memory / --score")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="Rows per streamed chunk")
+    parser.add_argument("--update", action="store_true",
+                        help="Continue boosting the saved model on feature rows newer than its last update")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    input_path = Path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
+    args = parse_cli_args()
+    input_path = table_path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
     variant = "mixed"
 
+    if args.input:
+        input_path = Path(args.input) if Path(args.input).is_dir() else table_path(args.input)
     if not input_path.exists():
         logging.error(f"❌ Feature-engineered file not found: {input_path.resolve()}")
         exit(1)
 
-    df_fe = pd.read_csv(input_path)
-    model = run(df_fe, variant=variant)
+    if args.external_memory:
+        run_external_memory(input_path, chunksize=args.chunksize, n_jobs=args.n_jobs)
+    elif args.update:
+        last_timestamp = load_state(variant)["last_timestamp"]
+        df_new = read_table(input_path, columns=["timestamp", "energy_kWh"] + FEATURE_COLS,
+                            filters=[("timestamp", ">", last_timestamp)])
+        update(df_new, variant=variant)
+    elif args.score:
+        score_all_sites(input_path, chunksize=args.chunksize)
+    elif args.global_model:
+        cat_cols = [c for c in CATEGORICAL_COLS if c in table_columns(input_path)]
+        df_fe = read_table(input_path, columns=["timestamp", "energy_kWh"] + cat_cols + FEATURE_COLS)
+        run_global(df_fe, n_jobs=args.n_jobs)
+    else:
+        df_fe = read_table(input_path, columns=["timestamp", "energy_kWh"] + FEATURE_COLS)
+        model = run(df_fe, variant=variant)
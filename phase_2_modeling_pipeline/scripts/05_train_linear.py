@@ -6,29 +6,43 @@
 Trains a Linear Regression model on feature-engineered data.
 Saves model and predictions (with timestamp).
 
+Next to the model, the least-squares sufficient statistics of the training
+rows (AᵀA and Aᵀy, with A = [1, X]) and the last timestamp seen are saved to
+`linear_model_{variant}.stats.npz`. With `--update`, only feature rows newer
+than that timestamp are read, their statistics are added, and the
+coefficients are re-solved from the 13x13 normal equations - O(new rows)
+without re-reading the history, and equal to refitting on all rows.
+
 Author: Mantas Valantinavicius
 """
 
 import pandas as pd
+import numpy as np
+import argparse
 import logging
 from pathlib import Path
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 from math import sqrt
+from storage import read_table, table_path, write_table
+from instrumentation import instrumented, track
 import pickle
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+FEATURE_COLS = [
+    'hour', 'day_of_week', 'month', 'is_weekend',
+    'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+    'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
+]
+
+@instrumented("05_train_linear.run")
 def run(df: pd.DataFrame, variant: str = "mixed") -> LinearRegression:
     logging.info(f"📐 Training Linear Regression model for variant: {variant}")
 
     target_col = "energy_kWh"
-    feature_cols = [
-        'hour', 'day_of_week', 'month', 'is_weekend',
-        'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
-        'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
-    ]
+    feature_cols = FEATURE_COLS
 
     df = df.dropna(subset=feature_cols + [target_col])
     df["timestamp"] = pd.to_datetime(df["timestamp"])
@@ -43,37 +57,129 @@ def run(df: pd.DataFrame, variant: str = "mixed") -> LinearRegression:
     )
 
     model = LinearRegression()
-    model.fit(X_train, y_train)
+    with track("05_train_linear.fit", rows=len(X_train)):
+        model.fit(X_train, y_train)
 
-    y_pred = model.predict(X_test)
+    with track("05_train_linear.predict", rows=len(X_test)):
+        y_pred = model.predict(X_test)
     rmse = sqrt(mean_squared_error(y_test, y_pred))
     logging.info(f"📉 Linear Regression RMSE: {rmse:.4f}")
 
     model_path = Path(f"phase_2_modeling_pipeline/models/linear_model_{variant}.pkl")
     model_path.parent.mkdir(parents=True, exist_ok=True)
+    save_stats(sufficient_stats(X_train, y_train), timestamps.max(), stats_path(variant))
     with open(model_path, "wb") as f:
         pickle.dump(model, f)
     logging.info(f"✅ Model saved to: {model_path.resolve()}")
 
-    pred_path = Path(f"phase_2_modeling_pipeline/results/predictions/linear_predictions_{variant}.csv")
     pred_df = pd.DataFrame({
         "timestamp": ts_test.values,
         "actual": y_test.values,
         "predicted": y_pred
     }).sort_values("timestamp")
-    pred_df.to_csv(pred_path, index=False)
+    pred_path = write_table(pred_df, Path(f"phase_2_modeling_pipeline/results/predictions/linear_predictions_{variant}.csv"))
     logging.info(f"📈 Predictions saved to: {pred_path.resolve()}")
 
     return model
 
 
+def stats_path(variant="mixed") -> Path:
+    return Path(f"phase_2_modeling_pipeline/models/linear_model_{variant}.stats.npz")
+
+
+def sufficient_stats(X, y) -> dict:
+    """AᵀA, Aᵀy and the row count, with A = [1, X] (the leading column carries the intercept)."""
+    A = np.column_stack([np.ones(len(X)), np.asarray(X, dtype=float)])
+    y = np.asarray(y, dtype=float)
+    return {"AtA": A.T @ A, "Aty": A.T @ y, "n": len(A)}
+
+
+def save_stats(stats: dict, last_timestamp, path: Path):
+    np.savez(path, AtA=stats["AtA"], Aty=stats["Aty"], n=stats["n"],
+             features=np.array(FEATURE_COLS), last_timestamp=str(pd.Timestamp(last_timestamp)))
+
+
+def load_stats(path: Path) -> tuple:
+    """Return (stats, last timestamp) saved by `save_stats`."""
+    if not path.exists():
+        raise FileNotFoundError(f"❌ Linear model statistics not found: {path.resolve()} (run a full training first)")
+    with np.load(path) as data:
+        if list(data["features"]) != FEATURE_COLS:
+            raise ValueError("❌ Saved statistics were built for a different feature list; run a full training")
+        stats = {"AtA": data["AtA"], "Aty": data["Aty"], "n": int(data["n"])}
+        return stats, pd.Timestamp(str(data["last_timestamp"]))
+
+
+def solve_coefficients(stats: dict) -> tuple:
+    """Least-squares (intercept, coefficients) from the normal equations."""
+    try:
+        beta = np.linalg.solve(stats["AtA"], stats["Aty"])
+    except np.linalg.LinAlgError:
+        # Collinear features: minimum-norm solution, as lstsq would give
+        beta = np.linalg.pinv(stats["AtA"]) @ stats["Aty"]
+    return beta[0], beta[1:]
+
+
+@instrumented("05_train_linear.update")
+def update(df_new: pd.DataFrame, variant: str = "mixed") -> LinearRegression:
+    """
+    Refresh the saved model with rows newer than its statistics, in O(new rows).
+
+    The logged RMSE before the update is out of sample (the model has not seen
+    the new rows); the one after is in-sample on the rows just added.
+
+    Returns:
+        LinearRegression: The updated model (also saved); unchanged when there are no new rows
+    """
+    model_path = Path(f"phase_2_modeling_pipeline/models/linear_model_{variant}.pkl")
+    stats, last_timestamp = load_stats(stats_path(variant))
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    df_new = df_new.dropna(subset=FEATURE_COLS + ["energy_kWh"])
+    df_new = df_new[pd.to_datetime(df_new["timestamp"]) > last_timestamp]
+    if df_new.empty:
+        logging.info(f"✅ No rows newer than {last_timestamp}; model unchanged.")
+        return model
+
+    X_new, y_new = df_new[FEATURE_COLS], df_new["energy_kWh"]
+    rmse_before = sqrt(mean_squared_error(y_new, model.predict(X_new)))
+
+    new = sufficient_stats(X_new, y_new)
+    stats = {key: stats[key] + new[key] for key in stats}
+    model.intercept_, model.coef_ = solve_coefficients(stats)
+    rmse_after = sqrt(mean_squared_error(y_new, model.predict(X_new)))
+    logging.info(f"🔁 Updated with {len(df_new)} new rows ({stats['n']} in total). "
+                 f"RMSE on new rows: {rmse_before:.4f} before (out of sample) -> {rmse_after:.4f} after (in-sample)")
+
+    with open(model_path, "wb") as f:
+        pickle.dump(model, f)
+    save_stats(stats, pd.to_datetime(df_new["timestamp"]).max(), stats_path(variant))
+    logging.info(f"✅ Model saved to: {model_path.resolve()}")
+    return model
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Linear Regression training")
+    parser.add_argument("--update", action="store_true",
+                        help="Refresh the saved model with feature rows newer than its last update")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    input_path = Path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
+    args = parse_cli_args()
+    input_path = table_path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
     variant = "mixed"
 
     if not input_path.exists():
         logging.error(f"❌ Feature-engineered file not found: {input_path.resolve()}")
         exit(1)
 
-    df_fe = pd.read_csv(input_path)
-    model = run(df_fe, variant=variant)
+    columns = ["timestamp", "energy_kWh"] + FEATURE_COLS
+    if args.update:
+        _, last_timestamp = load_stats(stats_path(variant))
+        df_new = read_table(input_path, columns=columns, filters=[("timestamp", ">", last_timestamp)])
+        model = update(df_new, variant=variant)
+    else:
+        df_fe = read_table(input_path, columns=columns)
+        model = run(df_fe, variant=variant)
@@ -4,92 +4,101 @@
 06_evaluate_models.py
 ----------------------
 Evaluates Prophet, XGBoost, and Linear models using RMSE, MAE, MAPE.
+Prediction tables are streamed in chunks through `metrics_engine`; also
+saves per-hour-of-day metrics (with pinball losses for Prophet's interval)
+and, for prediction tables with a `site_id` column, one summary per site
+under results/sites/<site_id>/ (used by the per-site reports of step 09).
 Saves summary CSV and shows a comparison plot.
 
 Author: Mantas Valantinavicius
 """
 
 import pandas as pd
-import numpy as np
 import logging
 from pathlib import Path
 import matplotlib.pyplot as plt
-from sklearn.metrics import mean_squared_error, mean_absolute_error
+from storage import read_table, table_columns
+from metrics_engine import PROPHET_QUANTILES, TruthIndex, evaluate_table
+from instrumentation import instrumented
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def load_predictions():
-    base = Path("phase_2_modeling_pipeline/results/predictions")
+RESULTS_DIR = Path("phase_2_modeling_pipeline/results")
+PREDICTIONS_DIR = RESULTS_DIR / "predictions"
+FEATURES_PATH = Path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
+SERIES_COL = "site_id"
+SUMMARY_COLS = ["model", "RMSE", "MAE", "MAPE"]
 
-    # Prophet (needs reformat)
-    prophet_path = base / "prophet_forecast_mixed.csv"
-    prophet_df = pd.read_csv(prophet_path)
-    prophet_df = prophet_df[["ds", "yhat"]].rename(columns={"ds": "timestamp", "yhat": "predicted"})
-    prophet_df["model"] = "Prophet"
+# (model, prediction table, prediction column, time column, quantile columns)
+MODEL_OUTPUTS = [
+    ("Prophet", PREDICTIONS_DIR / "prophet_forecast_mixed.csv", "yhat", "ds", PROPHET_QUANTILES),
+    ("XGBoost", PREDICTIONS_DIR / "xgboost_predictions_mixed.csv", "predicted", "timestamp", None),
+    ("Linear", PREDICTIONS_DIR / "linear_predictions_mixed.csv", "predicted", "timestamp", None),
+]
 
-    # XGBoost
-    xgb_path = base / "xgboost_predictions_mixed.csv"
-    xgb_df = pd.read_csv(xgb_path)
-    xgb_df["model"] = "XGBoost"
 
-    # Linear
-    linear_path = base / "linear_predictions_mixed.csv"
-    lin_df = pd.read_csv(linear_path)
-    lin_df["model"] = "Linear"
-
-    return prophet_df, xgb_df, lin_df
-
-
-def evaluate(y_true, y_pred):
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-    mae = mean_absolute_error(y_true, y_pred)
-
-    # Filter out zero values to avoid division by zero in MAPE
-    non_zero_mask = y_true != 0
-    if non_zero_mask.sum() == 0:
-        mape = np.nan  # or 0.0
-    else:
-        mape = np.mean(np.abs((y_true[non_zero_mask] - y_pred[non_zero_mask]) / y_true[non_zero_mask])) * 100
-
-    return rmse, mae, mape
-
-
-
-def run_evaluation():
+@instrumented("06_evaluate_models.run_evaluation", rows=None)
+def run_evaluation(chunksize=100_000):
     logging.info("🔎 Evaluating all models...")
-
-    prophet_df, xgb_df, lin_df = load_predictions()
-
-    results = []
-
-    # Prophet: we can’t compare directly unless we have ground truth
-    prophet_truth = pd.read_csv("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
-    prophet_truth = prophet_truth[["timestamp", "energy_kWh"]].rename(columns={"energy_kWh": "actual"})
-    merged_prophet = pd.merge(prophet_df, prophet_truth, on="timestamp", how="inner")
-
-    for name, df in [("Prophet", merged_prophet), ("XGBoost", xgb_df), ("Linear", lin_df)]:
-        y_true = df["actual"]
-        y_pred = df["predicted"]
-        rmse, mae, mape = evaluate(y_true, y_pred)
-        results.append({"model": name, "RMSE": rmse, "MAE": mae, "MAPE": mape})
+    panel = SERIES_COL in table_columns(FEATURES_PATH)
+
+    overall, by_hour, by_site = [], [], []
+    for name, path, pred_col, time_col, quantile_cols in MODEL_OUTPUTS:
+        per_site = panel and SERIES_COL in table_columns(path)
+        series_cols = [SERIES_COL] if per_site else []
+
+        truth = None
+        if name == "Prophet":
+            # Prophet only outputs predictions, so its actuals are looked up by epoch timestamp
+            truth = TruthIndex(read_table(FEATURES_PATH, columns=["timestamp", "energy_kWh"] + series_cols),
+                               series_cols=series_cols)
+
+        acc = evaluate_table(path, pred_col=pred_col, time_col=time_col, truth=truth,
+                             group_by=["hour"] + series_cols, quantile_cols=quantile_cols, chunksize=chunksize)
+        overall.append(acc.result([]).assign(model=name))
+        by_hour.append(acc.result(["hour"]).assign(model=name))
+        if per_site:
+            by_site.append(acc.result(series_cols).assign(model=name))
 
     # Save results
-    results_df = pd.DataFrame(results)
-    output_path = Path("phase_2_modeling_pipeline/results/model_evaluation_summary.csv")
+    results_df = pd.concat(overall, ignore_index=True)[SUMMARY_COLS]
+    output_path = RESULTS_DIR / "model_evaluation_summary.csv"
     results_df.to_csv(output_path, index=False)
     logging.info(f"📄 Evaluation summary saved: {output_path.resolve()}")
 
+    by_hour_df = pd.concat(by_hour, ignore_index=True)
+    by_hour_df = by_hour_df[["model"] + [c for c in by_hour_df.columns if c != "model"]]
+    by_hour_path = RESULTS_DIR / "model_evaluation_by_hour.csv"
+    by_hour_df.to_csv(by_hour_path, index=False)
+    logging.info(f"📄 Per-hour metrics saved: {by_hour_path.resolve()}")
+
+    if by_site:
+        save_site_summaries(pd.concat(by_site, ignore_index=True))
+
     # Plot bar chart
-    results_df.set_index("model")[["RMSE", "MAE", "MAPE"]].plot.bar(figsize=(10, 5))
-    plt.title("Model Comparison: RMSE, MAE, MAPE")
-    plt.ylabel("Error")
-    plt.xticks(rotation=0)
-    plt.tight_layout()
-    plt.savefig("phase_2_modeling_pipeline/results/model_comparison_chart.png")
-    plt.show()
+    ax = results_df.set_index("model")[["RMSE", "MAE", "MAPE"]].plot.bar(figsize=(10, 5), rot=0)
+    ax.set_title("Model Comparison: RMSE, MAE, MAPE")
+    ax.set_ylabel("Error")
+    ax.figure.tight_layout()
+    chart_path = RESULTS_DIR / "model_comparison_chart.png"
+    ax.figure.savefig(chart_path)
+    plt.close(ax.figure)
+    logging.info(f"📊 Comparison chart saved: {chart_path.resolve()}")
 
     return results_df
 
 
+def save_site_summaries(by_site: pd.DataFrame) -> list:
+    """Write one `model_evaluation_summary.csv` per site, in the layout of the overall summary."""
+    paths = []
+    for site, group in by_site.groupby(SERIES_COL, sort=True):
+        site_dir = RESULTS_DIR / "sites" / str(site)
+        site_dir.mkdir(parents=True, exist_ok=True)
+        group[SUMMARY_COLS].to_csv(site_dir / "model_evaluation_summary.csv", index=False)
+        paths.append(site_dir / "model_evaluation_summary.csv")
+    logging.info(f"📄 Per-site summaries saved for {len(paths)} sites under: {(RESULTS_DIR / 'sites').resolve()}")
+    return paths
+
+
 if __name__ == "__main__":
     run_evaluation()
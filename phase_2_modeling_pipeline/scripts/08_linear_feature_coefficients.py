@@ -8,11 +8,10 @@ Visualizes feature coefficients from the trained Linear Regression model.
 Author: Mantas Valantinavicius
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
 import pickle
 from pathlib import Path
 import logging
+from render_plots import render_linear_coefficients
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -30,28 +29,11 @@ def plot_linear_coefficients(model_path, features, variant="mixed"):
     with open(model_path, "rb") as f:
         model = pickle.load(f)
 
-    coeffs = model.coef_
-
-    # Create DataFrame
-    df = pd.DataFrame({
-        "feature": features,
-        "coefficient": coeffs
-    }).sort_values("coefficient", ascending=True)
-
-    # Plot
-    plt.figure(figsize=(10, 6))
-    plt.barh(df["feature"], df["coefficient"], color="orange")
-    plt.axvline(0, color="black", linewidth=1)
-    plt.title("Linear Regression Feature Coefficients")
-    plt.xlabel("Coefficient Value")
-    plt.tight_layout()
-
     # Save plot
-    plot_path = Path("phase_2_modeling_pipeline/results/plots/linear_feature_coefficients.png")
-    plot_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(plot_path)
+    plot_path = render_linear_coefficients(
+        features, model.coef_,
+        Path("phase_2_modeling_pipeline/results/plots/linear_feature_coefficients.png"))
     logging.info(f"🖼 Feature coefficients plot saved to: {plot_path.resolve()}")
-    plt.show()
 
 
 if __name__ == "__main__":
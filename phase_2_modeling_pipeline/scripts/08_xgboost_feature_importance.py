@@ -3,16 +3,15 @@
 """
 08_xgboost_feature_importance.py
 ---------------------------------
-Displays and saves a bar chart of XGBoost feature importances.
+Saves a bar chart of XGBoost feature importances.
 
 Author: Mantas Valantinavicius
 """
 
 import xgboost as xgb
-import matplotlib.pyplot as plt
 from pathlib import Path
 import logging
-import pandas as pd
+from render_plots import render_feature_importance
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -30,27 +29,11 @@ def plot_feature_importance(model_path, features, variant="mixed"):
     model = xgb.XGBRegressor()
     model.load_model(model_path)
 
-    importances = model.feature_importances_
-
-    # Pair with feature names
-    fi_df = pd.DataFrame({
-        "feature": features,
-        "importance": importances
-    }).sort_values("importance", ascending=True)
-
-    # Plot
-    plt.figure(figsize=(10, 6))
-    plt.barh(fi_df["feature"], fi_df["importance"], color="skyblue")
-    plt.xlabel("Importance Score")
-    plt.title("XGBoost Feature Importance")
-    plt.tight_layout()
-
     # Save
-    plot_path = Path("phase_2_modeling_pipeline/results/plots/xgboost_feature_importance.png")
-    plot_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(plot_path)
+    plot_path = render_feature_importance(
+        features, model.feature_importances_,
+        Path("phase_2_modeling_pipeline/results/plots/xgboost_feature_importance.png"))
     logging.info(f"🖼 Feature importance plot saved to: {plot_path.resolve()}")
-    plt.show()
 
 
 if __name__ == "__main__":
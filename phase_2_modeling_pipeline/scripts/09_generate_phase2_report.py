@@ -6,20 +6,36 @@
 Generates a metric-system-compliant .docx report for Phase 2 evaluation,
 now including feature descriptions.
 
+Sections are cached as fragment documents and only rebuilt when their
+inputs change; `--sites` also builds one report per site in parallel. After a
+run, fragments it did not use are pruned to the most recently used few per
+section.
+
 Author: Mantas Valantinavicius
 """
 
 from docx import Document
+from docx.oxml.ns import qn
 from docx.shared import Inches
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
 from pathlib import Path
 import pandas as pd
+import argparse
+import hashlib
+import io
 import logging
+import os
+import time
+from instrumentation import instrumented
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 RESULTS_DIR = Path("phase_2_modeling_pipeline/results")
 PLOTS_DIR = RESULTS_DIR / "plots"
 REPORT_PATH = RESULTS_DIR / "Phase2_Model_Evaluation_Report.docx"
+FRAGMENT_CACHE_DIR = Path("phase_2_modeling_pipeline/.cache/report_fragments")
+MAX_STALE_FRAGMENTS_PER_SECTION = 5
 
 FEATURES = [
     ("hour", "Hour of the day (0–23)", "Integer", "Captures daily consumption patterns"),
@@ -49,25 +65,30 @@ def add_image(doc, image_path, width_inches=6, caption=None):
     else:
         doc.add_paragraph(f"⚠ Image not found: {image_path}")
 
+def add_table(doc, header, rows, style="Light Grid"):
+    """Create the table at its final size and fill all cells from one flat cell list."""
+    table = doc.add_table(rows=len(rows) + 1, cols=len(header))
+    table.style = style
+    cells = table._cells  # computed once, instead of per-row `.cells` lookups
+    n_cols = len(header)
+    for i, text in enumerate(header):
+        cells[i].text = text
+    for r, row in enumerate(rows, start=1):
+        for c, text in enumerate(row):
+            cells[r * n_cols + c].text = text
+    return table
+
 def add_evaluation_table(doc, csv_path):
     if not csv_path.exists():
         doc.add_paragraph("⚠ Evaluation summary not found.")
         return
 
     df = pd.read_csv(csv_path)
-    table = doc.add_table(rows=1, cols=len(df.columns))
-    table.style = 'Light Grid'
-
-    # Header
-    hdr_cells = table.rows[0].cells
-    for i, col in enumerate(df.columns):
-        hdr_cells[i].text = col
-
-    # Rows
-    for _, row in df.iterrows():
-        cells = table.add_row().cells
-        for i, value in enumerate(row):
-            cells[i].text = f"{value:.4f}" if isinstance(value, float) else str(value)
+    formatted = pd.DataFrame({
+        col: df[col].map("{:.4f}".format) if pd.api.types.is_float_dtype(df[col]) else df[col].astype(str)
+        for col in df.columns
+    })
+    add_table(doc, list(df.columns), formatted.to_numpy().tolist())
 
     doc.add_paragraph("Note: All error metrics (RMSE, MAE, MAPE) are reported in kilowatt-hours (kWh).")
 
@@ -75,30 +96,23 @@ def add_feature_description_table(doc):
     add_heading(doc, "2.1 Feature Descriptions", level=2)
     add_paragraph(doc, "The following table summarizes all engineered input features used in model training:")
 
-    table = doc.add_table(rows=1, cols=4)
-    table.style = "Light Grid"
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "Feature Name"
-    hdr_cells[1].text = "Description"
-    hdr_cells[2].text = "Unit / Type"
-    hdr_cells[3].text = "Purpose in Model"
-
-    for feature, desc, unit, purpose in FEATURES:
-        row = table.add_row().cells
-        row[0].text = feature
-        row[1].text = desc
-        row[2].text = unit
-        row[3].text = purpose
-
-def generate_report():
-    doc = Document()
+    add_table(doc, ["Feature Name", "Description", "Unit / Type", "Purpose in Model"], FEATURES)
+
 
-    # Title
-    doc.add_heading("Phase 2: Model Evaluation Report", level=0)
+# ── Report sections ──────────────────────────────────────────────────────────
+# Each section is built into its own fragment document, cached under a key of
+# this module's source, the builder, its parameters and input file contents,
+# then copied into the final report. Only sections whose inputs changed are
+# rebuilt; any edit to this file (a builder, a helper such as `add_table`, or
+# FEATURES) rebuilds them all.
+
+def build_title(doc, site=None):
+    title = "Phase 2: Model Evaluation Report" + (f" – Site {site}" if site is not None else "")
+    doc.add_heading(title, level=0)
     doc.add_paragraph("Author: Mantas Valantinavicius")
     doc.add_paragraph("Date: Auto-generated")
 
-    # Overview
+def build_overview(doc):
     add_heading(doc, "1. Project Overview")
     add_paragraph(doc, (
         "This report summarizes the results of Phase 2 of the energy forecasting dashboard project. "
@@ -107,7 +121,7 @@ def generate_report():
         "temperature in degrees Celsius (°C), and time in hourly intervals."
     ))
 
-    # Methodology
+def build_methodology(doc):
     add_heading(doc, "2. Methodology")
     add_paragraph(doc, (
         "The synthetic dataset was enriched with temporal, cyclical, and lag-based features. "
@@ -115,29 +129,27 @@ def generate_report():
         "XGBoost was configured with 100 estimators and a maximum depth of 5. Prophet included daily and weekly seasonality. "
         "Linear Regression was used as a baseline model for comparison."
     ))
-
-    # NEW SECTION: Feature Descriptions
     add_feature_description_table(doc)
 
-    # Evaluation Table
+def build_performance(doc, csv_path):
     add_heading(doc, "3. Model Performance Summary")
-    add_evaluation_table(doc, RESULTS_DIR / "model_evaluation_summary.csv")
+    add_evaluation_table(doc, csv_path)
 
-    # Prediction Visuals
+def build_prediction_plots(doc, plots_dir):
     add_heading(doc, "4. Actual vs Predicted Plots")
     add_paragraph(doc, "Note: All vertical axes represent energy use in kilowatt-hours (kWh).")
     for model in ["prophet", "xgboost", "linear"]:
-        add_image(doc, PLOTS_DIR / f"{model}_prediction_plot.png", caption=f"{model.title()} model predictions")
+        add_image(doc, plots_dir / f"{model}_prediction_plot.png", caption=f"{model.title()} model predictions")
 
-    # XGBoost Feature Importance
+def build_feature_importance(doc):
     add_heading(doc, "5. Feature Importance (XGBoost)")
     add_image(doc, PLOTS_DIR / "xgboost_feature_importance.png", caption="Relative importance of each feature")
 
-    # Linear Regression Coefficients
+def build_coefficients(doc):
     add_heading(doc, "6. Feature Coefficients (Linear Regression)")
     add_image(doc, PLOTS_DIR / "linear_feature_coefficients.png", caption="Signed influence of each input feature")
 
-    # Prophet Internals
+def build_prophet_components(doc):
     add_heading(doc, "7. Prophet Model Components")
     add_image(doc, PLOTS_DIR / "prophet_components_plot.png", caption="Prophet trend and daily seasonality components")
     add_paragraph(doc, (
@@ -145,7 +157,7 @@ def generate_report():
         "These cycles reflect typical human activity patterns, such as energy use peaks during working hours."
     ))
 
-    # Conclusion
+def build_conclusion(doc):
     add_heading(doc, "8. Conclusion")
     add_paragraph(doc, (
         "Among the evaluated models, XGBoost produced the best performance, achieving the lowest error across all metrics. "
@@ -155,10 +167,133 @@ def generate_report():
         "All models were trained and assessed using metric units for real-world applicability."
     ))
 
+def report_sections(site=None) -> list:
+    """(builder, params, input files) per section; site reports use that site's summary and prediction plots."""
+    site_dir = RESULTS_DIR / "sites" / str(site) if site is not None else RESULTS_DIR
+    plots_dir = PLOTS_DIR / "sites" / str(site) if site is not None else PLOTS_DIR
+    summary = site_dir / "model_evaluation_summary.csv"
+    return [
+        (build_title, {"site": site}, []),
+        (build_overview, {}, []),
+        (build_methodology, {}, []),
+        (build_performance, {"csv_path": summary}, [summary]),
+        (build_prediction_plots, {"plots_dir": plots_dir},
+         [plots_dir / f"{m}_prediction_plot.png" for m in ["prophet", "xgboost", "linear"]]),
+        (build_feature_importance, {}, [PLOTS_DIR / "xgboost_feature_importance.png"]),
+        (build_coefficients, {}, [PLOTS_DIR / "linear_feature_coefficients.png"]),
+        (build_prophet_components, {}, [PLOTS_DIR / "prophet_components_plot.png"]),
+        (build_conclusion, {}, []),
+    ]
+
+MODULE_SOURCE_HASH = hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+def section_key(builder, params, inputs) -> str:
+    digest = hashlib.sha256(MODULE_SOURCE_HASH)
+    digest.update(builder.__name__.encode())
+    digest.update(repr(sorted((k, str(v)) for k, v in params.items())).encode())
+    for path in inputs:
+        digest.update(str(path).encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest() if path.exists() else b"missing")
+    return digest.hexdigest()
+
+def get_fragment(builder, params, inputs):
+    """Return the section's fragment document, building and caching it on a miss."""
+    path = FRAGMENT_CACHE_DIR / f"{builder.__name__}_{section_key(builder, params, inputs)}.docx"
+    if path.exists():
+        os.utime(path)  # marks the fragment as used, see `prune_fragments`
+        return Document(str(path))
+
+    fragment = Document()
+    builder(fragment, **params)
+    FRAGMENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    fragment.save(str(tmp_path))
+    os.replace(tmp_path, path)  # atomic, so parallel site reports never read a partial fragment
+    return fragment
+
+def prune_fragments(since: float) -> int:
+    """
+    Delete fragments not used since `since` (a `time.time()` value), keeping the
+    `MAX_STALE_FRAGMENTS_PER_SECTION` most recently used ones per section, as
+    pipeline.py keeps a bounded number of cache entries per stage.
+
+    Returns:
+        int: Number of files removed
+    """
+    since -= 1  # filesystem timestamps can lag the clock slightly
+    by_section, removed = {}, 0
+    for path in FRAGMENT_CACHE_DIR.glob("*"):
+        mtime = path.stat().st_mtime
+        if path.suffix == ".docx":
+            by_section.setdefault(path.stem.rsplit("_", 1)[0], []).append((mtime, path))
+        elif mtime < since:  # temp file left by an interrupted run
+            path.unlink(missing_ok=True)
+            removed += 1
+    for entries in by_section.values():
+        stale = sorted((entry for entry in entries if entry[0] < since), reverse=True)
+        for _, path in stale[MAX_STALE_FRAGMENTS_PER_SECTION:]:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+def append_fragment(doc, fragment):
+    """Copy a fragment's body into `doc`, re-embedding its images in `doc`'s package."""
+    body = doc.element.body
+    for element in fragment.element.body:
+        if element.tag == qn("w:sectPr"):
+            continue
+        element = deepcopy(element)
+        for blip in element.iter(qn("a:blip")):
+            image_part = fragment.part.related_parts[blip.get(qn("r:embed"))]
+            r_id, _ = doc.part.get_or_add_image(io.BytesIO(image_part.blob))
+            blip.set(qn("r:embed"), r_id)
+        body.sectPr.addprevious(element) if body.sectPr is not None else body.append(element)
+
+@instrumented("09_generate_phase2_report.generate_report", rows=None)
+def generate_report(site=None, report_path=None):
+    doc = Document()
+    for builder, params, inputs in report_sections(site):
+        append_fragment(doc, get_fragment(builder, params, inputs))
+
+    # Drawing ids must be unique within the document once fragments are combined
+    for i, doc_pr in enumerate(doc.element.body.iter(qn("wp:docPr")), start=1):
+        doc_pr.set("id", str(i))
+
     # Save
-    doc.save(REPORT_PATH)
-    logging.info(f"📄 Metric system report with feature descriptions saved: {REPORT_PATH.resolve()}")
+    report_path = Path(report_path or REPORT_PATH)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(report_path)
+    logging.info(f"📄 Metric system report with feature descriptions saved: {report_path.resolve()}")
+    return report_path
+
+def site_report_path(site) -> Path:
+    return RESULTS_DIR / "reports" / f"Phase2_Model_Evaluation_Report_site_{site}.docx"
+
+def generate_site_reports(sites, workers=None) -> list:
+    """One report per site in a process pool; sections shared by all sites are built once."""
+    sites = list(sites)
+    if not sites:
+        return []
+    paths = [generate_report(sites[0], site_report_path(sites[0]))]  # warms the shared fragments
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        paths += list(pool.map(generate_report, sites[1:], [site_report_path(s) for s in sites[1:]]))
+    return paths
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Generate the Phase 2 evaluation report(s)")
+    parser.add_argument("--sites", nargs="*", default=None,
+                        help="Also build one report per site; without values, every site under results/plots/sites/")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for per-site reports")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_cli_args()
+    started = time.time()
     generate_report()
+    if args.sites is not None:
+        sites = args.sites or sorted(p.name for p in (PLOTS_DIR / "sites").glob("*") if p.is_dir())
+        generate_site_reports(sites, args.workers)
+    removed = prune_fragments(started)
+    if removed:
+        logging.info(f"🧹 Pruned {removed} stale report fragments from {FRAGMENT_CACHE_DIR.resolve()}")
@@ -12,6 +12,8 @@ import shutil
 import json
 from pathlib import Path
 import logging
+from storage import table_path
+from instrumentation import instrumented
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -21,7 +23,7 @@ DEPLOY_DIR.mkdir(parents=True, exist_ok=True)
 
 # Define paths
 model_src = Path(f"phase_2_modeling_pipeline/models/xgboost_model_{VARIANT}.json")
-pred_src = Path(f"phase_2_modeling_pipeline/results/predictions/xgboost_predictions_{VARIANT}.csv")
+pred_src = table_path(f"phase_2_modeling_pipeline/results/predictions/xgboost_predictions_{VARIANT}.csv")
 eval_src = Path("phase_2_modeling_pipeline/results/model_evaluation_summary.csv")
 
 model_dst = DEPLOY_DIR / model_src.name
@@ -47,6 +49,7 @@ def export_requirements():
         f.write("xgboost\npandas\nnumpy\nscikit-learn\n")
     logging.info(f"📦 Created basic requirements.txt: {req_path.resolve()}")
 
+@instrumented("10_export_production_bundle.run", rows=None)
 def run():
     # Copy files
     shutil.copy2(model_src, model_dst)
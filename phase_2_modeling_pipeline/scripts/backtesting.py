@@ -0,0 +1,185 @@
+# phase_2_modeling_pipeline/scripts/backtesting.py
+
+"""
+backtesting.py
+---------------
+Time-ordered rolling-origin backtesting for the XGBoost and Linear models.
+
+`04_train_xgboost.py` and `05_train_linear.py` evaluate on a shuffled split,
+so test hours are surrounded by training hours. Here every fold trains only on
+data before its test window (expanding or sliding window). The feature matrix
+is placed in shared memory once and fold workers in a process pool attach to it
+instead of receiving a pickled copy each.
+
+Usage:
+    python backtesting.py --models xgboost linear --folds 5 --test-size 720 --mode expanding
+
+Author: Mantas Valantinavicius
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.linear_model import LinearRegression
+
+from storage import read_table
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+FEATURE_COLS = [
+    'hour', 'day_of_week', 'month', 'is_weekend',
+    'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+    'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
+]
+RESULTS_DIR = Path("phase_2_modeling_pipeline/results")
+
+# Set in each worker by `_attach_shared`
+_shared = {}
+
+
+def time_splits(n_rows: int, n_folds: int, test_size: int, mode: str = "expanding",
+                train_size: int = None, gap: int = 0) -> list:
+    """
+    Rolling-origin splits over time-ordered rows; the last fold ends at the last row.
+
+    Parameters:
+        mode (str): "expanding" trains on everything before the test window,
+            "sliding" on the `train_size` rows before it
+        gap (int): Rows skipped between train and test (e.g. 24 to drop lag overlap)
+
+    Returns:
+        list[tuple]: (train_start, train_end, test_start, test_end) row bounds per fold
+    """
+    if mode not in ("expanding", "sliding"):
+        raise ValueError(f"Unknown mode '{mode}'. Use 'expanding' or 'sliding'.")
+    if mode == "sliding" and not train_size:
+        raise ValueError("'sliding' mode requires train_size")
+
+    splits = []
+    for k in range(n_folds):
+        test_end = n_rows - (n_folds - 1 - k) * test_size
+        test_start = test_end - test_size
+        train_end = test_start - gap
+        train_start = 0 if mode == "expanding" else max(0, train_end - train_size)
+        if train_end - train_start <= 0:
+            raise ValueError(f"❌ Fold {k} has no training rows; reduce folds or test size")
+        splits.append((train_start, train_end, test_start, test_end))
+    return splits
+
+
+def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    """RMSE, MAE and MAPE (zeros excluded), as in `metrics_engine.MetricAccumulator`."""
+    err = y_true - y_pred
+    non_zero = y_true != 0
+    mape = np.mean(np.abs(err[non_zero] / y_true[non_zero])) * 100 if non_zero.any() else np.nan
+    return {"RMSE": float(np.sqrt(np.mean(err ** 2))), "MAE": float(np.mean(np.abs(err))), "MAPE": float(mape)}
+
+
+def make_model(name: str):
+    if name == "xgboost":
+        # One thread per fold: parallelism comes from running folds side by side
+        return xgb.XGBRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42, n_jobs=1)
+    if name == "linear":
+        return LinearRegression()
+    raise ValueError(f"Unknown model '{name}'. Use 'xgboost' or 'linear'.")
+
+
+def _attach_shared(x_name, y_name, shape):
+    """Process-pool initializer: map the shared feature matrix and target into this worker."""
+    x_shm = shared_memory.SharedMemory(name=x_name)
+    y_shm = shared_memory.SharedMemory(name=y_name)
+    _shared["handles"] = (x_shm, y_shm)
+    _shared["X"] = np.ndarray(shape, dtype=np.float64, buffer=x_shm.buf)
+    _shared["y"] = np.ndarray(shape[0], dtype=np.float64, buffer=y_shm.buf)
+
+
+def _run_fold(task) -> dict:
+    model_name, fold, (train_start, train_end, test_start, test_end) = task
+    X, y = _shared["X"], _shared["y"]
+
+    start = time.perf_counter()
+    model = make_model(model_name)
+    model.fit(X[train_start:train_end], y[train_start:train_end])
+    y_pred = model.predict(X[test_start:test_end])
+
+    return {
+        "model": model_name, "fold": fold,
+        "train_rows": train_end - train_start, "test_rows": test_end - test_start,
+        "train_start": train_start, "test_start": test_start,
+        **compute_metrics(y[test_start:test_end], y_pred),
+        "fit_seconds": time.perf_counter() - start,
+    }
+
+
+def run_backtest(df: pd.DataFrame, models=("xgboost", "linear"), n_folds=5, test_size=720,
+                 mode="expanding", train_size=None, gap=0, workers=None) -> tuple:
+    """
+    Backtest each model over rolling-origin folds in a process pool.
+
+    Returns:
+        tuple: (per-fold results, per-model aggregate) DataFrames
+    """
+    df = df.dropna(subset=FEATURE_COLS + ["energy_kWh"]).sort_values("timestamp").reset_index(drop=True)
+    X = df[FEATURE_COLS].to_numpy(dtype=np.float64)
+    y = df["energy_kWh"].to_numpy(dtype=np.float64)
+    splits = time_splits(len(df), n_folds, test_size, mode, train_size, gap)
+
+    x_shm = shared_memory.SharedMemory(create=True, size=X.nbytes)
+    y_shm = shared_memory.SharedMemory(create=True, size=y.nbytes)
+    try:
+        np.ndarray(X.shape, dtype=X.dtype, buffer=x_shm.buf)[:] = X
+        np.ndarray(y.shape, dtype=y.dtype, buffer=y_shm.buf)[:] = y
+
+        tasks = [(m, k, split) for m in models for k, split in enumerate(splits)]
+        workers = min(workers or os.cpu_count(), len(tasks))
+        logging.info(f"🧪 Backtesting {list(models)} over {n_folds} {mode} folds with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared,
+                                 initargs=(x_shm.name, y_shm.name, X.shape)) as pool:
+            folds = pd.DataFrame(list(pool.map(_run_fold, tasks)))
+    finally:
+        x_shm.close()
+        x_shm.unlink()
+        y_shm.close()
+        y_shm.unlink()
+
+    folds["test_from"] = df["timestamp"].to_numpy()[folds["test_start"]]
+    summary = folds.groupby("model")[["RMSE", "MAE", "MAPE"]].agg(["mean", "std"])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    return folds, summary.reset_index()
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest")
+    parser.add_argument("--models", nargs="+", default=["xgboost", "linear"], choices=["xgboost", "linear"])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-size", type=int, default=720, help="Rows per test window (720 = 30 days hourly)")
+    parser.add_argument("--mode", choices=["expanding", "sliding"], default="expanding")
+    parser.add_argument("--train-size", type=int, default=None, help="Rows per training window in sliding mode")
+    parser.add_argument("--gap", type=int, default=0, help="Rows left out between train and test windows")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--variant", default="mixed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli_args()
+    df_fe = read_table(f"phase_2_modeling_pipeline/data/processed/feature_engineered_{args.variant}.csv",
+                       columns=["timestamp", "energy_kWh"] + FEATURE_COLS)
+
+    folds, summary = run_backtest(df_fe, args.models, args.folds, args.test_size, args.mode,
+                                  args.train_size, args.gap, args.workers)
+
+    folds_path = RESULTS_DIR / f"backtest_folds_{args.variant}.csv"
+    summary_path = RESULTS_DIR / f"backtest_summary_{args.variant}.csv"
+    folds.to_csv(folds_path, index=False)
+    summary.to_csv(summary_path, index=False)
+    logging.info(f"\n{summary.to_string(index=False)}")
+    logging.info(f"📄 Backtest results saved: {folds_path.resolve()}, {summary_path.resolve()}")
@@ -0,0 +1,383 @@
+# phase_2_modeling_pipeline/scripts/benchmark.py
+
+"""
+benchmark.py
+-------------
+Benchmark suite for the data generator, feature engineering, the three
+trainers and the deployed inference paths, at scaled data sizes.
+
+For every scale (number of sites x years of hourly data) the suite
+    1. generates the fleet with `synthetic_data_generator_v2.generate_dataset`
+       (one call per site, via `generate_site`),
+    2. runs `02_feature_engineering.run` on the combined frame (panel mode, per site),
+    3. runs `03_train_prophet.run`, `04_train_xgboost.run` and `05_train_linear.run`,
+    4. predicts with `deployment_ready/predict_from_input.py` through
+       `predict_array`, `predict_frame`, `predict_records` and `predict_from_csv`.
+
+Each case is timed with `instrumentation.track` (wall, CPU, peak RSS) over
+`--repeats` runs; nested steps recorded by the scripts themselves (model fit /
+predict, table writes) are kept per case. Trainers write their models and
+predictions into a temporary directory, never into the repository; it is
+removed when the run ends. A case that raises is logged as an error, stored
+with status "error" and makes the script exit with 1.
+
+Prophet fits a single series, so it is benchmarked on the first site only;
+`predict_records` and `predict_from_csv` are capped at RECORD_ROWS_LIMIT rows.
+
+Results are stored as JSON under results/benchmarks/, tagged with the git
+commit, so runs across commits can be compared:
+
+Usage (from the repository root):
+    python phase_2_modeling_pipeline/scripts/benchmark.py                       # small scales
+    python phase_2_modeling_pipeline/scripts/benchmark.py --scales 1x1y 100x1y 1000x5y
+    python phase_2_modeling_pipeline/scripts/benchmark.py --only 02_feature_engineering 04_train_xgboost
+    python phase_2_modeling_pipeline/scripts/benchmark.py --compare phase_2_modeling_pipeline/results/benchmarks/<old>.json
+
+Author: Mantas Valantinavicius
+"""
+
+import argparse
+import copy
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import METRICS_PATH_ENV, track
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parents[1]
+GENERATOR_PATH = REPO_ROOT / "scripts" / "synthetic_data_generator_v2.py"
+GENERATOR_CONFIG = REPO_ROOT / "scripts" / "config" / "synthetic_config.yaml"
+PREDICT_PATH = REPO_ROOT / "phase_2_modeling_pipeline" / "deployment_ready" / "predict_from_input.py"
+RESULTS_DIR = REPO_ROOT / "phase_2_modeling_pipeline" / "results" / "benchmarks"
+
+# name -> (sites, years)
+SCALES = {
+    "1x1y": (1, 1),
+    "10x1y": (10, 1),
+    "100x1y": (100, 1),
+    "100x5y": (100, 5),
+    "1000x1y": (1000, 1),
+    "1000x5y": (1000, 5),
+}
+DEFAULT_SCALES = ["1x1y", "10x1y"]
+
+BENCHMARKS = [
+    "generate_dataset",
+    "02_feature_engineering",
+    "03_train_prophet",
+    "04_train_xgboost",
+    "05_train_linear",
+    "predict_array",
+    "predict_frame",
+    "predict_records",
+    "predict_from_csv",
+]
+# Row-at-a-time inputs (dicts, CSV text) are built from at most this many rows
+RECORD_ROWS_LIMIT = 100_000
+# A case counts as a regression when its median wall time grows by more than this fraction
+REGRESSION_THRESHOLD = 0.10
+
+
+def load_module(path: Path, name=None):
+    """Import a script by file path (the numbered scripts are not valid module names)."""
+    spec = importlib.util.spec_from_file_location(name or path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def environment_info() -> dict:
+    """Commit and library versions the results were produced with."""
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    import sklearn
+    import xgboost as xgb
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "xgboost": xgb.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def generate_fleet_frame(generator, config: dict, sites: int, years: int) -> pd.DataFrame:
+    """All sites of one scale as a single frame, generated in this process."""
+    config = copy.deepcopy(config)
+    config["days"] = 365 * years
+    config["fleet"] = dict(config.get("fleet") or {}, n_sites=sites)
+    specs = generator.build_fleet_specs(config)
+    return pd.concat([generator.generate_site(config, spec) for spec in specs], ignore_index=True)
+
+
+class BenchmarkRunner:
+    """
+    Times each case `repeats` times and keeps the nested step records of the last run.
+
+    Use as a context manager: step metrics are recorded into the temporary work
+    directory while it is open, and the directory is removed on exit.
+    """
+
+    def __init__(self, repeats=3, only=None):
+        self.repeats = repeats
+        self.only = set(only or BENCHMARKS)
+        self.results = []
+        self._tmp = tempfile.TemporaryDirectory(prefix="phase2_bench_")
+        self.workdir = Path(self._tmp.name)
+        self.metrics_file = self.workdir / "step_metrics.jsonl"
+        self._previous_metrics_path = None
+
+    def __enter__(self):
+        self._previous_metrics_path = os.environ.get(METRICS_PATH_ENV)
+        os.environ[METRICS_PATH_ENV] = str(self.metrics_file)
+        return self
+
+    def __exit__(self, *exc):
+        if self._previous_metrics_path is None:
+            os.environ.pop(METRICS_PATH_ENV, None)
+        else:
+            os.environ[METRICS_PATH_ENV] = self._previous_metrics_path
+        self._tmp.cleanup()
+
+    def _nested_steps(self, offset: int) -> dict:
+        """Wall time per step recorded after `offset` bytes of the metrics file."""
+        if not self.metrics_file.exists():
+            return {}
+        with open(self.metrics_file, "r") as f:
+            f.seek(offset)
+            records = [json.loads(line) for line in f if line.strip()]
+        steps = {}
+        for record in records:
+            steps[record["step"]] = round(steps.get(record["step"], 0.0) + record["wall_s"], 4)
+        return steps
+
+    def measure(self, name: str, scale: str, rows: int, fn, setup=None):
+        """
+        Run `fn(setup())` `repeats` times; `setup` (untimed) builds a fresh input each run.
+
+        Returns:
+            The result of the last run, or None when the case was skipped or failed
+        """
+        if name not in self.only:
+            return None
+        logging.info(f"⏱️  {name} @ {scale} ({rows:,} rows)")
+        walls, records, result, error = [], [], None, None
+        for _ in range(self.repeats):
+            arg = setup() if setup else None
+            offset = self.metrics_file.stat().st_size if self.metrics_file.exists() else 0
+            try:
+                with track(f"benchmark.{name}", rows=rows, scale=scale) as record:
+                    result = fn(arg) if setup else fn()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logging.error(f"❌ {name} @ {scale} failed: {error}")
+                break
+            steps = self._nested_steps(offset)
+            steps.pop(f"benchmark.{name}", None)
+            walls.append(record["wall_s"])
+            records.append((record, steps))
+
+        entry = {"benchmark": name, "scale": scale, "sites": SCALES[scale][0],
+                 "years": SCALES[scale][1], "rows": rows, "status": "error" if error else "ok"}
+        if error:
+            entry["error"] = error
+        if records:
+            last, steps = records[-1]
+            median = statistics.median(walls)
+            entry.update({
+                "repeats": len(walls),
+                "wall_s": walls,
+                "wall_s_min": min(walls),
+                "wall_s_median": median,
+                "cpu_s": last["cpu_s"],
+                "peak_rss_mb": max(r["peak_rss_mb"] for r, _ in records),
+                "rows_per_s": round(rows / median) if median > 0 else None,
+                "steps": steps,
+            })
+        self.results.append(entry)
+        return None if error else result
+
+
+def run_scale(runner: BenchmarkRunner, scale: str, modules: dict, generator_config: dict):
+    """Run every selected benchmark at one scale, feeding each stage the previous stage's output."""
+    sites, years = SCALES[scale]
+    generator, fe, prophet, xgboost, linear, predict = (
+        modules[k] for k in ("generator", "fe", "prophet", "xgboost", "linear", "predict"))
+
+    raw = runner.measure("generate_dataset", scale, sites * years * 365 * 24,
+                         lambda: generate_fleet_frame(generator, generator_config, sites, years))
+    if raw is None:
+        # Inputs for the downstream stages are needed even when the generator is not benchmarked
+        raw = generate_fleet_frame(generator, generator_config, sites, years)
+
+    featurize = lambda df: fe.run(df, series_cols=["site_id"])
+    features = runner.measure("02_feature_engineering", scale, len(raw), featurize, setup=raw.copy)
+    if features is None:
+        features = featurize(raw.copy())
+    del raw
+
+    first_site = features[features["site_id"] == features["site_id"].iloc[0]]
+    runner.measure("03_train_prophet", scale, len(first_site), prophet.run,
+                   setup=lambda: first_site[["timestamp", "energy_kWh"]].copy())
+    runner.measure("04_train_xgboost", scale, len(features), xgboost.run, setup=features.copy)
+    runner.measure("05_train_linear", scale, len(features), linear.run, setup=features.copy)
+
+    predictor = predict.get_predictor()
+    X = features[predictor.features].to_numpy(dtype=np.float32)
+    runner.measure("predict_array", scale, len(X), lambda: predictor.predict_array(X))
+    runner.measure("predict_frame", scale, len(features), lambda: predictor.predict_frame(features))
+
+    sample = features[predictor.features].head(RECORD_ROWS_LIMIT)
+    if "predict_records" in runner.only:
+        records = sample.to_dict("records")
+        runner.measure("predict_records", scale, len(records), lambda: predict.predict_from_dict_list(records))
+    if "predict_from_csv" in runner.only:
+        csv_path = runner.workdir / f"predict_input_{scale}.csv"
+        sample.to_csv(csv_path, index=False)
+        runner.measure("predict_from_csv", scale, len(sample), lambda: predict.predict_from_csv(csv_path))
+
+
+def run_benchmarks(scales: list, repeats=3, only=None) -> dict:
+    """
+    Run the suite and return the results document (environment + one entry per case).
+
+    Trainers write to `phase_2_modeling_pipeline/...` relative to the working
+    directory, so the suite runs from a temporary directory.
+    """
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        raise ValueError(f"❌ Unknown scale(s) {unknown}. Use any of {list(SCALES)}")
+    unknown = [b for b in (only or []) if b not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"❌ Unknown benchmark(s) {unknown}. Use any of {BENCHMARKS}")
+
+    generator = load_module(GENERATOR_PATH)
+    modules = {
+        "generator": generator,
+        "fe": load_module(SCRIPTS_DIR / "02_feature_engineering.py", "fe_02"),
+        "prophet": load_module(SCRIPTS_DIR / "03_train_prophet.py", "train_prophet_03"),
+        "xgboost": load_module(SCRIPTS_DIR / "04_train_xgboost.py", "train_xgboost_04"),
+        "linear": load_module(SCRIPTS_DIR / "05_train_linear.py", "train_linear_05"),
+        "predict": load_module(PREDICT_PATH),
+    }
+    generator_config = generator.load_config(GENERATOR_CONFIG)
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    cwd = os.getcwd()
+    # The scripts log every call; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+    with BenchmarkRunner(repeats=repeats, only=only) as runner:
+        try:
+            os.chdir(runner.workdir)
+            for scale in scales:
+                logging.warning(f"📏 Scale {scale}: {SCALES[scale][0]} site(s) x {SCALES[scale][1]} year(s)")
+                run_scale(runner, scale, modules, generator_config)
+        finally:
+            os.chdir(cwd)
+            logging.getLogger().setLevel(logging.INFO)
+
+    return {"started_at": started_at, "environment": environment_info(),
+            "repeats": repeats, "results": runner.results}
+
+
+def save_results(doc: dict, out_dir=RESULTS_DIR) -> Path:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = doc["started_at"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    commit = (doc["environment"]["commit"] or "nogit")[:10]
+    path = out_dir / f"benchmark_{stamp}_{commit}.json"
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+    return path
+
+
+def compare_results(current: dict, baseline: dict, threshold=REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """
+    Median wall time per (benchmark, scale) against a baseline results file.
+
+    Returns:
+        pd.DataFrame: baseline / current seconds, ratio and a `regression` flag
+    """
+    def table(doc):
+        rows = [r for r in doc["results"] if r["status"] == "ok"]
+        if not rows:
+            return pd.DataFrame(columns=["benchmark", "scale", "wall_s_median"])
+        return pd.DataFrame(rows)[["benchmark", "scale", "wall_s_median"]]
+
+    merged = table(baseline).merge(table(current), on=["benchmark", "scale"], suffixes=("_baseline", "_current"))
+    merged["ratio"] = (merged["wall_s_median_current"] / merged["wall_s_median_baseline"]).round(3)
+    merged["regression"] = merged["ratio"] > 1 + threshold
+    return merged
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Phase 2 benchmark suite")
+    parser.add_argument("--scales", nargs="+", default=DEFAULT_SCALES,
+                        help=f"Scales to run (sites x years): {', '.join(SCALES)} or 'all'")
+    parser.add_argument("--only", nargs="+", default=None, metavar="BENCHMARK",
+                        help=f"Run only these benchmarks: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--output-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--compare", default=None, metavar="BASELINE_JSON",
+                        help="Compare against an earlier results file; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown counted as a regression (default 0.10)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli_args()
+    scales = list(SCALES) if args.scales == ["all"] else args.scales
+    doc = run_benchmarks(scales, repeats=args.repeats, only=args.only)
+    path = save_results(doc, args.output_dir)
+
+    summary = pd.DataFrame(doc["results"])
+    columns = [c for c in ("benchmark", "scale", "rows", "wall_s_median", "rows_per_s", "peak_rss_mb", "status")
+               if c in summary.columns]
+    print(summary[columns].to_string(index=False))
+    logging.info(f"💾 Benchmark results saved to: {path}")
+
+    failed = False
+    errors = [r for r in doc["results"] if r["status"] == "error"]
+    if errors:
+        failed = True
+        for r in errors:
+            logging.error(f"❌ {r['benchmark']} @ {r['scale']} failed: {r['error']}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        comparison = compare_results(doc, baseline, args.threshold)
+        print(comparison.to_string(index=False))
+        if comparison["regression"].any():
+            failed = True
+            logging.error(f"❌ {int(comparison['regression'].sum())} case(s) slower than the baseline "
+                          f"by more than {args.threshold:.0%}")
+        else:
+            logging.info("✅ No regressions against the baseline")
+
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,224 @@
+# phase_2_modeling_pipeline/scripts/forecasting.py
+
+"""
+forecasting.py
+---------------
+Recursive multi-horizon forecasting for the XGBoost and Linear models.
+
+The one-step models need `lag_1h`, `lag_24h` and `roll_mean_24h`. To forecast
+24–168h ahead, each step's prediction is written back into a preallocated
+energy buffer and the lag/rolling features of the next step are read from it.
+All series are advanced together: one model call per step for the whole batch,
+with no DataFrame rebuilt inside the loop.
+
+As in the online feature service, `roll_mean_24h` at step t is the mean of the
+values in the 24h before t (the value at t is what is being predicted).
+
+The lags are defined in hours, so for data recorded more often than hourly
+(`freq="15min"`, ...) they are converted to steps: `lag_1h` is 4 steps back and
+the 24h window is 96 steps. The last 24h of history must be contiguous at `freq`.
+
+Usage:
+    python forecasting.py --model xgboost --horizon 168
+
+Author: Mantas Valantinavicius
+"""
+
+import argparse
+import logging
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from storage import read_table, write_table
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+FEATURE_COLS = [
+    'hour', 'day_of_week', 'month', 'is_weekend',
+    'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+    'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
+]
+WINDOW = 24
+HOUR = pd.Timedelta(hours=1)
+
+
+def time_feature_matrix(timestamps: pd.DatetimeIndex) -> dict:
+    """Calendar and cyclical features for every forecast step, as arrays of length H."""
+    hour = timestamps.hour.to_numpy()
+    dow = timestamps.dayofweek.to_numpy()
+    return {
+        "hour": hour,
+        "day_of_week": dow,
+        "month": timestamps.month.to_numpy(),
+        "is_weekend": (dow >= 5).astype(float),
+        "hour_sin": np.sin(2 * np.pi * hour / 24),
+        "hour_cos": np.cos(2 * np.pi * hour / 24),
+        "dow_sin": np.sin(2 * np.pi * dow / 7),
+        "dow_cos": np.cos(2 * np.pi * dow / 7),
+    }
+
+
+def lag_steps(freq="h") -> tuple:
+    """
+    Steps per hour and per 24h window at `freq`.
+
+    Returns:
+        tuple: (steps_per_hour, window), e.g. (1, 24) for "h" and (4, 96) for "15min"
+    """
+    step = pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+    if step <= pd.Timedelta(0) or HOUR % step:
+        raise ValueError(f"❌ Frequency '{freq}' must divide one hour evenly for the 1h/24h lag features")
+    steps_per_hour = HOUR // step
+    return steps_per_hour, WINDOW * steps_per_hour
+
+
+def batch_predict_fn(model):
+    """Return a fast `X -> y` callable for an XGBoost or scikit-learn linear model."""
+    if isinstance(model, (xgb.XGBModel, xgb.Booster)):
+        booster = model.get_booster() if isinstance(model, xgb.XGBModel) else model
+        return lambda X: booster.inplace_predict(X)
+    if hasattr(model, "coef_"):
+        coef, intercept = np.asarray(model.coef_), model.intercept_
+        return lambda X: X @ coef + intercept
+    return model.predict
+
+
+def recursive_forecast(model, history, timestamps, temperature, feature_cols=FEATURE_COLS,
+                       freq="h") -> np.ndarray:
+    """
+    Roll one-step predictions forward over a horizon for many series at once.
+
+    Parameters:
+        model: Fitted XGBoost or Linear model trained on `feature_cols`
+        history (array): Shape (n_series, >= 24h of steps), most recent energy values per series
+        timestamps (DatetimeIndex): The H future timestamps (shared by all series)
+        temperature (array): Shape (n_series, H) or (H,), temperature at each future step
+        feature_cols (list): Feature order the model was trained with
+        freq (str): Spacing of `history` and `timestamps`
+
+    Returns:
+        np.ndarray: Shape (n_series, H) of predicted energy (kWh)
+    """
+    lag_1h, window = lag_steps(freq)
+    history = np.atleast_2d(np.asarray(history, dtype=float))
+    if history.shape[1] < window:
+        raise ValueError(f"❌ Need at least {window} history values per series (24h at '{freq}'), "
+                         f"got {history.shape[1]}")
+
+    n_series, horizon = history.shape[0], len(timestamps)
+    temperature = np.broadcast_to(np.asarray(temperature, dtype=float), (n_series, horizon))
+    predict = batch_predict_fn(model)
+    col = {name: i for i, name in enumerate(feature_cols)}
+
+    # Energy buffer: 24h of history slots followed by H forecast slots, filled in place
+    energy = np.empty((n_series, window + horizon))
+    energy[:, :window] = history[:, -window:]
+    rolling_sum = energy[:, :window].sum(axis=1)
+
+    # Static (per-step) features are computed once for the whole horizon
+    static = time_feature_matrix(pd.DatetimeIndex(timestamps))
+    X = np.empty((n_series, len(feature_cols)), dtype=np.float32)
+
+    for h in range(horizon):
+        t = window + h
+        for name, values in static.items():
+            X[:, col[name]] = values[h]
+        X[:, col["temperature_C"]] = temperature[:, h]
+        X[:, col["lag_1h"]] = energy[:, t - lag_1h]
+        X[:, col["lag_24h"]] = energy[:, t - window]
+        X[:, col["roll_mean_24h"]] = rolling_sum / window
+
+        energy[:, t] = predict(X)
+        rolling_sum += energy[:, t] - energy[:, t - window]
+
+    return energy[:, window:]
+
+
+def forecast_frame(model, df: pd.DataFrame, horizon: int, series_col=None, temperature=None,
+                   freq="h", feature_cols=FEATURE_COLS) -> pd.DataFrame:
+    """
+    Forecast `horizon` steps past the end of `df` for one or many series.
+
+    Parameters:
+        df (pd.DataFrame): History with `timestamp`, `energy_kWh`, `temperature_C`
+            (and `series_col` for panels); all series must end at the same timestamp, and
+            their last 24h must be contiguous at `freq`
+        horizon (int): Number of `freq` steps to forecast
+        temperature (array, optional): Future temperature, shape (H,) or (n_series, H).
+            Defaults to repeating each series' last 24h temperature profile.
+        freq (str): Spacing of the history and the forecast steps
+
+    Returns:
+        pd.DataFrame: Long frame with `timestamp`, `predicted` and `horizon_h`, the hours
+        ahead (plus `series_col`)
+    """
+    steps_per_hour, window = lag_steps(freq)
+    df = df.sort_values("timestamp")
+    groups = [(None, df)] if series_col is None else list(df.groupby(series_col, sort=True))
+
+    last_ts = {g["timestamp"].iloc[-1] for _, g in groups}
+    if len(last_ts) != 1:
+        raise ValueError("❌ All series must end at the same timestamp for a batched forecast")
+    origin = last_ts.pop()
+    expected = pd.date_range(end=origin, periods=window, freq=freq)
+    for key, g in groups:
+        tail = pd.DatetimeIndex(g["timestamp"].iloc[-window:])
+        if len(tail) < window or not tail.equals(expected):
+            name = "" if key is None else f" of series '{key}'"
+            raise ValueError(f"❌ The last 24h{name} must be {window} consecutive '{freq}' steps "
+                             f"ending at {origin}; fill or drop the gaps first")
+    timestamps = pd.date_range(origin, periods=horizon + 1, freq=freq)[1:]
+
+    history = np.stack([g["energy_kWh"].to_numpy(dtype=float)[-window:] for _, g in groups])
+    if temperature is None:
+        last_day = np.stack([g["temperature_C"].to_numpy(dtype=float)[-window:] for _, g in groups])
+        temperature = np.stack([np.resize(row, horizon) for row in last_day])
+
+    preds = recursive_forecast(model, history, timestamps, temperature, feature_cols, freq)
+
+    hours_ahead = np.arange(1, horizon + 1) / steps_per_hour
+    out = pd.DataFrame({
+        "timestamp": np.tile(timestamps, len(groups)),
+        "predicted": preds.ravel(),
+        "horizon_h": np.tile(hours_ahead if steps_per_hour > 1 else hours_ahead.astype(int), len(groups)),
+    })
+    if series_col is not None:
+        out.insert(0, series_col, np.repeat([key for key, _ in groups], horizon))
+    return out
+
+
+def load_model(model_name: str, variant: str = "mixed"):
+    """Load the saved XGBoost or Linear model for a variant."""
+    if model_name == "xgboost":
+        model = xgb.XGBRegressor()
+        model.load_model(Path(f"phase_2_modeling_pipeline/models/xgboost_model_{variant}.json"))
+        return model
+    if model_name == "linear":
+        with open(Path(f"phase_2_modeling_pipeline/models/linear_model_{variant}.pkl"), "rb") as f:
+            return pickle.load(f)
+    raise ValueError(f"Unknown model '{model_name}'. Use 'xgboost' or 'linear'.")
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Recursive multi-horizon forecast")
+    parser.add_argument("--model", choices=["xgboost", "linear"], default="xgboost")
+    parser.add_argument("--horizon", type=int, default=168, help="Steps ahead to forecast (hours at the default --freq)")
+    parser.add_argument("--freq", default="h", help="Spacing of the history data, e.g. h or 15min (default: h)")
+    parser.add_argument("--variant", default="mixed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli_args()
+    model = load_model(args.model, args.variant)
+    history = read_table(f"phase_2_modeling_pipeline/data/processed/feature_engineered_{args.variant}.csv",
+                         columns=["timestamp", "energy_kWh", "temperature_C"])
+
+    forecast = forecast_frame(model, history, args.horizon, freq=args.freq)
+    out_path = write_table(forecast, Path(
+        f"phase_2_modeling_pipeline/results/predictions/{args.model}_forecast_{args.horizon}h_{args.variant}.csv"))
+    logging.info(f"📈 {args.horizon}h {args.model} forecast saved to: {out_path.resolve()}")
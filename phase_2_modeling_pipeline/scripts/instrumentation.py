@@ -0,0 +1,196 @@
+# phase_2_modeling_pipeline/scripts/instrumentation.py
+
+"""
+instrumentation.py
+-------------------
+Stage timing and resource metrics for the Phase 2 scripts.
+
+`track(...)` (context manager) and `@instrumented(...)` (decorator) record, per
+stage or step:
+    wall_s        - elapsed wall-clock time
+    cpu_s         - CPU time of this process and of child processes it waited on
+    peak_rss_mb   - peak resident memory during the step (Linux: the VmHWM
+                    high-water mark is reset at the start of the step; elsewhere
+                    the process-lifetime peak)
+    rows          - rows processed, when known
+
+Recording is opt-in: records are only written when PHASE2_METRICS_PATH names
+the JSONL file to append to. `pipeline.py` points it at
+phase_2_modeling_pipeline/results/metrics/stage_metrics.jsonl for its stages and
+`benchmark.py` at a temporary file per run; otherwise `track` only runs the block, so
+library calls (e.g. every table read/write) cost nothing and write nothing. Set
+PHASE2_PROFILE=1 (or `pipeline.py --profile`) to also dump a cProfile file per
+step to profiles/<step>.prof next to the metrics file (view with `snakeviz` or
+`pstats`).
+
+Usage:
+    @instrumented("04_train_xgboost.run")
+    def run(df, variant="mixed"): ...
+
+    with track("04_train_xgboost.fit", rows=len(X_train)):
+        model.fit(X_train, y_train)
+
+Author: Mantas Valantinavicius
+"""
+
+import cProfile
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+METRICS_DIR = Path("phase_2_modeling_pipeline/results/metrics")
+DEFAULT_METRICS_PATH = METRICS_DIR / "stage_metrics.jsonl"
+METRICS_PATH_ENV = "PHASE2_METRICS_PATH"
+PROFILE_ENV = "PHASE2_PROFILE"
+
+# Peak-RSS state of the steps currently being tracked (innermost last)
+_open_steps = []
+
+
+def metrics_path():
+    """The metrics file named by PHASE2_METRICS_PATH, or None when recording is off."""
+    path = os.environ.get(METRICS_PATH_ENV)
+    return Path(path) if path else None
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark for this process (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def _cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def write_record(record: dict, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One short append per record, so concurrent stage processes do not interleave lines
+    with open(path, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def track(step: str, rows: int = None, profile: bool = None, **extra):
+    """
+    Measure a block and append its metrics record.
+
+    The yielded dict can be updated inside the block, e.g. `record["rows"] = len(df)`.
+    Nothing is measured or written unless PHASE2_METRICS_PATH is set.
+    """
+    record = {"step": step, "script": Path(sys.argv[0]).stem or "interactive", "rows": rows, **extra}
+    path = metrics_path()
+    if path is None:
+        yield record
+        return
+
+    profile = profiling_enabled() if profile is None else profile
+    # Only one profiler can be active per process: nested steps are covered by the outer dump
+    profiler = cProfile.Profile() if profile and not _open_steps else None
+
+    # Resetting the high-water mark would hide an enclosing step's earlier peak,
+    # so fold the current peak into every open step first
+    current_peak = _peak_rss_mb()
+    for outer in _open_steps:
+        outer["peak"] = max(outer["peak"], current_peak)
+    peak_scope = "step" if _reset_peak_rss() else "process"
+    state = {"peak": 0.0}
+    _open_steps.append(state)
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    cpu_start, wall_start = _cpu_seconds(), time.perf_counter()
+    if profiler:
+        profiler.enable()
+    status = "ok"
+    try:
+        yield record
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        _open_steps.remove(state)
+        peak = max(state["peak"], _peak_rss_mb())
+        for outer in _open_steps:
+            outer["peak"] = max(outer["peak"], peak)
+        record.update({
+            "started_at": started_at,
+            "status": status,
+            "wall_s": round(time.perf_counter() - wall_start, 4),
+            "cpu_s": round(_cpu_seconds() - cpu_start, 4),
+            "peak_rss_mb": round(peak, 1),
+            "peak_rss_scope": peak_scope,
+            "pid": os.getpid(),
+        })
+        if profiler:
+            profile_path = path.parent / "profiles" / f"{step}.prof"
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_path)
+            record["profile"] = str(profile_path)
+        write_record(record, path)
+
+
+def _default_rows(result, args, kwargs):
+    """Rows of the first DataFrame argument, else of a DataFrame result."""
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, pd.DataFrame):
+            return len(value)
+    return len(result) if isinstance(result, pd.DataFrame) else None
+
+
+def instrumented(step: str, rows=_default_rows):
+    """
+    Decorator form of `track`.
+
+    Parameters:
+        rows (callable): `(result, args, kwargs) -> int` giving the row count to record
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(step) as record:
+                result = fn(*args, **kwargs)
+                record["rows"] = rows(result, args, kwargs) if rows else None
+            return result
+        return wrapper
+    return decorator
+
+
+def load_metrics(path=None) -> pd.DataFrame:
+    """Read the metrics file (default: PHASE2_METRICS_PATH, else the pipeline's) into a DataFrame."""
+    path = Path(path or metrics_path() or DEFAULT_METRICS_PATH)
+    if not path.exists():
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
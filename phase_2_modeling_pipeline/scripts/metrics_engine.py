@@ -0,0 +1,188 @@
+# phase_2_modeling_pipeline/scripts/metrics_engine.py
+
+"""
+metrics_engine.py
+------------------
+Streaming, grouped evaluation metrics for prediction tables of any size.
+
+`MetricAccumulator` keeps additive sufficient statistics (count, squared
+error, absolute error, absolute percentage error, pinball loss per quantile)
+per group. Each chunk is reduced with one vectorized groupby-sum and added to
+the running totals, so RMSE, MAE, MAPE and pinball losses for every group
+(e.g. model x sector x hour-of-day) come out of a single pass, and coarser
+groupings (per model, overall) are derived from the same totals.
+
+Predictions are matched to actuals through `TruthIndex`, a hash index on
+int64 epoch timestamps (plus series columns such as `sector`/`site_id`),
+instead of merging on timestamp strings.
+
+Author: Mantas Valantinavicius
+"""
+
+import numpy as np
+import pandas as pd
+
+from storage import iter_table
+
+# Prophet's default interval_width is 0.8, so its bounds are the 10% / 90% quantiles
+PROPHET_QUANTILES = {0.1: "yhat_lower", 0.9: "yhat_upper"}
+
+
+def epoch_ns(values) -> np.ndarray:
+    """Timestamps as int64 nanoseconds since the epoch."""
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+class TruthIndex:
+    """Actual values indexed by (epoch timestamp, *series columns) for vectorized lookups."""
+
+    def __init__(self, truth: pd.DataFrame, value_col="energy_kWh", time_col="timestamp",
+                 series_cols=(), attr_cols=()):
+        self.series_cols = list(series_cols)
+        self.index = self._make_index(truth[time_col], truth[self.series_cols])
+        if not self.index.is_unique:
+            raise ValueError(f"❌ Actuals have duplicate ({time_col}, {', '.join(self.series_cols)}) keys")
+        self.values = truth[value_col].to_numpy(dtype=float)
+        self.attrs = {col: truth[col].to_numpy() for col in attr_cols}
+
+    def _make_index(self, timestamps, series: pd.DataFrame) -> pd.Index:
+        keys = epoch_ns(timestamps)
+        if not self.series_cols:
+            return pd.Index(keys)
+        return pd.MultiIndex.from_arrays([keys] + [series[c].to_numpy() for c in self.series_cols])
+
+    def positions(self, timestamps, series: pd.DataFrame = None) -> np.ndarray:
+        """Row positions in the actuals for each key; -1 where there is no match."""
+        series = series if series is not None else pd.DataFrame(index=range(len(timestamps)))
+        return self.index.get_indexer(self._make_index(timestamps, series))
+
+
+class MetricAccumulator:
+    """
+    Accumulates RMSE / MAE / MAPE / pinball statistics over chunks, per group.
+
+    Usage:
+        acc = MetricAccumulator(group_by=["model", "hour"], quantiles=[0.1, 0.9])
+        for chunk in chunks:
+            acc.update(y_true, y_pred, groups={"model": ..., "hour": ...}, quantile_preds={0.1: ..., 0.9: ...})
+        acc.result()            # per model and hour
+        acc.result(["model"])   # per model, from the same totals
+    """
+
+    def __init__(self, group_by=(), quantiles=()):
+        self.group_by = list(group_by)
+        self.quantiles = sorted(quantiles)
+        self.totals = None
+
+    def update(self, y_true, y_pred, groups=None, quantile_preds=None):
+        y_true = np.asarray(y_true, dtype=float)
+        err = y_true - np.asarray(y_pred, dtype=float)
+        abs_err = np.abs(err)
+        non_zero = y_true != 0
+
+        stats = {
+            "n": np.ones(len(y_true)),
+            "sq_err": err ** 2,
+            "abs_err": abs_err,
+            "n_non_zero": non_zero.astype(float),
+            "abs_pct_err": np.divide(abs_err, np.abs(y_true), out=np.zeros(len(y_true)), where=non_zero),
+        }
+        for q in self.quantiles:
+            if quantile_preds is None or q not in quantile_preds:
+                raise ValueError(f"❌ Missing predictions for quantile {q}")
+            diff = y_true - np.asarray(quantile_preds[q], dtype=float)
+            stats[f"pinball_{q}"] = np.maximum(q * diff, (q - 1) * diff)
+        frame = pd.DataFrame(stats)
+
+        if self.group_by:
+            for col in self.group_by:
+                frame[col] = np.asarray(groups[col])
+            chunk = frame.groupby(self.group_by, sort=False, observed=True).sum()
+        else:
+            chunk = frame.sum().to_frame().T
+
+        self.totals = chunk if self.totals is None else self.totals.add(chunk, fill_value=0)
+        return self
+
+    def result(self, group_by=None) -> pd.DataFrame:
+        """
+        Final metrics per group.
+
+        Parameters:
+            group_by (list, optional): Subset of the accumulator's grouping to report at;
+                `[]` for a single overall row. Defaults to the full grouping.
+        """
+        if self.totals is None:
+            raise ValueError("❌ No data accumulated")
+        group_by = self.group_by if group_by is None else list(group_by)
+        if not set(group_by) <= set(self.group_by):
+            raise ValueError(f"❌ Can only report by a subset of {self.group_by}")
+
+        if group_by:
+            totals = self.totals.groupby(level=group_by, sort=True).sum()
+        else:
+            totals = self.totals.sum().to_frame().T
+
+        n = totals["n"]
+        out = pd.DataFrame({
+            "RMSE": np.sqrt(totals["sq_err"] / n),
+            "MAE": totals["abs_err"] / n,
+            "MAPE": (totals["abs_pct_err"] / totals["n_non_zero"]).where(totals["n_non_zero"] > 0) * 100,
+        }, index=totals.index)
+        for q in self.quantiles:
+            out[f"pinball_{q}"] = totals[f"pinball_{q}"] / n
+        out["n"] = n.astype(int)
+        return out.reset_index() if group_by else out.reset_index(drop=True)
+
+
+def evaluate_table(path, pred_col="predicted", time_col="timestamp", truth: TruthIndex = None,
+                   actual_col="actual", group_by=(), quantile_cols=None, chunksize=100_000,
+                   accumulator: MetricAccumulator = None, constants=None) -> MetricAccumulator:
+    """
+    Stream a prediction table through a `MetricAccumulator`.
+
+    Parameters:
+        truth (TruthIndex, optional): Look actuals up by timestamp (and series columns)
+            instead of reading `actual_col` from the table; unmatched rows are skipped
+        group_by (list): Group columns, read from the table, from `truth.attrs`,
+            from `constants`, or "hour" (derived from `time_col`)
+        quantile_cols (dict, optional): {quantile: column} for pinball losses
+        accumulator (MetricAccumulator, optional): Add to an existing accumulator,
+            e.g. to evaluate several models in one grouped result
+        constants (dict, optional): Fixed group values for every row, e.g. {"model": "XGBoost"}
+
+    Returns:
+        MetricAccumulator: The updated accumulator
+    """
+    quantile_cols = quantile_cols or {}
+    constants = constants or {}
+    acc = accumulator or MetricAccumulator(group_by, quantiles=list(quantile_cols))
+
+    derived = set(constants) | {"hour"} | (set(truth.attrs) if truth is not None else set())
+    columns = [time_col, pred_col] + list(quantile_cols.values())
+    columns += list(truth.series_cols) if truth is not None else [actual_col]
+    columns += [g for g in acc.group_by if g not in derived and g not in columns]
+
+    for chunk in iter_table(path, columns=columns, chunksize=chunksize):
+        if truth is not None:
+            pos = truth.positions(chunk[time_col], chunk[truth.series_cols])
+            matched = pos >= 0
+            chunk, pos = chunk[matched], pos[matched]
+            y_true = truth.values[pos]
+        else:
+            y_true = chunk[actual_col].to_numpy(dtype=float)
+
+        groups = {}
+        for col in acc.group_by:
+            if col in constants:
+                groups[col] = np.full(len(chunk), constants[col], dtype=object)
+            elif col in chunk.columns:
+                groups[col] = chunk[col].to_numpy()
+            elif truth is not None and col in truth.attrs:
+                groups[col] = truth.attrs[col][pos]
+            elif col == "hour":
+                groups[col] = chunk[time_col].dt.hour.to_numpy()
+
+        acc.update(y_true, chunk[pred_col].to_numpy(dtype=float), groups,
+                   {q: chunk[c].to_numpy(dtype=float) for q, c in quantile_cols.items()})
+    return acc
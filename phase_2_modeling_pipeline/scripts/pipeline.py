@@ -0,0 +1,378 @@
+# phase_2_modeling_pipeline/scripts/pipeline.py
+
+"""
+pipeline.py
+------------
+Cached, parallel runner for the Phase 2 scripts (01–10; 07/08/08b run as the
+single `render_plots.py` stage).
+
+Stages form a DAG through their declared input and output files: a stage
+starts as soon as the stages producing its inputs are done, so the three
+trainers (03/04/05) and the evaluation/plotting steps (06, render_plots) run
+concurrently, each script in its own process. With `--storage-format feather`
+intermediate tables are handed between stages as Arrow IPC files rather than
+CSV, so no stage re-parses text.
+
+Each stage declares the files it reads and writes. Before running a stage, its
+cache key is computed as a SHA-256 over the stage's script and the local
+modules it imports (transitively), the Phase 2 config, the storage format, the
+declared output paths and the contents of its input files. If that key was seen
+before and the cached entry holds every declared output, the stage is skipped:
+its outputs are left in place, or restored from the content-addressed object
+store if they were changed or deleted since. Switching `--storage-format` re-runs
+the stages whose outputs move to differently named files. Editing one script
+re-runs only that stage and the stages downstream of it whose inputs actually
+change, so editing `09_generate_phase2_report.py` re-runs 09 alone.
+
+Cache layout (phase_2_modeling_pipeline/.cache/):
+    objects/<sha256>   - output file contents, one blob per distinct content
+    index.json         - per stage: cache key -> {output path: sha256}
+    file_hashes.json   - (size, mtime) -> sha256 memo so unchanged files are not re-hashed
+
+Usage (from the repository root):
+    python phase_2_modeling_pipeline/scripts/pipeline.py
+    python phase_2_modeling_pipeline/scripts/pipeline.py --dry-run
+    python phase_2_modeling_pipeline/scripts/pipeline.py --force 04_train_xgboost
+    python phase_2_modeling_pipeline/scripts/pipeline.py --workers 4 --storage-format feather
+
+Author: Mantas Valantinavicius
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import yaml
+
+from instrumentation import DEFAULT_METRICS_PATH, METRICS_PATH_ENV, PROFILE_ENV
+from storage import CONFIG_PATH, STORAGE_FORMAT_ENV, SUFFIXES, load_storage_settings, table_path
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BASE = Path("phase_2_modeling_pipeline")
+CACHE_DIR = BASE / ".cache"
+OBJECTS_DIR = CACHE_DIR / "objects"
+INDEX_PATH = CACHE_DIR / "index.json"
+FILE_HASHES_PATH = CACHE_DIR / "file_hashes.json"
+
+# Cache keys kept per stage; older entries (and blobs no longer referenced) are pruned
+MAX_ENTRIES_PER_STAGE = 5
+
+
+def build_stages(config: dict) -> list:
+    """Declare the Phase 2 stages with their input and output files, in execution order."""
+    cleaned = table_path(config["data_output"]["cleaned_path"], config)
+    features = table_path(BASE / "data/processed/feature_engineered_mixed.csv", config)
+    preds = BASE / "results/predictions"
+    prophet_forecast = table_path(preds / "prophet_forecast_mixed.csv", config)
+    xgb_preds = table_path(preds / "xgboost_predictions_mixed.csv", config)
+    linear_preds = table_path(preds / "linear_predictions_mixed.csv", config)
+    models = BASE / "models"
+    plots = BASE / "results/plots"
+    summary = BASE / "results/model_evaluation_summary.csv"
+    deploy = BASE / "deployment_ready"
+    storage_format = load_storage_settings(config)["format"]
+
+    def stage(script, inputs, outputs):
+        return {"name": script, "script": SCRIPTS_DIR / f"{script}.py", "storage_format": storage_format,
+                "inputs": [Path(p) for p in inputs], "outputs": [Path(p) for p in outputs]}
+
+    return [
+        stage("01_load_data", [config["data_source"]["path"]], [cleaned]),
+        stage("02_feature_engineering", [cleaned], [features, features.with_suffix(".state.json")]),
+        stage("03_train_prophet", [features],
+              [models / "prophet_model_mixed.json", models / "prophet_model_mixed.npz", prophet_forecast]),
+        stage("04_train_xgboost", [features], [models / "xgboost_model_mixed.json", models / "xgboost_model_mixed.state.json", xgb_preds]),
+        stage("05_train_linear", [features], [models / "linear_model_mixed.pkl", models / "linear_model_mixed.stats.npz", linear_preds]),
+        stage("06_evaluate_models", [features, prophet_forecast, xgb_preds, linear_preds],
+              [summary, BASE / "results/model_evaluation_by_hour.csv", BASE / "results/model_comparison_chart.png"]),
+        stage("render_plots",
+              [features, prophet_forecast, xgb_preds, linear_preds, models / "xgboost_model_mixed.json",
+               models / "linear_model_mixed.pkl", models / "prophet_model_mixed.json", models / "prophet_model_mixed.npz"],
+              [plots / f"{m}_prediction_plot.png" for m in ("prophet", "xgboost", "linear")]
+              + [plots / "xgboost_feature_importance.png", plots / "linear_feature_coefficients.png",
+                 plots / "prophet_components_plot.png"]),
+        stage("09_generate_phase2_report",
+              [summary] + [plots / f"{m}_prediction_plot.png" for m in ("prophet", "xgboost", "linear")]
+              + [plots / "xgboost_feature_importance.png", plots / "linear_feature_coefficients.png",
+                 plots / "prophet_components_plot.png"],
+              [BASE / "results/Phase2_Model_Evaluation_Report.docx"]),
+        stage("10_export_production_bundle", [models / "xgboost_model_mixed.json", xgb_preds, summary],
+              [deploy / "xgboost_model_mixed.json", deploy / xgb_preds.name, deploy / summary.name,
+               deploy / "feature_columns.json", deploy / "requirements.txt"]),
+    ]
+
+
+def imported_names(path: Path) -> set:
+    """Top-level module names imported anywhere in a Python file."""
+    tree = ast.parse(path.read_text(), filename=str(path))
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module.split(".")[0])
+        elif isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+    return names
+
+
+def local_modules(script: Path) -> list:
+    """
+    Sibling modules (e.g. storage.py) a script imports, directly or through other
+    sibling modules (storage -> instrumentation), so edits to them invalidate the stage.
+    """
+    found, queue = set(), [script]
+    while queue:
+        for name in imported_names(queue.pop()):
+            module = SCRIPTS_DIR / f"{name}.py"
+            if module.exists() and module != script and module not in found:
+                found.add(module)
+                queue.append(module)
+    return sorted(found)
+
+
+class FileHasher:
+    """SHA-256 of file contents, memoized on (path, size, mtime) across runs."""
+
+    def __init__(self, memo_path=None):
+        self.memo_path = Path(memo_path or FILE_HASHES_PATH)
+        self.memo = json.loads(self.memo_path.read_text()) if self.memo_path.exists() else {}
+
+    def __call__(self, path: Path) -> str:
+        if path.is_dir():
+            # Partitioned table (see storage.append_table): hash of its part names and contents
+            digest = hashlib.sha256()
+            for part in sorted(p for p in path.rglob("*") if p.is_file()):
+                digest.update(f"{part.relative_to(path).as_posix()}:{self(part)}".encode())
+            return digest.hexdigest()
+        stat = path.stat()
+        memo_key = f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        if memo_key not in self.memo:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self.memo[memo_key] = digest.hexdigest()
+        return self.memo[memo_key]
+
+    def save(self):
+        self.memo_path.parent.mkdir(parents=True, exist_ok=True)
+        self.memo_path.write_text(json.dumps(self.memo))
+
+
+def stage_key(stage: dict, hasher: FileHasher) -> str:
+    """Cache key over code, config, storage format, declared outputs and input contents."""
+    digest = hashlib.sha256(stage["name"].encode())
+    for path in [stage["script"]] + local_modules(stage["script"]) + [CONFIG_PATH]:
+        digest.update(f"code:{path.name}:{hasher(path)}".encode())
+    digest.update(f"storage_format:{stage.get('storage_format')}".encode())
+    for path in stage["outputs"]:
+        digest.update(f"output:{path.as_posix()}".encode())
+    for path in stage["inputs"]:
+        if not path.exists():
+            raise FileNotFoundError(f"❌ Input of stage {stage['name']} not found: {path}")
+        digest.update(f"input:{path.as_posix()}:{hasher(path)}".encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Content-addressed store of stage outputs, keyed by `stage_key`."""
+
+    def __init__(self, hasher: FileHasher):
+        self.hasher = hasher
+        self.index = json.loads(INDEX_PATH.read_text()) if INDEX_PATH.exists() else {}
+
+    def restore(self, stage: dict, key: str) -> bool:
+        """
+        Make the stage's outputs match the cached entry for `key`.
+
+        Returns False (a cache miss) when there is no entry, when the entry does not
+        hold every declared output, or when one of its blobs is gone.
+        """
+        entry = self.index.get(stage["name"], {}).get(key)
+        if entry is None or set(entry) != {path.as_posix() for path in stage["outputs"]}:
+            return False
+        if any(not (OBJECTS_DIR / sha).exists() for sha in entry.values()):
+            return False
+        for path, sha in entry.items():
+            path = Path(path)
+            if path.exists() and self.hasher(path) == sha:
+                continue
+            _remove(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _copy(OBJECTS_DIR / sha, path)
+            logging.info(f"♻️  Restored {path} from cache")
+        return True
+
+    def store(self, stage: dict, key: str):
+        missing = [str(p) for p in stage["outputs"] if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"❌ Stage {stage['name']} did not produce: {missing}")
+
+        OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+        entry = {}
+        for path in stage["outputs"]:
+            sha = self.hasher(path)
+            if not (OBJECTS_DIR / sha).exists():
+                _copy(path, OBJECTS_DIR / sha)
+            entry[path.as_posix()] = sha
+
+        entries = self.index.setdefault(stage["name"], {})
+        entries.pop(key, None)
+        entries[key] = entry
+        while len(entries) > MAX_ENTRIES_PER_STAGE:
+            entries.pop(next(iter(entries)))
+
+    def save(self):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        INDEX_PATH.write_text(json.dumps(self.index, indent=2))
+
+        referenced = {sha for entries in self.index.values() for entry in entries.values() for sha in entry.values()}
+        for blob in OBJECTS_DIR.glob("*") if OBJECTS_DIR.exists() else []:
+            if blob.name not in referenced:
+                _remove(blob)
+
+
+def _copy(src: Path, dst: Path):
+    """Copy a file, or a partitioned table directory (see storage.append_table)."""
+    if src.is_dir():
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def _remove(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def stage_dependencies(stages: list) -> dict:
+    """Map each stage to the stages producing its inputs (the edges of the pipeline DAG)."""
+    producers = {path.as_posix(): stage["name"] for stage in stages for path in stage["outputs"]}
+    return {
+        stage["name"]: sorted({producers[p.as_posix()] for p in stage["inputs"] if p.as_posix() in producers}
+                              - {stage["name"]})
+        for stage in stages
+    }
+
+
+def run_stage(stage: dict, storage_format=None, profile=False):
+    """Run one numbered script as its own process, headless, from the repository root, recording stage metrics."""
+    env = dict(os.environ, MPLBACKEND="Agg")
+    env.setdefault(METRICS_PATH_ENV, str(DEFAULT_METRICS_PATH.resolve()))
+    if storage_format:
+        env[STORAGE_FORMAT_ENV] = storage_format
+    if profile:
+        env[PROFILE_ENV] = "1"
+    subprocess.run([sys.executable, str(stage["script"])], check=True, env=env)
+
+
+def run_pipeline(stages: list, force=(), dry_run=False, workers=1, storage_format=None, profile=False) -> list:
+    """
+    Run the stage DAG, skipping stages whose cache key is already in the cache.
+
+    A stage starts as soon as every stage producing one of its inputs has finished,
+    so independent stages (03/04/05, then 06 and render_plots) run side by side in up to
+    `workers` processes. Cache lookups and stores happen in this process only.
+
+    Parameters:
+        force (iterable): Stage names to re-run regardless of the cache ("all" for every stage)
+        workers (int): Maximum number of stages running at once (1 = serial, in declaration order)
+        storage_format (str, optional): Override `storage.format` for the stage processes
+        profile (bool): Dump a cProfile file per instrumented step (see instrumentation.py)
+
+    Returns:
+        list[dict]: Per-stage status ("cached", "ran" or "would run") and seconds, in declaration order
+    """
+    deps = stage_dependencies(stages)
+    by_name = {stage["name"]: stage for stage in stages}
+    pending = [stage["name"] for stage in stages]
+    status, seconds, running = {}, {}, {}
+
+    hasher = FileHasher()
+    cache = StageCache(hasher)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                progressed = False
+                for name in list(pending):
+                    dep_status = [status.get(d) for d in deps[name]]
+                    if "would run" in dep_status:
+                        # Inputs will change once the upstream stage runs, so the key is unknown
+                        status[name], seconds[name] = "would run", 0.0
+                        pending.remove(name)
+                        progressed = True
+                        continue
+                    if any(s not in ("cached", "ran") for s in dep_status) or len(running) >= workers:
+                        continue
+
+                    pending.remove(name)
+                    progressed = True
+                    stage, start = by_name[name], time.perf_counter()
+                    key = stage_key(stage, hasher)
+                    if not ("all" in force or name in force) and cache.restore(stage, key):
+                        status[name], seconds[name] = "cached", time.perf_counter() - start
+                        logging.info(f"⏭️  {name}: cached, skipping")
+                    elif dry_run:
+                        status[name], seconds[name] = "would run", 0.0
+                        logging.info(f"🔍 {name}: would run")
+                    else:
+                        logging.info(f"▶️  {name}: running")
+                        running[pool.submit(run_stage, stage, storage_format, profile)] = (name, key, start)
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, key, start = running.pop(future)
+                        future.result()
+                        cache.store(by_name[name], key)
+                        status[name], seconds[name] = "ran", time.perf_counter() - start
+                        logging.info(f"✅ {name}: done in {seconds[name]:.1f}s")
+                elif not progressed:
+                    raise ValueError(f"❌ Unresolvable stage dependencies: {pending}")
+    finally:
+        if not dry_run:
+            cache.save()
+        hasher.save()
+
+    return [{"stage": name, "status": status[name], "seconds": round(seconds[name], 2)}
+            for name in by_name if name in status]
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Run the Phase 2 pipeline with a stage cache")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE",
+                        help="Stage names to re-run even if cached, or 'all'")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Stages run concurrently (1 = serial)")
+    parser.add_argument("--storage-format", choices=list(SUFFIXES), default=None,
+                        help="Override storage.format for this run, e.g. 'feather' to pass "
+                             "intermediate tables between stages as Arrow files instead of CSV")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a cProfile dump per step to results/metrics/profiles/")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli_args()
+    with open(CONFIG_PATH, "r") as f:
+        config = yaml.safe_load(f)
+    if args.storage_format:
+        config.setdefault("storage", {})["format"] = args.storage_format
+
+    report = run_pipeline(build_stages(config), force=set(args.force), dry_run=args.dry_run,
+                          workers=args.workers, storage_format=args.storage_format, profile=args.profile)
+    for row in report:
+        logging.info(f"   {row['stage']:<32} {row['status']:<10} {row['seconds']:>8.2f}s")
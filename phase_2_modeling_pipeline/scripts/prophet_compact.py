@@ -0,0 +1,178 @@
+# phase_2_modeling_pipeline/scripts/prophet_compact.py
+
+"""
+prophet_compact.py
+-------------------
+Compact, pickle-free storage for fitted Prophet models.
+
+A model is stored as two files sharing a stem:
+    <stem>.json  - configuration, seasonalities, scaling and the component
+                   table labels (attribute lists from `prophet.serialize`)
+    <stem>.npz   - fitted parameters (k, m, delta, beta, sigma_obs),
+                   changepoints, the component table values, the history
+                   stub as plain columns and the history dates (start, step
+                   and count when they are evenly spaced)
+
+The training history is not stored; only its last two rows are kept, which
+is what Prophet needs to treat the model as fitted, to infer the data
+frequency and to plot components. Call `predict` with an explicit future
+DataFrame rather than relying on the in-sample default.
+
+Loading rebuilds the attributes directly from those arrays instead of going
+through `model_from_dict`, whose `pd.read_json` parsing dominated load time.
+
+Usage:
+    python prophet_compact.py phase_2_modeling_pipeline/models/prophet_model_mixed.pkl
+
+Author: Mantas Valantinavicius
+"""
+
+import json
+import logging
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+from prophet.serialize import ORDEREDDICT, SIMPLE_ATTRIBUTES, model_to_dict
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+HISTORY_STUB_ROWS = 2
+COMPACT_VERSION = 2
+
+
+def compact_paths(stem) -> tuple:
+    stem = Path(stem)
+    stem = stem.with_suffix("") if stem.suffix in (".json", ".npz", ".pkl") else stem
+    return stem.parent / f"{stem.name}.json", stem.parent / f"{stem.name}.npz"
+
+
+def save_compact(model, stem) -> tuple:
+    """Write a fitted Prophet model as `<stem>.json` + `<stem>.npz`."""
+    json_path, npz_path = compact_paths(stem)
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+
+    history, history_dates = model.history, model.history_dates
+    try:
+        model.history = history.tail(HISTORY_STUB_ROWS)
+        model.history_dates = None
+        model_dict = model_to_dict(model)
+    finally:
+        model.history, model.history_dates = history, history_dates
+
+    # The in-sample `trend` draw is one value per history row and is never used by `predict`
+    arrays = {f"param_{k}": np.asarray(v) for k, v in model.params.items() if k != "trend"}
+    arrays["changepoints_t"] = np.asarray(model.changepoints_t)
+    if model.changepoints is not None:
+        arrays["changepoints"] = model.changepoints.to_numpy()
+
+    dates = history_dates.to_numpy()
+    steps = np.diff(dates)
+    if len(dates) > 1 and (steps == steps[0]).all():
+        arrays["history_dates_start"], arrays["history_dates_step"] = dates[:1], steps[:1]
+        arrays["history_dates_count"] = np.array([len(dates)])
+    else:
+        arrays["history_dates"] = dates
+
+    components = model.train_component_cols
+    arrays["train_component_cols"] = components.to_numpy()
+    for col in model.history.columns:
+        arrays[f"history_{col}"] = model.history[col].tail(HISTORY_STUB_ROWS).to_numpy()
+    np.savez_compressed(npz_path, **arrays)
+
+    for attribute in ("params", "changepoints_t", "changepoints", "history", "history_dates", "train_component_cols"):
+        del model_dict[attribute]
+    model_dict["start"] = model.start.isoformat()
+    model_dict["t_scale"] = model.t_scale.value
+    model_dict["train_component_labels"] = [components.index.tolist(), components.columns.tolist()]
+    model_dict["train_holiday_names"] = None if model.train_holiday_names is None else model.train_holiday_names.tolist()
+    model_dict["compact_version"] = COMPACT_VERSION
+    with open(json_path, "w") as f:
+        json.dump(model_dict, f)
+    return json_path, npz_path
+
+
+def load_compact(stem):
+    """Rebuild a predict-capable Prophet model from `<stem>.json` + `<stem>.npz`."""
+    json_path, npz_path = compact_paths(stem)
+    with open(json_path, "r") as f:
+        model_dict = json.load(f)
+    if model_dict.get("compact_version") != COMPACT_VERSION:
+        raise ValueError(f"❌ {json_path} was written by an older prophet_compact; "
+                         f"re-run 03_train_prophet.py or convert the pickle again")
+
+    model = Prophet()  # Every attribute set here is overwritten below
+    for attribute in SIMPLE_ATTRIBUTES:
+        setattr(model, attribute, model_dict[attribute])
+    for attribute in ORDEREDDICT:
+        keys, values = model_dict[attribute]
+        setattr(model, attribute, OrderedDict((key, values[key]) for key in keys))
+    model.fit_kwargs = model_dict["fit_kwargs"]
+    model.start = pd.Timestamp(model_dict["start"])
+    model.t_scale = pd.Timedelta(model_dict["t_scale"])
+    if model_dict["train_holiday_names"] is not None:
+        model.train_holiday_names = pd.Series(model_dict["train_holiday_names"])
+    if model_dict["holidays"] is not None:
+        # Only user-supplied holiday tables take the slow JSON path
+        model.holidays = pd.read_json(StringIO(model_dict["holidays"]), typ="frame", orient="table",
+                                      convert_dates=["ds"])
+
+    with np.load(npz_path) as arrays:
+        model.params = {k[len("param_"):]: arrays[k] for k in arrays.files if k.startswith("param_")}
+        model.changepoints_t = arrays["changepoints_t"]
+        if "changepoints" in arrays.files:
+            model.changepoints = pd.Series(arrays["changepoints"], name="ds")
+
+        if "history_dates" in arrays.files:
+            dates = arrays["history_dates"]
+        else:
+            dates = arrays["history_dates_start"][0] + arrays["history_dates_step"][0] * np.arange(
+                arrays["history_dates_count"][0])
+        model.history_dates = pd.Series(dates, name="ds")
+
+        index, columns = model_dict["train_component_labels"]
+        model.train_component_cols = pd.DataFrame(arrays["train_component_cols"], index=pd.Index(index, name="col"),
+                                                  columns=pd.Index(columns, name="component"))
+        model.history = pd.DataFrame({k[len("history_"):]: arrays[k] for k in arrays.files
+                                      if k.startswith("history_") and not k.startswith("history_dates")})
+    return model
+
+
+def compare_with_pickle(pickle_path, stem=None) -> pd.DataFrame:
+    """Convert a pickled model to the compact format and report file size and load time of both."""
+    pickle_path = Path(pickle_path)
+    stem = stem or pickle_path
+
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+    json_path, npz_path = save_compact(model, stem)
+
+    def timed(load, repeats=5):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            load()
+        return (time.perf_counter() - start) / repeats
+
+    def load_pickle():
+        with open(pickle_path, "rb") as f:
+            return pickle.load(f)
+
+    return pd.DataFrame([
+        {"format": "pickle", "bytes": pickle_path.stat().st_size, "load_seconds": timed(load_pickle)},
+        {"format": "json+npz", "bytes": json_path.stat().st_size + npz_path.stat().st_size,
+         "load_seconds": timed(lambda: load_compact(stem))},
+    ])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python prophet_compact.py <pickled_prophet_model.pkl>")
+        sys.exit(1)
+    report = compare_with_pickle(sys.argv[1])
+    logging.info(f"📦 Compact model written next to {sys.argv[1]}\n{report.to_string(index=False)}")
@@ -0,0 +1,223 @@
+# phase_2_modeling_pipeline/scripts/render_plots.py
+
+"""
+render_plots.py
+----------------
+Headless render stage for all Phase 2 figures.
+
+Replaces running 07 / 08 / 08b one after the other: every source (actuals,
+each prediction table, each model) is loaded once in this process, the data
+each figure needs is cut down to a small payload, and the figures are drawn
+in a process pool with the non-interactive Agg backend. Prediction plots are
+rendered per model and, when the tables carry a `site_id` column, per site
+(under results/plots/sites/<site_id>/).
+
+The drawing functions are shared with 07 / 08 / 08b, which remain runnable
+on their own.
+
+Usage:
+    python render_plots.py --workers 8
+
+Author: Mantas Valantinavicius
+"""
+
+import argparse
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from storage import read_table, table_columns
+from instrumentation import track
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PLOT_DIR = Path("phase_2_modeling_pipeline/results/plots")
+PREDICTIONS_DIR = Path("phase_2_modeling_pipeline/results/predictions")
+MODELS_DIR = Path("phase_2_modeling_pipeline/models")
+FEATURES_PATH = Path("phase_2_modeling_pipeline/data/processed/feature_engineered_mixed.csv")
+
+FEATURES = [
+    'hour', 'day_of_week', 'month', 'is_weekend',
+    'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+    'temperature_C', 'lag_1h', 'lag_24h', 'roll_mean_24h'
+]
+SERIES_COL = "site_id"
+WEEK_ROWS = slice(500, 668)  # 168 hours = 1 week
+
+# (model name, prediction table, time column, prediction column)
+PREDICTION_SOURCES = [
+    ("Prophet", PREDICTIONS_DIR / "prophet_forecast_mixed.csv", "ds", "yhat"),
+    ("XGBoost", PREDICTIONS_DIR / "xgboost_predictions_mixed.csv", "timestamp", "predicted"),
+    ("Linear", PREDICTIONS_DIR / "linear_predictions_mixed.csv", "timestamp", "predicted"),
+]
+
+
+def render_prediction_plot(aligned: pd.DataFrame, model_name: str, out_path: Path) -> Path:
+    """Actual vs predicted line plot; `aligned` is indexed by timestamp with `actual`/`predicted`."""
+    fig, ax = plt.subplots(figsize=(12, 5))
+    ax.plot(aligned.index, aligned["actual"], label="Actual", color="black", linewidth=2)
+    ax.plot(aligned.index, aligned["predicted"], label="Predicted", linestyle="--")
+    ax.set_title(f"{model_name} - Actual vs Predicted (1 Week)")
+    ax.set_xlabel("Timestamp")
+    ax.set_ylabel("Energy (kWh)")
+    ax.legend()
+    fig.tight_layout()
+    return _save(fig, out_path)
+
+
+def render_feature_importance(features, importances, out_path: Path) -> Path:
+    fi_df = pd.DataFrame({"feature": features, "importance": importances}).sort_values("importance", ascending=True)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.barh(fi_df["feature"], fi_df["importance"], color="skyblue")
+    ax.set_xlabel("Importance Score")
+    ax.set_title("XGBoost Feature Importance")
+    fig.tight_layout()
+    return _save(fig, out_path)
+
+
+def render_linear_coefficients(features, coefficients, out_path: Path) -> Path:
+    df = pd.DataFrame({"feature": features, "coefficient": coefficients}).sort_values("coefficient", ascending=True)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.barh(df["feature"], df["coefficient"], color="orange")
+    ax.axvline(0, color="black", linewidth=1)
+    ax.set_title("Linear Regression Feature Coefficients")
+    ax.set_xlabel("Coefficient Value")
+    fig.tight_layout()
+    return _save(fig, out_path)
+
+
+def render_prophet_components(model_stem: Path, forecast_path: Path, out_path: Path) -> Path:
+    """Load the (compact or pickled) Prophet model and its forecast, and plot its components."""
+    from prophet_compact import compact_paths, load_compact
+
+    if compact_paths(model_stem)[0].exists():
+        model = load_compact(model_stem)
+    else:
+        with open(Path(model_stem).with_suffix(".pkl"), "rb") as f:
+            model = pickle.load(f)
+
+    fig = model.plot_components(read_table(forecast_path))
+    fig.set_size_inches(10, 6)
+    return _save(fig, out_path)
+
+
+def _save(fig, out_path: Path) -> Path:
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(out_path)
+    plt.close(fig)
+    return out_path
+
+
+def _render(task) -> Path:
+    """Process-pool worker: task is (render function, kwargs)."""
+    fn, kwargs = task
+    return fn(**kwargs)
+
+
+def prediction_tasks(plot_dir=PLOT_DIR) -> list:
+    """One task per model (and per site), each carrying only its 1-week aligned slice."""
+    actual_cols = ["timestamp", "energy_kWh"]
+    if SERIES_COL in table_columns(FEATURES_PATH):
+        actual_cols.append(SERIES_COL)
+    actuals = read_table(FEATURES_PATH, columns=actual_cols)
+
+    if SERIES_COL in actuals.columns:
+        actual_groups = {site: g for site, g in actuals.groupby(SERIES_COL, sort=True)}
+    else:
+        actual_groups = {None: actuals}
+    weeks = {site: g.set_index("timestamp")["energy_kWh"].iloc[WEEK_ROWS] for site, g in actual_groups.items()}
+
+    tasks = []
+    for model_name, path, time_col, pred_col in PREDICTION_SOURCES:
+        try:
+            available = table_columns(path)
+        except FileNotFoundError:
+            logging.warning(f"⚠ Predictions not found, skipping {model_name}: {path}")
+            continue
+        per_site = SERIES_COL in available and None not in weeks
+        columns = [time_col, pred_col] + ([SERIES_COL] if per_site else [])
+        preds = read_table(path, columns=columns).rename(columns={time_col: "timestamp", pred_col: "predicted"})
+
+        pred_groups = preds.groupby(SERIES_COL, sort=True) if per_site else [(None, preds)]
+        for site, group in pred_groups:
+            if site not in weeks:
+                continue
+            aligned = (group.set_index("timestamp")[["predicted"]]
+                       .join(weeks[site], how="inner").rename(columns={"energy_kWh": "actual"}))
+            out_dir = plot_dir if site is None else plot_dir / "sites" / str(site)
+            tasks.append((render_prediction_plot, {
+                "aligned": aligned, "model_name": model_name,
+                "out_path": out_dir / f"{model_name.lower()}_prediction_plot.png",
+            }))
+    return tasks
+
+
+def model_tasks(variant="mixed") -> list:
+    """Feature importance / coefficient / component plots, one per available model."""
+    import xgboost as xgb
+
+    tasks = []
+    xgb_path = MODELS_DIR / f"xgboost_model_{variant}.json"
+    if xgb_path.exists():
+        model = xgb.XGBRegressor()
+        model.load_model(xgb_path)
+        tasks.append((render_feature_importance, {
+            "features": FEATURES, "importances": model.feature_importances_,
+            "out_path": PLOT_DIR / "xgboost_feature_importance.png",
+        }))
+
+    linear_path = MODELS_DIR / f"linear_model_{variant}.pkl"
+    if linear_path.exists():
+        with open(linear_path, "rb") as f:
+            model = pickle.load(f)
+        tasks.append((render_linear_coefficients, {
+            "features": FEATURES, "coefficients": model.coef_,
+            "out_path": PLOT_DIR / "linear_feature_coefficients.png",
+        }))
+
+    prophet_stem = MODELS_DIR / f"prophet_model_{variant}"
+    forecast_path = PREDICTIONS_DIR / f"prophet_forecast_{variant}.csv"
+    if prophet_stem.with_suffix(".json").exists() or prophet_stem.with_suffix(".pkl").exists():
+        tasks.append((render_prophet_components, {
+            "model_stem": prophet_stem, "forecast_path": forecast_path,
+            "out_path": PLOT_DIR / "prophet_components_plot.png",
+        }))
+    return tasks
+
+
+def render_all(tasks: list, workers=None) -> list:
+    """Render every (function, kwargs) task; in a process pool unless `workers` is 1."""
+    workers = min(workers or os.cpu_count(), len(tasks)) if tasks else 1
+    logging.info(f"🖼 Rendering {len(tasks)} figures with {workers} worker(s)")
+    with track("render_plots.render_all", figures=len(tasks), workers=workers):
+        if workers <= 1:
+            paths = [_render(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                paths = list(pool.map(_render, tasks))
+    for path in paths:
+        logging.info(f"🖼 Saved plot: {path.resolve()}")
+    return paths
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description="Render all Phase 2 plots headlessly")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--variant", default="mixed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_cli_args()
+    render_all(prediction_tasks() + model_tasks(args.variant), workers=args.workers)
+    logging.info("✅ All plots generated.")
@@ -0,0 +1,240 @@
+# phase_2_modeling_pipeline/scripts/storage.py
+
+"""
+storage.py
+-----------
+Table storage backend shared by the Phase 2 scripts.
+
+Every intermediate table (cleaned data, features, predictions) goes through
+`write_table` / `read_table`. The on-disk format is selected by the `storage`
+section of `phase2_config.yaml`:
+
+    storage:
+      format: parquet      # csv | parquet | feather
+      compression: zstd
+
+Parquet and Feather (Arrow IPC) keep `timestamp`/`ds` typed as datetimes and
+support column pruning and predicate pushdown on read. CSV remains the default
+so existing artifacts keep working. The PHASE2_STORAGE_FORMAT environment
+variable overrides the configured format (used by `pipeline.py --storage-format`).
+
+`append_table` costs O(new rows) in every format: CSV is appended in place, and
+a Parquet/Feather table becomes a dataset directory of the same name
+(`<table>.parquet/part-00000.parquet`, `part-00001.parquet`, ...) with one new
+part file per append. All readers accept either layout; `write_table` replaces
+it with a single file again.
+
+Author: Mantas Valantinavicius
+"""
+
+import os
+import shutil
+import pandas as pd
+import yaml
+from pathlib import Path
+from instrumentation import track
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "config" / "phase2_config.yaml"
+
+SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+# Set by pipeline.py to switch the format of a whole run without editing the config
+STORAGE_FORMAT_ENV = "PHASE2_STORAGE_FORMAT"
+DATE_COLUMNS = ("timestamp", "ds")
+
+_settings_cache = {}
+
+
+def load_storage_settings(config=None) -> dict:
+    """Return the `storage` section (with defaults) from the given or default Phase 2 config."""
+    if config is None:
+        if "default" not in _settings_cache:
+            with open(CONFIG_PATH, "r") as file:
+                _settings_cache["default"] = yaml.safe_load(file) or {}
+        config = _settings_cache["default"]
+
+    settings = {"format": "csv", "compression": "zstd"}
+    settings.update(config.get("storage") or {})
+    if os.environ.get(STORAGE_FORMAT_ENV):
+        settings["format"] = os.environ[STORAGE_FORMAT_ENV]
+    if settings["format"] not in SUFFIXES:
+        raise ValueError(f"Unsupported storage format '{settings['format']}'. Use one of {list(SUFFIXES)}.")
+    return settings
+
+
+def table_path(path, config=None) -> Path:
+    """Swap the suffix of a table path to match the configured storage format."""
+    fmt = load_storage_settings(config)["format"]
+    return Path(path).with_suffix(SUFFIXES[fmt])
+
+
+def _format_of(path: Path) -> str:
+    for fmt, suffix in SUFFIXES.items():
+        if path.suffix == suffix:
+            return fmt
+    raise ValueError(f"Cannot infer table format from file name: {path}")
+
+
+def write_table(df: pd.DataFrame, path, config=None) -> Path:
+    """
+    Write `df` to `path` in the configured format (suffix adjusted accordingly).
+
+    Returns:
+        Path: The path actually written
+    """
+    settings = load_storage_settings(config)
+    path = table_path(path, config)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.is_dir():
+        # A table extended by `append_table`: replace the whole dataset
+        shutil.rmtree(path)
+
+    with track("write_table", rows=len(df), table=path.name):
+        _write(df, path, settings)
+    return path
+
+
+def _write(df: pd.DataFrame, path: Path, settings: dict):
+    if settings["format"] == "csv":
+        df.to_csv(path, index=False)
+    elif settings["format"] == "parquet":
+        df.to_parquet(path, index=False, compression=settings["compression"])
+    else:
+        df.reset_index(drop=True).to_feather(path, compression=settings["compression"])
+
+
+def append_table(df: pd.DataFrame, path, config=None) -> Path:
+    """
+    Append rows to a table written by `write_table` (creating it if missing).
+
+    CSV files are appended in place. Parquet/Feather files cannot be extended in
+    place, so the table is turned into a dataset directory (the existing file is
+    moved in as its first part) and the new rows are written as a further part.
+    Either way the existing rows are not read or rewritten.
+    """
+    settings = load_storage_settings(config)
+    path = table_path(path, config)
+    if not path.exists():
+        return write_table(df, path, config)
+
+    with track("append_table", rows=len(df), table=path.name):
+        if settings["format"] == "csv":
+            df.to_csv(path, mode="a", header=False, index=False)
+            return path
+
+        if path.is_file():
+            first_part = path.with_name(f"{path.name}.part")
+            path.rename(first_part)
+            path.mkdir()
+            first_part.rename(path / f"part-00000{path.suffix}")
+        n_parts = len(list(path.glob(f"part-*{path.suffix}")))
+        _write(df, path / f"part-{n_parts:05d}{path.suffix}", settings)
+    return path
+
+
+def _filter_frame(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """Apply pyarrow-style `[(column, op, value), ...]` filters to an in-memory frame (CSV fallback)."""
+    ops = {
+        "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v, "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+    }
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if pd.api.types.is_datetime64_any_dtype(df[column]) and op not in ("in", "not in"):
+            value = pd.Timestamp(value)
+        mask &= ops[op](df[column], value)
+    return df[mask].reset_index(drop=True)
+
+
+def _resolve_path(path, config=None, resolve=True) -> Path:
+    path = Path(path)
+    if resolve and table_path(path, config).exists():
+        path = table_path(path, config)
+    if not path.exists():
+        raise FileNotFoundError(f"❌ Table not found: {path.resolve()}")
+    return path
+
+
+def read_table(path, columns=None, filters=None, config=None, resolve=True) -> pd.DataFrame:
+    """
+    Read a table written by `write_table`.
+
+    Parameters:
+        path: Table path
+        columns (list, optional): Only load these columns
+        filters (list, optional): Row predicates as `[(column, op, value), ...]`, AND-ed
+            together. Pushed down to the scan for Parquet/Feather.
+        resolve (bool): Prefer the configured-format sibling of `path` when it exists;
+            pass False to read exactly `path`
+
+    Returns:
+        pd.DataFrame: Table with `timestamp`/`ds` columns typed as datetimes
+    """
+    path = _resolve_path(path, config, resolve)
+    with track("read_table", table=path.name) as record:
+        df = _read(path, columns, filters)
+        record["rows"] = len(df)
+    return df
+
+
+def _read(path: Path, columns=None, filters=None) -> pd.DataFrame:
+    fmt = _format_of(path)
+    if fmt == "csv":
+        # Filter columns are read too (as Parquet/Feather do) and dropped after filtering
+        usecols = None
+        if columns is not None:
+            usecols = list(columns) + [col for col, _, _ in filters or [] if col not in columns]
+        df = pd.read_csv(path, usecols=usecols)
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col])
+        if filters:
+            df = _filter_frame(df, filters)
+        return df if columns is None else df[list(columns)]
+
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    dataset = ds.dataset(path, format="parquet" if fmt == "parquet" else "ipc")
+    expression = None
+    if filters:
+        filters = [
+            (col, op, pd.Timestamp(val) if col in DATE_COLUMNS and op not in ("in", "not in") else val)
+            for col, op, val in filters
+        ]
+        expression = pq.filters_to_expression(filters)
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def table_columns(path, config=None, resolve=True) -> list:
+    """Column names of a table without loading its rows."""
+    path = _resolve_path(path, config, resolve)
+    if _format_of(path) == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+
+    import pyarrow.dataset as ds
+
+    return ds.dataset(path, format="parquet" if _format_of(path) == "parquet" else "ipc").schema.names
+
+
+def iter_table(path, columns=None, chunksize=100_000, config=None, resolve=True):
+    """
+    Yield a table written by `write_table` as DataFrames of at most `chunksize` rows,
+    so large tables can be processed without holding them in memory.
+    """
+    path = _resolve_path(path, config, resolve)
+    if _format_of(path) == "csv":
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+            for col in DATE_COLUMNS:
+                if col in chunk.columns:
+                    chunk[col] = pd.to_datetime(chunk[col])
+            yield chunk
+        return
+
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet" if _format_of(path) == "parquet" else "ipc")
+    for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+        if batch.num_rows:
+            yield batch.to_pandas()
@@ -8,11 +8,13 @@ Author: Mantas Valantinavicius
 """
 
 import argparse
+import copy
 import yaml
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 
 
@@ -30,11 +32,17 @@ def load_config(path: str) -> dict:
         return yaml.safe_load(f)
 
 
+def pandas_freq(freq: str) -> str:
+    """Config frequency ('1d', '1h', '10min', any case) as a current pandas alias ('1D', '1h', '10min')."""
+    freq = freq.lower()
+    return freq[:-1] + 'D' if freq.endswith('d') else freq
+
+
 def generate_timestamps(start_date: str, periods: int, freq: str) -> pd.DatetimeIndex:
-    return pd.date_range(start=start_date, periods=periods, freq=freq)
+    return pd.date_range(start=start_date, periods=periods, freq=pandas_freq(freq))
 
 
-def simulate_temperature(timestamps, profile="sinusoidal", std=1.5) -> list:
+def simulate_temperature(timestamps, profile="sinusoidal", std=1.5, rng=np.random) -> list:
     month_means = {1: 10, 2: 11, 3: 13, 4: 17, 5: 21, 6: 27, 7: 30, 8: 30,
                    9: 27, 10: 22, 11: 16, 12: 12}
     temps = []
@@ -45,7 +53,7 @@ def simulate_temperature(timestamps, profile="sinusoidal", std=1.5) -> list:
             fluctuation = hour_factor * 5
         else:
             fluctuation = 0
-        noise = np.random.normal(0, std)
+        noise = rng.normal(0, std)
         temps.append(base + fluctuation + noise)
     return temps
 
@@ -74,7 +82,8 @@ def compute_carbon(energy_kwh, timestamps, config):
     return [(e * get_emission_factor(ts, config)) / 1000 for e, ts in zip(energy_kwh, timestamps)]
 
 
-def generate_energy_profile(sector, timestamps, temperature, holidays, base_profile, comfort_temp, slope, behavior_std):
+def generate_energy_profile(sector, timestamps, temperature, holidays, base_profile, comfort_temp, slope, behavior_std,
+                            rng=np.random):
     energy = []
     for ts, temp, hol in zip(timestamps, temperature, holidays):
         base = base_profile[ts.hour]
@@ -86,12 +95,139 @@ def generate_energy_profile(sector, timestamps, temperature, holidays, base_prof
             base *= 1.1
         temp_effect = slope * abs(temp - comfort_temp)
         adjusted = base * (1 + temp_effect)
-        noise = np.random.normal(0, behavior_std)
+        noise = rng.normal(0, behavior_std)
         energy.append(max(adjusted + noise, 0.05))
     return energy
 
 
-def generate_dataset(config, sector: str, sector_profiles: dict) -> pd.DataFrame:
+MONTH_MEANS = np.array([np.nan, 10, 11, 13, 17, 21, 27, 30, 30, 27, 22, 16, 12])
+
+HOLIDAY_DATES = pd.to_datetime([
+    '2024-01-01', '2024-03-31', '2024-06-07',
+    '2024-09-21', '2024-12-25'
+])
+
+
+def simulate_temperature_vectorized(timestamps, profile="sinusoidal", std=1.5, rng=np.random) -> np.ndarray:
+    """
+    Array-based equivalent of `simulate_temperature`.
+
+    Monthly means are looked up by indexing MONTH_MEANS with the month array and
+    the noise for the whole series is drawn in a single RNG call.
+    """
+    base = MONTH_MEANS[timestamps.month.to_numpy()]
+    if profile == "sinusoidal":
+        fluctuation = np.cos((timestamps.hour.to_numpy() - 15) / 12 * np.pi) * 5
+    else:
+        fluctuation = 0
+    noise = rng.normal(0, std, size=len(timestamps))
+    return base + fluctuation + noise
+
+
+def get_holiday_flags_vectorized(timestamps) -> np.ndarray:
+    """Array-based equivalent of `get_holiday_flags`."""
+    return timestamps.normalize().isin(HOLIDAY_DATES).astype(int)
+
+
+def emission_factors_by_hour(config) -> np.ndarray:
+    """Return the 24-slot emission factor table implied by `get_emission_factor`."""
+    if config['emissions']['mode'] == 'static':
+        return np.full(24, config['emissions']['static_value'], dtype=float)
+    by_hour = config['emissions']['dynamic_by_hour']
+    factors = np.full(24, by_hour['default'], dtype=float)
+    factors[:6] = by_hour['night']
+    factors[10:17] = by_hour['midday']
+    return factors
+
+
+def compute_carbon_vectorized(energy_kwh, timestamps, config) -> np.ndarray:
+    """Array-based equivalent of `compute_carbon`."""
+    factors = emission_factors_by_hour(config)[timestamps.hour.to_numpy()]
+    return np.asarray(energy_kwh) * factors / 1000
+
+
+def generate_energy_profile_vectorized(sector, timestamps, temperature, holidays, base_profile, comfort_temp,
+                                       slope, behavior_std, rng=np.random) -> np.ndarray:
+    """
+    Array-based equivalent of `generate_energy_profile`.
+
+    The hourly base profile is indexed by the hour array, weekday/holiday
+    multipliers are applied as masks and behavioral noise is drawn in one call.
+    """
+    base = np.asarray(base_profile, dtype=float)[timestamps.hour.to_numpy()]
+    holidays = np.asarray(holidays, dtype=bool)
+    if sector == 'Commercial':
+        base = np.where(timestamps.weekday.to_numpy() >= 5, base * 0.3, base)
+        base = np.where(holidays, base * 0.2, base)
+    elif sector == 'Residential':
+        base = np.where(holidays, base * 1.1, base)
+    temp_effect = slope * np.abs(np.asarray(temperature) - comfort_temp)
+    adjusted = base * (1 + temp_effect)
+    noise = rng.normal(0, behavior_std, size=len(timestamps))
+    return np.maximum(adjusted + noise, 0.05)
+
+
+def get_periods(config) -> int:
+    """Number of timestamps implied by `days` and `frequency`."""
+    steps_per_day = {'1d': 1, '1h': 24, '10min': 144}
+    return config['days'] * steps_per_day.get(config['frequency'].lower(), 24)
+
+
+def simulate_frame(config, sector: str, timestamps, base_profile, slope, rng=np.random,
+                   energy_rng=None) -> pd.DataFrame:
+    """
+    Simulate temperature, holidays, energy and carbon for the given timestamps
+    using the configured engine. Anomalies are not applied here.
+
+    Temperature noise is drawn from `rng`, then energy noise from `energy_rng`
+    (default: the same `rng`).
+    """
+    energy_rng = rng if energy_rng is None else energy_rng
+    engine = config.get('engine', 'loop')
+    if engine == 'vectorized':
+        temperature = simulate_temperature_vectorized(timestamps,
+                                                      config['temperature']['profile'],
+                                                      config['temperature']['std'],
+                                                      rng=rng)
+        holidays = get_holiday_flags_vectorized(timestamps)
+        energy = generate_energy_profile_vectorized(
+            sector, timestamps, temperature, holidays,
+            base_profile,
+            config['temperature_impact']['comfort_temp'],
+            slope,
+            config['noise']['behavior_std'],
+            rng=energy_rng
+        )
+        carbon = compute_carbon_vectorized(energy, timestamps, config)
+    elif engine == 'loop':
+        temperature = simulate_temperature(timestamps,
+                                           config['temperature']['profile'],
+                                           config['temperature']['std'],
+                                           rng=rng)
+        holidays = get_holiday_flags(timestamps)
+        energy = generate_energy_profile(
+            sector, timestamps, temperature, holidays,
+            base_profile,
+            config['temperature_impact']['comfort_temp'],
+            slope,
+            config['noise']['behavior_std'],
+            rng=energy_rng
+        )
+        carbon = compute_carbon(energy, timestamps, config)
+    else:
+        raise ValueError(f"Unknown engine '{engine}'. Use 'loop' or 'vectorized'.")
+
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'sector': sector,
+        'energy_kWh': np.round(energy, 3),
+        'temperature_C': np.round(temperature, 1),
+        'holiday_flag': holidays,
+        'carbon_kgCO2e': np.round(carbon, 3)
+    })
+
+
+def generate_dataset(config, sector: str, sector_profiles: dict, rng=np.random, slope=None) -> pd.DataFrame:
     """
     Generate a complete synthetic dataset for a given sector.
 
@@ -99,45 +235,242 @@ def generate_dataset(config, sector: str, sector_profiles: dict) -> pd.DataFrame
         config (dict): Configuration settings
         sector (str): Sector name (e.g., 'Residential')
         sector_profiles (dict): Hourly base profiles from config
+        rng: Random source; defaults to the global NumPy state, fleet mode passes a per-site Generator
+        slope (float, optional): Temperature slope override; defaults to the sector slope from config
 
     Returns:
         pd.DataFrame: DataFrame with timestamps, temperature, energy, carbon, and anomaly flag
     """
     freq = config['frequency'].lower()
-    steps_per_day = {'1d': 1, '1h': 24, '10min': 144}
-    periods = config['days'] * steps_per_day.get(freq, 24)
+    periods = get_periods(config)
 
     timestamps = generate_timestamps(config['start_date'], periods, freq)
-    temperature = simulate_temperature(timestamps,
-                                       config['temperature']['profile'],
-                                       config['temperature']['std'])
-    holidays = get_holiday_flags(timestamps)
-    slope = config['temperature_impact'][f"slope_{sector.lower()}"]
-    base_profile = sector_profiles[sector]
-
-    energy = generate_energy_profile(
-        sector, timestamps, temperature, holidays,
-        base_profile,
-        config['temperature_impact']['comfort_temp'],
-        slope,
-        config['noise']['behavior_std']
-    )
-
-    carbon = compute_carbon(energy, timestamps, config)
-
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'sector': sector,
-        'energy_kWh': np.round(energy, 3),
-        'temperature_C': np.round(temperature, 1),
-        'holiday_flag': holidays,
-        'carbon_kgCO2e': np.round(carbon, 3)
-    })
+    if slope is None:
+        slope = config['temperature_impact'][f"slope_{sector.lower()}"]
+
+    df = simulate_frame(config, sector, timestamps, sector_profiles[sector], slope, rng=rng)
 
-    df = inject_anomalies(df, config)
+    df = inject_anomalies(df, config, rng=None if rng is np.random else rng)
     return df
 
 
+def iter_dataset_chunks(config, sector: str, sector_profiles: dict, rng=np.random, slope=None):
+    """
+    Streaming counterpart of `generate_dataset`.
+
+    Yields consecutive DataFrames of at most `streaming.chunk_days` days each, so
+    peak memory is bounded by the chunk size rather than by `days`. Chunks carry
+    a global RangeIndex and, concatenated, equal `generate_dataset` with the same
+    random source, anomalies included.
+
+    `generate_dataset` draws all temperature noise, then all energy noise, then
+    the anomalies. To keep that order per chunk, temperature and energy are drawn
+    from two copies of `rng`, the second advanced past the temperature draws
+    (skipped in chunk-sized blocks). `rng` itself is advanced past both and the
+    anomalies are planned from it up front, so it ends where `generate_dataset`
+    leaves it.
+
+    Yields:
+        pd.DataFrame: Chunk with the same columns as `generate_dataset`
+    """
+    freq = config['frequency'].lower()
+    periods = get_periods(config)
+    chunk_size = max(1, config['streaming']['chunk_days'] * (periods // config['days']))
+    step = pd.tseries.frequencies.to_offset(pandas_freq(freq))
+    start = pd.Timestamp(config['start_date'])
+    if slope is None:
+        slope = config['temperature_impact'][f"slope_{sector.lower()}"]
+
+    temperature_rng, energy_rng = fork_rng(rng), fork_rng(rng)
+    skip_normals(energy_rng, periods, chunk_size)
+    skip_normals(rng, 2 * periods, chunk_size)
+
+    plan = None
+    if config.get("anomalies", {}).get("enabled", False):
+        if rng is np.random:
+            np.random.seed(config["anomalies"].get("random_seed", 42))  # as in `inject_anomalies`
+        plan = plan_anomalies(config, periods, rng)
+
+    for offset in range(0, periods, chunk_size):
+        n = min(chunk_size, periods - offset)
+        timestamps = generate_timestamps(start + offset * step, n, freq)
+        df = simulate_frame(config, sector, timestamps, sector_profiles[sector], slope,
+                            rng=temperature_rng, energy_rng=energy_rng)
+        df.index = pd.RangeIndex(offset, offset + n)
+        if plan is None:
+            df["anomaly_flag"] = 0
+        else:
+            df = apply_anomalies(df, config, plan)
+        yield df
+
+
+def fork_rng(rng=np.random):
+    """Independent copy of a random source in its current state (the global NumPy state included)."""
+    if rng is np.random:
+        fork = np.random.RandomState()
+        fork.set_state(np.random.get_state())
+        return fork
+    return copy.deepcopy(rng)
+
+
+def skip_normals(rng, n: int, block: int):
+    """Advance `rng` past `n` normal draws, `block` at a time."""
+    for start in range(0, n, block):
+        rng.normal(size=min(block, n - start))
+
+
+def mix_sectors(df_res: pd.DataFrame, df_com: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """Blend aligned residential and commercial frames into the Mixed profile."""
+    w = config['residential_weight']
+    df_mix = df_res.copy()
+    df_mix['sector'] = 'Mixed'
+    df_mix['energy_kWh'] = w * df_res['energy_kWh'] + (1 - w) * df_com['energy_kWh']
+    df_mix['temperature_C'] = w * df_res['temperature_C'] + (1 - w) * df_com['temperature_C']
+    df_mix['carbon_kgCO2e'] = (df_mix['energy_kWh'] * config['emissions']['static_value']) / 1000
+    df_mix['anomaly_flag'] = 0  # Optional: Mixed sector has no anomalies injected
+    return df_mix
+
+
+def output_file(output_dir: Path, stem: str, config: dict) -> Path:
+    """Build an output path whose suffix matches `output_format` ('csv' or 'parquet')."""
+    fmt = config.get('output_format', 'csv')
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown output_format '{fmt}'. Use 'csv' or 'parquet'.")
+    return Path(output_dir) / f"{stem}.{fmt}"
+
+
+def write_output(df: pd.DataFrame, path: Path, config: dict):
+    """Write a frame as CSV or compressed Parquet depending on the path suffix."""
+    if path.suffix == '.parquet':
+        df.to_parquet(path, index=False, compression=config.get('parquet_compression', 'zstd'))
+    else:
+        df.to_csv(path, index=False)
+
+
+def stream_to_files(chunks, paths: dict, config: dict) -> dict:
+    """
+    Append streamed chunks to their output files as they are produced.
+    CSV chunks are appended to the file; Parquet chunks become row groups of a
+    single file via a `pyarrow.parquet.ParquetWriter`.
+
+    Parameters:
+        chunks (dict): Sector key ('res'/'com') -> chunk iterator
+        paths (dict): Output key ('res'/'com'/'mix') -> output path; 'mix' requires
+            both 'res' and 'com' chunks
+        config (dict): Configuration settings
+
+    Returns:
+        dict: Output key -> number of rows written
+    """
+    keys = list(chunks)
+    rows = {key: 0 for key in paths}
+    writers = {}
+    write_mix = 'mix' in paths
+    try:
+        for parts in zip(*chunks.values()):
+            frames = dict(zip(keys, parts))
+            if write_mix:
+                frames['mix'] = mix_sectors(frames['res'], frames['com'], config)
+            for key, df in frames.items():
+                if paths[key].suffix == '.parquet':
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if key not in writers:
+                        writers[key] = pq.ParquetWriter(paths[key], table.schema,
+                                                        compression=config.get('parquet_compression', 'zstd'))
+                    writers[key].write_table(table)
+                else:
+                    df.to_csv(paths[key], mode='w' if rows[key] == 0 else 'a', header=rows[key] == 0, index=False)
+                rows[key] += len(df)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return rows
+
+
+def build_fleet_specs(config: dict) -> list:
+    """
+    Draw per-site parameters for fleet mode.
+
+    Every site gets its own child of a root `np.random.SeedSequence`, so the
+    output of a site depends only on the fleet seed and its position in the
+    fleet, never on the number of workers or the order sites are scheduled.
+
+    Returns:
+        list[dict]: One spec per site (site_id, sector, profile_scale, slope, seed_seq)
+    """
+    fleet = config['fleet']
+    root = np.random.SeedSequence(fleet.get('seed', 2024))
+    param_seq, *site_seqs = root.spawn(fleet['n_sites'] + 1)
+    param_rng = np.random.default_rng(param_seq)
+
+    sectors = list(fleet['sector_mix'].keys())
+    weights = np.array(list(fleet['sector_mix'].values()), dtype=float)
+    site_sectors = param_rng.choice(sectors, size=fleet['n_sites'], p=weights / weights.sum())
+    scales = param_rng.uniform(*fleet['profile_scale_range'], size=fleet['n_sites'])
+    jitter = param_rng.uniform(-fleet['slope_jitter'], fleet['slope_jitter'], size=fleet['n_sites'])
+
+    specs = []
+    for i, seq in enumerate(site_seqs):
+        sector = str(site_sectors[i])
+        base_slope = config['temperature_impact'][f"slope_{sector.lower()}"]
+        specs.append({
+            'site_id': f"site_{i:05d}",
+            'sector': sector,
+            'profile_scale': float(scales[i]),
+            'slope': float(base_slope * (1 + jitter[i])),
+            'seed_seq': seq,
+        })
+    return specs
+
+
+def generate_site(config: dict, spec: dict) -> pd.DataFrame:
+    """Generate the dataset for a single fleet site described by `spec`."""
+    rng = np.random.default_rng(spec['seed_seq'])
+    base_profile = [v * spec['profile_scale'] for v in config['sector_profiles'][spec['sector']]]
+    df = generate_dataset(config, spec['sector'], {spec['sector']: base_profile}, rng=rng, slope=spec['slope'])
+    df.insert(1, 'site_id', spec['site_id'])
+    return df
+
+
+def _generate_and_write_site(args) -> tuple:
+    """Process-pool worker: generate one site and write it to its partition."""
+    config, spec, fleet_dir = args
+    df = generate_site(config, spec)
+    partition = Path(fleet_dir) / f"sector={spec['sector']}"
+    partition.mkdir(parents=True, exist_ok=True)
+    path = output_file(partition, spec['site_id'], config)
+    write_output(df, path, config)
+    return spec['site_id'], str(path), len(df)
+
+
+def generate_fleet(config: dict, output_dir: Path) -> pd.DataFrame:
+    """
+    Generate a multi-site fleet in parallel and write one file per site,
+    partitioned by sector (`<output_dir>/<output_subdir>/sector=<name>/<site_id>.<output_format>`).
+
+    Returns:
+        pd.DataFrame: Manifest with site parameters, output path and row count per site
+    """
+    fleet = config['fleet']
+    specs = build_fleet_specs(config)
+    fleet_dir = output_dir / fleet.get('output_subdir', 'fleet')
+    workers = fleet.get('workers') or os.cpu_count()
+
+    tasks = [(config, spec, str(fleet_dir)) for spec in specs]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_generate_and_write_site, tasks, chunksize=chunksize))
+
+    manifest = pd.DataFrame([
+        {'site_id': s['site_id'], 'sector': s['sector'], 'profile_scale': s['profile_scale'],
+         'slope': s['slope'], 'path': path, 'rows': rows}
+        for s, (_, path, rows) in zip(specs, results)
+    ])
+    manifest.to_csv(fleet_dir / "manifest.csv", index=False)
+    print(f"✅ Fleet of {len(specs)} sites saved to {fleet_dir} using {workers} workers")
+    return manifest
 
 
 def main(config_path: str):
@@ -153,76 +486,118 @@ def main(config_path: str):
     output_dir = Path(config['output_dir'])
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    if config.get('fleet', {}).get('enabled', False):
+        generate_fleet(config, output_dir)
+        return
+
+    if config.get('streaming', {}).get('enabled', False):
+        chunks, paths = {}, {}
+        if config['generate']['residential']:
+            chunks['res'] = iter_dataset_chunks(config, 'Residential', sector_profiles)
+            paths['res'] = output_file(output_dir, "synthetic_energy_residential_365d", config)
+        if config['generate']['commercial']:
+            chunks['com'] = iter_dataset_chunks(config, 'Commercial', sector_profiles)
+            paths['com'] = output_file(output_dir, "synthetic_energy_commercial_365d", config)
+        if config['generate']['mixed'] and 'res' in chunks and 'com' in chunks:
+            paths['mix'] = output_file(output_dir, "synthetic_energy_mixed_365d", config)
+        rows = stream_to_files(chunks, paths, config)
+        for key, n in rows.items():
+            print(f"✅ Streamed {n} rows to {paths[key]}")
+        return
+
     paths = {}
 
     if config['generate']['residential']:
         df_res = generate_dataset(config, 'Residential', sector_profiles)
-        path_res = output_dir / "synthetic_energy_residential_365d.csv"
-        df_res.to_csv(path_res, index=False)
+        path_res = output_file(output_dir, "synthetic_energy_residential_365d", config)
+        write_output(df_res, path_res, config)
         print(f"✅ Residential data saved to {path_res}")
         paths['res'] = path_res
 
     if config['generate']['commercial']:
         df_com = generate_dataset(config, 'Commercial', sector_profiles)
-        path_com = output_dir / "synthetic_energy_commercial_365d.csv"
-        df_com.to_csv(path_com, index=False)
+        path_com = output_file(output_dir, "synthetic_energy_commercial_365d", config)
+        write_output(df_com, path_com, config)
         print(f"✅ Commercial data saved to {path_com}")
         paths['com'] = path_com
 
     if config['generate']['mixed'] and 'res' in paths and 'com' in paths:
-        df_res = pd.read_csv(paths['res'], parse_dates=['timestamp'])
-        df_com = pd.read_csv(paths['com'], parse_dates=['timestamp'])
-
-        w = config['residential_weight']
-        df_mix = df_res.copy()
-        df_mix['sector'] = 'Mixed'
-        df_mix['energy_kWh'] = w * df_res['energy_kWh'] + (1 - w) * df_com['energy_kWh']
-        df_mix['temperature_C'] = w * df_res['temperature_C'] + (1 - w) * df_com['temperature_C']
-        df_mix['carbon_kgCO2e'] = (df_mix['energy_kWh'] * config['emissions']['static_value']) / 1000
-        df_mix['anomaly_flag'] = 0  # Optional: Mixed sector has no anomalies injected
-
-        path_mix = output_dir / "synthetic_energy_mixed_365d.csv"
-        df_mix.to_csv(path_mix, index=False)
+        df_mix = mix_sectors(df_res, df_com, config)
+
+        path_mix = output_file(output_dir, "synthetic_energy_mixed_365d", config)
+        write_output(df_mix, path_mix, config)
         print(f"✅ Mixed-use data saved to {path_mix}")
 
 
-def inject_anomalies(df: pd.DataFrame, config: dict) -> pd.DataFrame:
+def plan_anomalies(config: dict, periods: int, rng) -> tuple:
     """
-    Inject synthetic anomalies into energy consumption data.
+    Draw anomaly positions, types and shift percentages for a series of `periods` rows.
 
-    Parameters:
-        df (pd.DataFrame): Original clean dataset
-        config (dict): Config section for anomaly parameters
+    Draws happen in the same order as the original per-row injection, so a
+    reseeded global state reproduces the previous output exactly.
 
     Returns:
-        pd.DataFrame: Dataset with anomalies applied and flagged
+        tuple: (positions, types, shift_pcts) arrays; shift_pcts is NaN for non-shift anomalies
     """
-    if not config.get("anomalies", {}).get("enabled", False):
-        df["anomaly_flag"] = 0
-        return df
-
-    df = df.copy()
-    np.random.seed(config["anomalies"].get("random_seed", 42))
     count = config["anomalies"]["count"]
     anomaly_types = config["anomalies"]["types"]
-    anomaly_indices = np.random.choice(df.index, size=count, replace=False)
+    positions = np.asarray(rng.choice(periods, size=count, replace=False))
+    types, pcts = [], []
+    for _ in positions:
+        atype = rng.choice(anomaly_types)
+        types.append(atype)
+        pcts.append(rng.uniform(*config["anomalies"]["shift_percent_range"]) if atype == "shift" else np.nan)
+    return positions, np.asarray(types), np.asarray(pcts)
+
 
+def apply_anomalies(df: pd.DataFrame, config: dict, plan: tuple) -> pd.DataFrame:
+    """
+    Apply the planned anomalies whose positions fall inside `df`'s RangeIndex.
+
+    Returns:
+        pd.DataFrame: Copy of `df` with anomalies applied and flagged
+    """
+    df = df.copy()
     df["anomaly_flag"] = 0
+    positions, types, pcts = plan
+    in_frame = (positions >= df.index[0]) & (positions <= df.index[-1])
 
-    for idx in anomaly_indices:
-        atype = np.random.choice(anomaly_types)
+    for idx, atype, pct in zip(positions[in_frame], types[in_frame], pcts[in_frame]):
         if atype == "spike":
             df.at[idx, "energy_kWh"] *= config["anomalies"]["spike_multiplier"]
         elif atype == "dropout":
             df.at[idx, "energy_kWh"] = config["anomalies"]["dropout_value"]
         elif atype == "shift":
-            pct = np.random.uniform(*config["anomalies"]["shift_percent_range"])
             df.at[idx, "energy_kWh"] *= (1 + pct)
         df.at[idx, "anomaly_flag"] = 1
 
     return df
 
 
+def inject_anomalies(df: pd.DataFrame, config: dict, rng=None) -> pd.DataFrame:
+    """
+    Inject synthetic anomalies into energy consumption data.
+
+    Parameters:
+        df (pd.DataFrame): Original clean dataset
+        config (dict): Config section for anomaly parameters
+        rng (np.random.Generator, optional): Per-site random source. When omitted the
+            global NumPy state is reseeded with `anomalies.random_seed`.
+
+    Returns:
+        pd.DataFrame: Dataset with anomalies applied and flagged
+    """
+    if not config.get("anomalies", {}).get("enabled", False):
+        df["anomaly_flag"] = 0
+        return df
+
+    if rng is None:
+        np.random.seed(config["anomalies"].get("random_seed", 42))
+        rng = np.random
+    plan = plan_anomalies(config, len(df), rng)
+    return apply_anomalies(df, config, plan)
+
+
 
 if __name__ == "__main__":
     args = parse_cli_args()
@@ -0,0 +1,45 @@
+# tests/conftest.py
+
+"""
+conftest.py
+------------
+Shared pytest setup: puts the script directories on `sys.path` (the scripts
+import their siblings plainly, as when run from the repo root) and loads the
+numbered Phase 2 scripts, whose names are not valid module names.
+
+Author: Mantas Valantinavicius
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PHASE2_SCRIPTS = REPO_ROOT / "phase_2_modeling_pipeline" / "scripts"
+DEPLOYMENT_DIR = REPO_ROOT / "phase_2_modeling_pipeline" / "deployment_ready"
+GENERATOR_DIR = REPO_ROOT / "scripts"
+
+for path in (PHASE2_SCRIPTS, DEPLOYMENT_DIR, GENERATOR_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+def load_script(name):
+    """Import `phase_2_modeling_pipeline/scripts/<name>.py`, e.g. `load_script("02_feature_engineering")`."""
+    module_name = f"phase2_{name}"
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, PHASE2_SCRIPTS / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
+
+
+@pytest.fixture(autouse=True)
+def isolated_metrics(tmp_path, monkeypatch):
+    """Keep stage metrics written by instrumented code out of the repo."""
+    monkeypatch.setenv("PHASE2_METRICS_PATH", str(tmp_path / "metrics.jsonl"))
+    monkeypatch.delenv("PHASE2_STORAGE_FORMAT", raising=False)
+    monkeypatch.delenv("PHASE2_PROFILE", raising=False)
@@ -0,0 +1,97 @@
+# tests/test_backtesting.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtesting
+from backtesting import FEATURE_COLS, run_backtest, time_splits
+
+
+def feature_frame(n_rows=240, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0, 1, (n_rows, len(FEATURE_COLS))), columns=FEATURE_COLS)
+    return df.assign(timestamp=pd.date_range("2024-01-01", periods=n_rows, freq="h"),
+                     energy_kWh=df["lag_1h"] * 3 + df["temperature_C"] + rng.normal(0, 0.1, n_rows))
+
+
+def test_expanding_fold_boundaries():
+    assert time_splits(100, 3, 10) == [(0, 70, 70, 80), (0, 80, 80, 90), (0, 90, 90, 100)]
+
+
+def test_sliding_fold_boundaries_with_gap():
+    assert time_splits(100, 3, 10, "sliding", train_size=30, gap=5) == [
+        (35, 65, 70, 80), (45, 75, 80, 90), (55, 85, 90, 100)]
+
+
+@pytest.mark.parametrize("kwargs", [dict(n_folds=10, test_size=10), dict(mode="rolling"), dict(mode="sliding")])
+def test_invalid_splits_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        time_splits(**{"n_rows": 100, "n_folds": 3, "test_size": 10, **kwargs})
+
+
+@pytest.mark.parametrize("mode,train_size,gap", [("expanding", None, 0), ("expanding", None, 24), ("sliding", 48, 6)])
+def test_splits_never_train_on_or_after_the_test_window(mode, train_size, gap):
+    splits = time_splits(1000, 5, 100, mode, train_size, gap)
+    for train_start, train_end, test_start, test_end in splits:
+        assert 0 <= train_start < train_end <= test_start - gap < test_end
+    # Test windows tile the end of the series without overlapping
+    assert [s[2] for s in splits[1:]] == [s[3] for s in splits[:-1]]
+    assert splits[-1][3] == 1000
+
+
+class LastSeenRow:
+    """Predicts the last training row index it was fitted on, read back from the MAE."""
+
+    def fit(self, X, y):
+        self.last_row = X[:, 0].max()
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.last_row)
+
+
+def test_folds_only_see_rows_before_their_test_window(monkeypatch):
+    # Row index as both feature and target, shuffled: run_backtest must restore time order itself
+    n = 200
+    df = pd.DataFrame(0.0, index=range(n), columns=FEATURE_COLS).assign(
+        timestamp=pd.date_range("2024-01-01", periods=n, freq="h"), energy_kWh=np.arange(n, dtype=float))
+    df[FEATURE_COLS[0]] = np.arange(n, dtype=float)
+    monkeypatch.setattr(backtesting, "make_model", lambda name: LastSeenRow())
+
+    folds, _ = run_backtest(df.sample(frac=1, random_state=0), models=("rows",), n_folds=4, test_size=20,
+                            gap=3, workers=2)
+
+    for fold, (_, train_end, test_start, test_end) in enumerate(time_splits(n, 4, 20, gap=3)):
+        row = folds.loc[folds["fold"] == fold].iloc[0]
+        assert row["MAE"] == pytest.approx((test_start + test_end - 1) / 2 - (train_end - 1))
+        assert row["test_from"] == df["timestamp"][test_start]
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    df = feature_frame()
+    single, single_summary = run_backtest(df, n_folds=3, test_size=24, workers=1)
+    pooled, pooled_summary = run_backtest(df, n_folds=3, test_size=24, workers=4)
+
+    pd.testing.assert_frame_equal(single.drop(columns="fit_seconds"), pooled.drop(columns="fit_seconds"))
+    pd.testing.assert_frame_equal(single_summary, pooled_summary)
+
+
+def test_shared_memory_is_unlinked_when_a_fold_fails(monkeypatch):
+    created = []
+
+    class RecordingSharedMemory(backtesting.shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(backtesting.shared_memory, "SharedMemory", RecordingSharedMemory)
+
+    with pytest.raises(ValueError, match="Unknown model"):
+        run_backtest(feature_frame(), models=("linear", "not-a-model"), n_folds=2, test_size=24, workers=2)
+
+    assert len(created) == 2
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            backtesting.shared_memory.SharedMemory(name=name)
@@ -0,0 +1,59 @@
+# tests/test_evaluate_models.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load_script
+
+
+@pytest.fixture
+def panel_results(tmp_path, monkeypatch):
+    """Feature and prediction tables for two sites, in the layout 06 reads, under `tmp_path`."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MPLBACKEND", "Agg")
+    processed = tmp_path / "phase_2_modeling_pipeline/data/processed"
+    predictions = tmp_path / "phase_2_modeling_pipeline/results/predictions"
+    processed.mkdir(parents=True)
+    predictions.mkdir(parents=True)
+
+    timestamps = pd.date_range("2024-01-01", periods=48, freq="h")
+    actuals = pd.concat([pd.DataFrame({"timestamp": timestamps, "site_id": site, "energy_kWh": 10.0 + i})
+                         for i, site in enumerate(["A", "B"])], ignore_index=True)
+    actuals.to_csv(processed / "feature_engineered_mixed.csv", index=False)
+
+    # Site A is predicted exactly, site B is off by 2 kWh
+    predicted = actuals["energy_kWh"] + np.where(actuals["site_id"] == "B", 2.0, 0.0)
+    for name in ("xgboost", "linear"):
+        actuals.assign(actual=actuals["energy_kWh"], predicted=predicted).drop(columns="energy_kWh") \
+            .to_csv(predictions / f"{name}_predictions_mixed.csv", index=False)
+    pd.DataFrame({"ds": actuals["timestamp"], "site_id": actuals["site_id"], "yhat": predicted,
+                  "yhat_lower": predicted - 1, "yhat_upper": predicted + 1}) \
+        .to_csv(predictions / "prophet_forecast_mixed.csv", index=False)
+    return tmp_path / "phase_2_modeling_pipeline/results"
+
+
+def test_per_site_summaries(panel_results):
+    evaluate = load_script("06_evaluate_models")
+    overall = evaluate.run_evaluation()
+
+    assert list(overall["model"]) == ["Prophet", "XGBoost", "Linear"]
+    assert overall["RMSE"].tolist() == pytest.approx([np.sqrt(2.0)] * 3)
+
+    site_a = pd.read_csv(panel_results / "sites/A/model_evaluation_summary.csv")
+    site_b = pd.read_csv(panel_results / "sites/B/model_evaluation_summary.csv")
+    assert list(site_a.columns) == ["model", "RMSE", "MAE", "MAPE"]
+    assert site_a["RMSE"].tolist() == pytest.approx([0.0] * 3)
+    assert site_b["MAE"].tolist() == pytest.approx([2.0] * 3)
+
+    by_hour = pd.read_csv(panel_results / "model_evaluation_by_hour.csv")
+    assert len(by_hour) == 3 * 24
+
+
+def test_comparison_chart_is_saved_and_closed(panel_results):
+    import matplotlib.pyplot as plt
+
+    load_script("06_evaluate_models").run_evaluation()
+
+    assert (panel_results / "model_comparison_chart.png").stat().st_size > 0
+    assert plt.get_fignums() == []
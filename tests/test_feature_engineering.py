@@ -0,0 +1,71 @@
+# tests/test_feature_engineering.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load_script
+
+fe = load_script("02_feature_engineering")
+FEATURE_COLS = ["hour", "day_of_week", "month", "is_weekend", "hour_sin", "hour_cos", "dow_sin", "dow_cos",
+                "lag_1h", "lag_24h", "roll_mean_24h"]
+
+
+def readings(freq="1h", days=6, drop=(), seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-01-01", periods=days * pd.Timedelta("1D") // pd.Timedelta(freq), freq=freq)
+    df = pd.DataFrame({"timestamp": timestamps, "energy_kWh": rng.uniform(0.5, 2.0, len(timestamps)),
+                       "temperature_C": rng.normal(15, 5, len(timestamps)), "sector": "Residential"})
+    return df.drop(index=list(drop)).reset_index(drop=True)
+
+
+def incremental(df, batches, **settings):
+    """Full run on the rows before the first split, then one `run_incremental` per batch."""
+    cuts = [df["timestamp"].iloc[0] + pd.Timedelta(b) for b in batches] + [df["timestamp"].iloc[-1] + pd.Timedelta("1s")]
+    state = fe.build_state(df[df["timestamp"] < cuts[0]], settings.get("frequency"),
+                           settings.get("gap_fill", "none"), settings.get("gap_fill_limit"))
+    parts = []
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        batch = df[(df["timestamp"] >= start) & (df["timestamp"] < end)].copy()
+        rows, state = fe.run_incremental(batch, state)
+        parts.append(rows)
+    return pd.concat(parts, ignore_index=True), cuts[0]
+
+
+@pytest.mark.parametrize("freq, drop, settings", [
+    ("1h", (), {}),
+    ("1h", (70, 71, 95), {}),
+    ("10min", (500, 501, 502), {}),
+    ("1h", (60, 61, 62, 90), {"gap_fill": "ffill", "gap_fill_limit": 2}),
+    ("1h", (71, 72, 73), {"gap_fill": "interpolate"}),
+])
+def test_incremental_matches_full_run(freq, drop, settings):
+    df = readings(freq, drop=drop)
+    full = fe.run(df.copy(), **settings)
+    rows, first_new = incremental(df, ["3D", "3D 5h", "4D 1h"], **settings)
+
+    expected = full[full["timestamp"] >= first_new].reset_index(drop=True)
+    assert len(rows) == len(expected)
+    pd.testing.assert_frame_equal(rows[["timestamp", "energy_kWh"] + FEATURE_COLS],
+                                  expected[["timestamp", "energy_kWh"] + FEATURE_COLS])
+
+
+def test_lags_follow_time_not_rows():
+    df = readings("10min", drop=(300,))
+    full = fe.run(df.copy()).set_index("timestamp")
+    energy = df.set_index("timestamp")["energy_kWh"]
+
+    ts = pd.Timestamp("2024-01-04 06:00")
+    assert full.loc[ts, "lag_1h"] == energy[ts - pd.Timedelta("1h")]
+    assert full.loc[ts, "lag_24h"] == energy[ts - pd.Timedelta("24h")]
+    # The dropped reading leaves lag_24h undefined 24h later, so that row is dropped
+    dropped = readings("10min")["timestamp"].iloc[300]
+    assert dropped + pd.Timedelta("24h") not in full.index
+
+
+def test_state_keeps_only_the_lookback():
+    df = readings("1h", days=10)
+    state = fe.build_state(df)
+    assert state["frequency"] == str(pd.Timedelta("1h"))
+    assert len(state["tail"]["timestamp"]) == 26
+    assert pd.Timestamp(state["tail"]["timestamp"][0]) == df["timestamp"].iloc[-1] - pd.Timedelta("25h")
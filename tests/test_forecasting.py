@@ -0,0 +1,50 @@
+# tests/test_forecasting.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting import FEATURE_COLS, forecast_frame, lag_steps
+
+
+class LagModel:
+    """Linear stand-in that predicts one feature column unchanged."""
+
+    def __init__(self, feature):
+        self.coef_ = np.array([float(c == feature) for c in FEATURE_COLS])
+        self.intercept_ = 0.0
+
+
+def history(freq, days=3):
+    timestamps = pd.date_range("2024-03-01", periods=days * 24 * lag_steps(freq)[0], freq=freq)
+    return pd.DataFrame({"timestamp": timestamps, "energy_kWh": np.arange(len(timestamps), dtype=float),
+                         "temperature_C": 10.0})
+
+
+@pytest.mark.parametrize("freq, expected", [("h", (1, 24)), ("15min", (4, 96)), ("10min", (6, 144))])
+def test_lag_steps(freq, expected):
+    assert lag_steps(freq) == expected
+
+
+def test_lag_steps_rejects_coarser_than_hourly():
+    with pytest.raises(ValueError):
+        lag_steps("2h")
+
+
+@pytest.mark.parametrize("freq", ["h", "15min"])
+def test_lags_are_measured_in_hours(freq):
+    df = history(freq)
+    steps_per_hour, window = lag_steps(freq)
+
+    lag_24h = forecast_frame(LagModel("lag_24h"), df, horizon=3, freq=freq)
+    np.testing.assert_array_equal(lag_24h["predicted"], df["energy_kWh"].iloc[-window:-window + 3])
+
+    lag_1h = forecast_frame(LagModel("lag_1h"), df, horizon=1, freq=freq)
+    assert lag_1h["predicted"].iloc[0] == df["energy_kWh"].iloc[-steps_per_hour]
+    assert lag_1h["horizon_h"].iloc[0] == pytest.approx(1 / steps_per_hour)
+
+
+def test_gap_in_last_24h_is_rejected():
+    df = history("h").drop(index=60)
+    with pytest.raises(ValueError, match="consecutive"):
+        forecast_frame(LagModel("lag_1h"), df, horizon=2)
@@ -0,0 +1,36 @@
+# tests/test_instrumentation.py
+
+import pandas as pd
+
+from instrumentation import load_metrics, track
+from storage import read_table, write_table
+
+
+def test_nothing_is_recorded_without_a_metrics_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("PHASE2_METRICS_PATH")
+    monkeypatch.setenv("PHASE2_PROFILE", "1")
+
+    path = write_table(pd.DataFrame({"x": [1, 2]}), tmp_path / "table.csv", {"storage": {"format": "csv"}})
+    read_table(path)
+    with track("step") as record:
+        record["rows"] = 2
+
+    assert sorted(p.name for p in tmp_path.rglob("*")) == ["table.csv"]
+
+
+def test_records_and_profiles_go_next_to_the_metrics_path(tmp_path, monkeypatch):
+    metrics = tmp_path / "run" / "metrics.jsonl"
+    monkeypatch.setenv("PHASE2_METRICS_PATH", str(metrics))
+    monkeypatch.setenv("PHASE2_PROFILE", "1")
+
+    with track("outer", rows=3):
+        with track("inner"):
+            sum(range(1000))
+
+    records = load_metrics()
+    assert records["step"].tolist() == ["inner", "outer"]
+    assert records["status"].tolist() == ["ok", "ok"]
+    assert records.loc[1, "rows"] == 3
+    assert (tmp_path / "run" / "profiles" / "outer.prof").exists()
+    assert not (tmp_path / "run" / "profiles" / "inner.prof").exists()
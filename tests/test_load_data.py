@@ -0,0 +1,25 @@
+# tests/test_load_data.py
+
+import pandas as pd
+
+from conftest import load_script
+
+load_data = load_script("01_load_data")
+
+
+def test_sqlite_window_is_read_in_chunks_and_parsed(tmp_path):
+    raw = pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=48, freq="h").astype(str),
+                        "sector": ["A", "B"] * 24, "energy_kWh": range(48)})
+    raw.to_csv(tmp_path / "raw.csv", index=False)
+    db_path = load_data.import_csv_to_sqlite(tmp_path / "raw.csv", tmp_path / "meters.db", "readings", chunksize=10)
+
+    config = {"data_source": {"type": "sqlite", "path": str(db_path), "table": "readings", "chunksize": 5,
+                              "sectors": ["B"], "start": "2024-01-01 10:00", "end": "2024-01-02 00:00"}}
+    df = load_data.load_data(config)
+
+    assert pd.api.types.is_datetime64_any_dtype(df["timestamp"])
+    assert df["sector"].eq("B").all()
+    assert df["timestamp"].min() == pd.Timestamp("2024-01-01 11:00")
+    assert df["timestamp"].max() == pd.Timestamp("2024-01-01 23:00")
+    assert df["energy_kWh"].tolist() == list(range(11, 24, 2))
+    assert df["timestamp"].is_monotonic_increasing
@@ -0,0 +1,75 @@
+# tests/test_online_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from online_features import WINDOW, MeterState, OnlineFeatureService
+
+
+class StubPredictor:
+    features = ["hour", "lag_1h", "lag_24h", "roll_mean_24h"]
+
+    def predict_array(self, rows):
+        return rows[:, 1]
+
+
+def hourly(start, n):
+    return pd.date_range(start, periods=n, freq="h")
+
+
+def filled_state(n=WINDOW):
+    state = MeterState()
+    for i, ts in enumerate(hourly("2024-01-01", n)):
+        state.push(ts, float(i))
+    return state
+
+
+def test_contiguous_readings_give_hourly_lags():
+    state = filled_state(30)
+    assert state.lag_1h() == 29.0
+    assert state.lag_24h() == 6.0
+    assert state.roll_mean_24h() == pytest.approx(np.mean(np.arange(6, 30)))
+
+
+def test_gap_is_rejected_by_default():
+    state = filled_state()
+    with pytest.raises(ValueError, match="Gap in readings"):
+        state.push(state.last_timestamp + pd.Timedelta(hours=3), 1.0)
+
+
+@pytest.mark.parametrize("timestamp", ["2024-01-01 23:00", "2024-01-02 00:30"])
+def test_repeated_or_off_grid_reading_is_rejected(timestamp):
+    state = filled_state()
+    with pytest.raises(ValueError):
+        state.push(timestamp, 1.0)
+
+
+@pytest.mark.parametrize("method, filled", [("ffill", [23.0, 23.0]), ("zero", [0.0, 0.0]),
+                                            ("interpolate", [25.0, 27.0])])
+def test_gap_fill_writes_the_missing_hours(method, filled):
+    state = filled_state()
+    state.push(state.last_timestamp + pd.Timedelta(hours=3), 29.0, gap_fill=method)
+    assert state.last_timestamp == pd.Timestamp("2024-01-02 02:00")
+    recent = [state.buffer[(state.pos - k) % WINDOW] for k in (3, 2, 1)]
+    assert recent == filled + [29.0]
+
+
+def test_features_for_only_serves_the_next_hour():
+    service = OnlineFeatureService(predictor=StubPredictor())
+    history = pd.DataFrame({"timestamp": hourly("2024-01-01", WINDOW), "energy_kWh": np.arange(WINDOW, dtype=float)})
+    service.warm_start("m1", history)
+
+    assert service.predict("m1", "2024-01-02 00:00", 10.0) == 23.0
+    with pytest.raises(ValueError, match="can only predict"):
+        service.features_for("m1", "2024-01-02 05:00", 10.0)
+
+
+def test_warm_start_fills_gaps_when_configured():
+    history = pd.DataFrame({"timestamp": hourly("2024-01-01", WINDOW + 1), "energy_kWh": 1.0}).drop(index=[10, 11])
+    with pytest.raises(ValueError, match="Gap in readings"):
+        OnlineFeatureService(predictor=StubPredictor()).warm_start("m1", history)
+
+    service = OnlineFeatureService(predictor=StubPredictor(), gap_fill="ffill")
+    service.warm_start("m1", history)
+    assert service.state("m1").ready
@@ -0,0 +1,93 @@
+# tests/test_pipeline_cache.py
+
+from pathlib import Path
+
+import pytest
+
+import pipeline
+from pipeline import FileHasher, StageCache, local_modules, run_pipeline, stage_key
+
+WRITER = """\
+import os, sys
+from pathlib import Path
+import helper
+
+fmt = os.environ.get("PHASE2_STORAGE_FORMAT") or "csv"
+out = Path("out").with_suffix("." + fmt)
+out.write_text(helper.VALUE + Path("input.txt").read_text())
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A throwaway scripts dir, config and cache, with the pipeline run from `tmp_path`."""
+    scripts = tmp_path / "scripts"
+    scripts.mkdir()
+    (scripts / "writer.py").write_text(WRITER)
+    (scripts / "helper.py").write_text("from base import VALUE\n")
+    (scripts / "base.py").write_text("VALUE = 'v1:'\n")
+    (tmp_path / "config.yaml").write_text("storage: {format: csv}\n")
+    (tmp_path / "input.txt").write_text("data")
+
+    cache = tmp_path / ".cache"
+    monkeypatch.setattr(pipeline, "SCRIPTS_DIR", scripts)
+    monkeypatch.setattr(pipeline, "CONFIG_PATH", tmp_path / "config.yaml")
+    monkeypatch.setattr(pipeline, "CACHE_DIR", cache)
+    monkeypatch.setattr(pipeline, "OBJECTS_DIR", cache / "objects")
+    monkeypatch.setattr(pipeline, "INDEX_PATH", cache / "index.json")
+    monkeypatch.setattr(pipeline, "FILE_HASHES_PATH", cache / "file_hashes.json")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def writer_stage(workspace, storage_format="csv"):
+    return {"name": "writer", "script": workspace / "scripts" / "writer.py", "storage_format": storage_format,
+            "inputs": [Path("input.txt")], "outputs": [Path(f"out.{storage_format}")]}
+
+
+def run(workspace, storage_format="csv"):
+    report = run_pipeline([writer_stage(workspace, storage_format)], storage_format=storage_format)
+    return report[0]["status"]
+
+
+def test_unchanged_stage_is_cached_and_deleted_output_restored(workspace):
+    assert run(workspace) == "ran"
+    assert run(workspace) == "cached"
+
+    (workspace / "out.csv").unlink()
+    assert run(workspace) == "cached"
+    assert (workspace / "out.csv").read_text() == "v1:data"
+
+
+def test_input_change_invalidates(workspace):
+    run(workspace)
+    (workspace / "input.txt").write_text("other")
+    assert run(workspace) == "ran"
+
+
+def test_storage_format_switch_is_a_miss(workspace):
+    assert run(workspace, "csv") == "ran"
+    assert run(workspace, "feather") == "ran"
+    assert (workspace / "out.feather").exists()
+    assert run(workspace, "csv") == "cached"
+
+
+def test_local_modules_are_followed_transitively(workspace):
+    scripts = workspace / "scripts"
+    assert local_modules(scripts / "writer.py") == [scripts / "base.py", scripts / "helper.py"]
+
+    run(workspace)
+    (scripts / "base.py").write_text("VALUE = 'v2:'\n")
+    assert run(workspace) == "ran"
+    assert (workspace / "out.csv").read_text() == "v2:data"
+
+
+def test_entry_missing_a_declared_output_is_a_miss(workspace):
+    run(workspace)
+    stage = writer_stage(workspace)
+    hasher = FileHasher()
+    key = stage_key(stage, hasher)
+    assert StageCache(hasher).restore(stage, key)
+
+    stage["outputs"].append(Path("extra.csv"))
+    assert not StageCache(hasher).restore(stage, key)
@@ -0,0 +1,51 @@
+# tests/test_prophet_compact.py
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from prophet_compact import compact_paths, load_compact, save_compact
+
+
+def fitted_model(drop_rows=()):
+    history = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=14 * 24, freq="h")})
+    history["y"] = 5 + np.sin(np.arange(len(history)) * np.pi / 12) + np.arange(len(history)) / 500
+    return Prophet(daily_seasonality=True, weekly_seasonality=True).fit(history.drop(index=list(drop_rows)))
+
+
+@pytest.mark.parametrize("drop_rows", [(), (40, 41, 200)], ids=["evenly-spaced", "with-gaps"])
+def test_round_trip_predicts_like_the_original(tmp_path, drop_rows):
+    model = fitted_model(drop_rows)
+    save_compact(model, tmp_path / "model")
+    loaded = load_compact(tmp_path / "model")
+
+    pd.testing.assert_series_equal(loaded.history_dates, model.history_dates)
+    pd.testing.assert_series_equal(loaded.changepoints, model.changepoints, check_index=False)
+    pd.testing.assert_frame_equal(loaded.train_component_cols, model.train_component_cols)
+    assert loaded.seasonalities == model.seasonalities
+    assert loaded.start == model.start and loaded.t_scale == model.t_scale
+
+    future = pd.DataFrame({"ds": pd.date_range("2024-01-10", periods=96, freq="h")})
+    np.random.seed(0)
+    expected = model.predict(future)
+    np.random.seed(0)
+    pd.testing.assert_frame_equal(loaded.predict(future), expected)
+
+
+def test_evenly_spaced_history_dates_are_stored_as_a_range(tmp_path):
+    _, npz_path = save_compact(fitted_model(), tmp_path / "model")
+    with np.load(npz_path) as arrays:
+        assert "history_dates" not in arrays.files
+        assert arrays["history_dates_count"][0] == 14 * 24
+
+
+def test_old_format_is_rejected(tmp_path):
+    json_path, _ = save_compact(fitted_model(), tmp_path / "model")
+    model_dict = json.loads(json_path.read_text())
+    del model_dict["compact_version"]
+    json_path.write_text(json.dumps(model_dict))
+    with pytest.raises(ValueError, match="older prophet_compact"):
+        load_compact(compact_paths(tmp_path / "model.json")[0])
@@ -0,0 +1,55 @@
+# tests/test_report_fragments.py
+
+import os
+import time
+
+import pytest
+
+from conftest import load_script
+
+report = load_script("09_generate_phase2_report")
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report, "FRAGMENT_CACHE_DIR", tmp_path / "fragments")
+    return tmp_path / "fragments"
+
+
+def build_note(doc, text):
+    doc.add_paragraph(text)
+
+
+def test_fragments_are_reused_and_marked_as_used(cache_dir):
+    report.get_fragment(build_note, {"text": "hello"}, [])
+    (path,) = cache_dir.glob("build_note_*.docx")
+    os.utime(path, (0, 0))
+
+    fragment = report.get_fragment(build_note, {"text": "hello"}, [])
+
+    assert [p.text for p in fragment.paragraphs] == ["hello"]
+    assert list(cache_dir.glob("*.docx")) == [path]
+    assert path.stat().st_mtime > time.time() - 60
+
+
+def test_prune_keeps_used_fragments_and_the_newest_stale_ones(cache_dir):
+    cache_dir.mkdir()
+    now = time.time()
+    for section in ("build_title", "build_performance"):
+        for age in range(1, 9):
+            path = cache_dir / f"{section}_{age:064x}.docx"
+            path.write_bytes(b"")
+            os.utime(path, (now - 3600 * age, now - 3600 * age))
+    for site in ("A", "B", "C", "D", "E", "F", "G"):  # one fragment per site, all used by this run
+        (cache_dir / f"build_title_{site * 64}.docx").write_bytes(b"")
+    interrupted = cache_dir / "build_title_abc.123.tmp"
+    interrupted.write_bytes(b"")
+    os.utime(interrupted, (now - 60, now - 60))
+
+    removed = report.prune_fragments(since=now - 30)
+
+    assert removed == 2 * (8 - report.MAX_STALE_FRAGMENTS_PER_SECTION) + 1
+    kept_ages = {int(p.stem.rsplit("_", 1)[1], 16) for p in cache_dir.glob("build_performance_*.docx")}
+    assert kept_ages == set(range(1, report.MAX_STALE_FRAGMENTS_PER_SECTION + 1))
+    assert len(list(cache_dir.glob("build_title_*.docx"))) == 7 + report.MAX_STALE_FRAGMENTS_PER_SECTION
+    assert not interrupted.exists()
@@ -0,0 +1,121 @@
+# tests/test_serve.py
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from serve import InferenceServer, MicroBatcher
+
+
+class FakePredictor:
+    features = ["a", "b"]
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_array(self, X):
+        self.batches.append(len(X))
+        return X.sum(axis=1)
+
+
+def run_batched(coro_fn, **batcher_kwargs):
+    predictor = FakePredictor()
+
+    async def main():
+        batcher = MicroBatcher(predictor, **batcher_kwargs)
+        batcher.start()
+        try:
+            return await coro_fn(batcher)
+        finally:
+            await batcher.stop()
+
+    return predictor, asyncio.run(main())
+
+
+def test_concurrent_submits_share_one_predict_call():
+    async def submit_all(batcher):
+        return await asyncio.gather(*(batcher.submit(np.array([[i, 1.0]], dtype=np.float32)) for i in range(5)))
+
+    predictor, results = run_batched(submit_all, max_batch_size=64, max_wait_ms=50)
+    assert predictor.batches == [5]
+    assert results == [[i + 1.0] for i in range(5)]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    async def submit_rows(batcher):
+        return await batcher.submit(np.arange(10, dtype=np.float32).reshape(5, 2))
+
+    predictor, results = run_batched(submit_rows, max_batch_size=2, max_wait_ms=50)
+    assert predictor.batches == [2, 2, 1]
+    assert results == [1.0, 5.0, 9.0, 13.0, 17.0]
+
+
+def test_rows_arriving_after_max_wait_go_into_the_next_batch():
+    async def submit_apart(batcher):
+        first = asyncio.create_task(batcher.submit(np.ones((1, 2), dtype=np.float32)))
+        await asyncio.sleep(0.2)
+        second = await batcher.submit(np.ones((1, 2), dtype=np.float32))
+        return await first, second
+
+    predictor, results = run_batched(submit_apart, max_batch_size=64, max_wait_ms=10)
+    assert predictor.batches == [1, 1]
+    assert results == ([2.0], [2.0])
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[]", b'{"a": 1}', b'{"instances": [{"a": 1, "b": "x"}]}', b"3"])
+def test_bad_payloads_are_rejected_with_400(body):
+    server = InferenceServer(FakePredictor())
+    status, payload = asyncio.run(server._route("POST", "/predict", body))
+    assert status == 400
+    assert "error" in payload
+
+
+def test_routing_errors():
+    server = InferenceServer(FakePredictor())
+    assert asyncio.run(server._route("GET", "/predict", b""))[0] == 405
+    assert asyncio.run(server._route("GET", "/nope", b""))[0] == 404
+    assert asyncio.run(server._route("GET", "/health", b"")) == (200, {"status": "ok", "features": ["a", "b"]})
+
+
+async def exchange(server, raw: bytes) -> list:
+    """Send raw bytes to a live server and return the parsed (status, body) responses."""
+    tcp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = tcp.sockets[0].getsockname()[1]
+    server.batcher.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        responses = []
+        while status_line := await reader.readline():
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers["content-length"]))
+            responses.append((int(status_line.split()[1]), json.loads(body)))
+        writer.close()
+        return responses
+    finally:
+        tcp.close()
+        await tcp.wait_closed()
+        await server.batcher.stop()
+
+
+def request(body: bytes, connection="keep-alive") -> bytes:
+    return (f"POST /predict HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: {connection}\r\n\r\n").encode() + body
+
+
+def test_keep_alive_requests_are_answered_in_order():
+    raw = request(b'{"a": 1, "b": 2}') + request(b'{"instances": [{"a": 3, "b": 4}, {"a": 0, "b": 0}]}', "close")
+    responses = asyncio.run(exchange(InferenceServer(FakePredictor()), raw))
+    assert responses == [(200, {"predictions": [3.0]}), (200, {"predictions": [7.0, 0.0]})]
+
+
+@pytest.mark.parametrize("raw", [b"GARBAGE\r\n\r\n", b"POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n"])
+def test_malformed_requests_get_400_instead_of_a_silent_disconnect(raw):
+    responses = asyncio.run(exchange(InferenceServer(FakePredictor()), raw))
+    assert len(responses) == 1
+    assert responses[0][0] == 400
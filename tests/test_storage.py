@@ -0,0 +1,41 @@
+# tests/test_storage.py
+
+import pandas as pd
+import pytest
+
+from storage import append_table, read_table, write_table
+
+
+def frame():
+    return pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=6, freq="h"),
+                         "sector": ["A", "B"] * 3, "energy_kWh": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]})
+
+
+@pytest.fixture(params=["csv", "parquet", "feather"])
+def table(request, tmp_path):
+    config = {"storage": {"format": request.param}}
+    return write_table(frame(), tmp_path / "table.csv", config), config
+
+
+def test_filter_on_a_column_that_is_not_selected(table):
+    path, config = table
+    df = read_table(path, columns=["timestamp", "energy_kWh"], filters=[("sector", "==", "B")], config=config)
+    assert list(df.columns) == ["timestamp", "energy_kWh"]
+    assert df["energy_kWh"].tolist() == [2.0, 4.0, 6.0]
+
+
+def test_time_filter_and_column_order(table):
+    path, config = table
+    df = read_table(path, columns=["energy_kWh", "timestamp"], filters=[("timestamp", ">=", "2024-01-01 04:00")],
+                    config=config)
+    assert list(df.columns) == ["energy_kWh", "timestamp"]
+    assert df["energy_kWh"].tolist() == [5.0, 6.0]
+
+
+def test_append_then_read_back(table):
+    path, config = table
+    append_table(frame().assign(energy_kWh=0.0), path, config)
+    append_table(frame().assign(energy_kWh=-1.0), path, config)
+    df = read_table(path, config=config, resolve=False)
+    assert len(df) == 18
+    assert df["energy_kWh"].tolist()[:6] == frame()["energy_kWh"].tolist()
@@ -0,0 +1,118 @@
+# tests/test_synthetic_generator.py
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import synthetic_data_generator_v2 as generator
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "scripts" / "config" / "synthetic_config.yaml"
+
+
+def small_config(engine, frequency="1h", emissions="dynamic", profile="sinusoidal"):
+    config = generator.load_config(CONFIG_PATH)
+    config.update(engine=engine, days=30, frequency=frequency)
+    config["emissions"]["mode"] = emissions
+    config["temperature"]["profile"] = profile
+    return config
+
+
+@pytest.mark.parametrize("sector", ["Residential", "Commercial"])
+@pytest.mark.parametrize("frequency, emissions, profile", [
+    ("1h", "dynamic", "sinusoidal"),
+    ("10min", "static", "flat"),
+    ("1d", "dynamic", "sinusoidal"),
+])
+def test_vectorized_engine_matches_loop(sector, frequency, emissions, profile):
+    frames = {}
+    for engine in ("loop", "vectorized"):
+        config = small_config(engine, frequency, emissions, profile)
+        frames[engine] = generator.generate_dataset(config, sector, config["sector_profiles"],
+                                                    rng=np.random.default_rng(7))
+
+    pd.testing.assert_frame_equal(frames["vectorized"], frames["loop"], check_dtype=False)
+
+
+def test_unknown_engine_is_rejected():
+    config = small_config("numba")
+    with pytest.raises(ValueError, match="Unknown engine"):
+        generator.generate_dataset(config, "Residential", config["sector_profiles"], rng=np.random.default_rng(7))
+
+
+@pytest.mark.parametrize("frequency, expected", [("1d", "1D"), ("1D", "1D"), ("1H", "1h"), ("10min", "10min")])
+def test_frequency_aliases_are_normalized(frequency, expected):
+    assert generator.pandas_freq(frequency) == expected
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+@pytest.mark.parametrize("make_rng", [lambda: np.random.default_rng(11), lambda: np.random.RandomState(11)])
+def test_streamed_chunks_equal_in_memory_frame(engine, make_rng):
+    config = small_config(engine)
+    config["streaming"]["chunk_days"] = 7   # 30 days -> 5 chunks, the last one partial
+
+    full = generator.generate_dataset(config, "Residential", config["sector_profiles"], rng=make_rng())
+    chunks = list(generator.iter_dataset_chunks(config, "Residential", config["sector_profiles"], rng=make_rng()))
+
+    assert len(chunks) == 5
+    streamed = pd.concat(chunks)
+    assert streamed["anomaly_flag"].sum() == config["anomalies"]["count"]
+    pd.testing.assert_frame_equal(streamed, full, check_dtype=False)
+
+
+def test_streaming_with_global_state_matches_and_leaves_it_in_step():
+    config = small_config("vectorized")
+    config["streaming"]["chunk_days"] = 10
+
+    np.random.seed(5)
+    full = generator.generate_dataset(config, "Commercial", config["sector_profiles"])
+    after_full = np.random.normal(size=3)
+
+    np.random.seed(5)
+    streamed = pd.concat(generator.iter_dataset_chunks(config, "Commercial", config["sector_profiles"]))
+    pd.testing.assert_frame_equal(streamed, full, check_dtype=False)
+    np.testing.assert_array_equal(np.random.normal(size=3), after_full)
+
+
+def test_stream_to_files_matches_in_memory_outputs(tmp_path):
+    config = small_config("vectorized")
+    config["streaming"]["chunk_days"] = 7
+    paths = {key: tmp_path / f"{key}.csv" for key in ("res", "com", "mix")}
+    rows = generator.stream_to_files({
+        "res": generator.iter_dataset_chunks(config, "Residential", config["sector_profiles"],
+                                             rng=np.random.default_rng(1)),
+        "com": generator.iter_dataset_chunks(config, "Commercial", config["sector_profiles"],
+                                             rng=np.random.default_rng(2)),
+    }, paths, config)
+
+    res = generator.generate_dataset(config, "Residential", config["sector_profiles"], rng=np.random.default_rng(1))
+    com = generator.generate_dataset(config, "Commercial", config["sector_profiles"], rng=np.random.default_rng(2))
+    mix = generator.mix_sectors(res, com, config)
+    for key, expected in (("res", res), ("com", com), ("mix", mix)):
+        assert rows[key] == len(expected)
+        written = pd.read_csv(paths[key], parse_dates=["timestamp"])
+        pd.testing.assert_frame_equal(written, expected.reset_index(drop=True), check_dtype=False, atol=1e-9)
+
+
+def fleet_config(tmp_path, workers):
+    config = small_config("vectorized")
+    config["fleet"].update(enabled=True, n_sites=6, workers=workers, seed=123)
+    config["output_dir"] = str(tmp_path / f"workers_{workers}")
+    return config
+
+
+def test_fleet_output_does_not_depend_on_worker_count(tmp_path):
+    manifests = {}
+    for workers in (1, 3):
+        config = fleet_config(tmp_path, workers)
+        manifests[workers] = generator.generate_fleet(config, Path(config["output_dir"]))
+
+    one, three = manifests[1], manifests[3]
+    pd.testing.assert_frame_equal(one.drop(columns="path"), three.drop(columns="path"))
+    assert one["site_id"].is_unique and len(one) == 6
+    for path_one, path_three in zip(one["path"], three["path"]):
+        pd.testing.assert_frame_equal(pd.read_csv(path_one), pd.read_csv(path_three))
+    # Sites draw from independent streams
+    first, second = (pd.read_csv(p)["temperature_C"] for p in one["path"][:2])
+    assert not first.equals(second)
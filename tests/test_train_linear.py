@@ -0,0 +1,41 @@
+# tests/test_train_linear.py
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+
+from conftest import load_script
+
+linear = load_script("05_train_linear")
+
+
+def features(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n, len(linear.FEATURE_COLS))), columns=linear.FEATURE_COLS)
+    df["energy_kWh"] = df.to_numpy() @ rng.normal(size=len(linear.FEATURE_COLS)) + 3 + rng.normal(0, 0.1, n)
+    return df.assign(timestamp=pd.date_range("2024-01-01", periods=n, freq="h"))
+
+
+def test_update_equals_a_full_refit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = features()
+    old, new = df.iloc[:1500].copy(), df.iloc[1500:].copy()
+
+    linear.run(old)
+    first, second = new.iloc[:300], new.iloc[300:]
+    linear.update(first)
+    model = linear.update(second)
+
+    # `run` trains on its 80% split of the old rows; every update adds all new rows
+    X_train, _, y_train, _ = train_test_split(old[linear.FEATURE_COLS], old["energy_kWh"],
+                                              test_size=0.2, random_state=42)
+    refit = LinearRegression().fit(pd.concat([X_train, new[linear.FEATURE_COLS]]),
+                                   pd.concat([y_train, new["energy_kWh"]]))
+    np.testing.assert_allclose(model.coef_, refit.coef_, atol=1e-9)
+    np.testing.assert_allclose(model.intercept_, refit.intercept_, atol=1e-9)
+
+    _, last_timestamp = linear.load_stats(linear.stats_path())
+    assert last_timestamp == df["timestamp"].max()
+    # Re-sending rows that were already added leaves the model unchanged
+    np.testing.assert_array_equal(linear.update(second).coef_, model.coef_)
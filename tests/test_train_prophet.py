@@ -0,0 +1,68 @@
+# tests/test_train_prophet.py
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from conftest import load_script
+
+prophet_script = load_script("03_train_prophet")
+
+
+def site_panel(sites=("S1", "S2", "S3"), days=5):
+    frames = []
+    for offset, site in enumerate(sites):
+        timestamps = pd.date_range("2024-01-01", periods=days * 24, freq="h")
+        frames.append(pd.DataFrame({"timestamp": timestamps, "sector": "Residential", "site_id": site,
+                                    "energy_kWh": 5 + offset + np.sin(np.arange(len(timestamps)) * np.pi / 12)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_batch_fits_one_model_per_group_then_warm_starts(workdir):
+    cold = prophet_script.run_batch(site_panel(), max_workers=2)
+
+    assert cold["group"].tolist() == [f"prophet_model_mixed_Residential_{s}" for s in ("S1", "S2", "S3")]
+    assert cold["rows"].tolist() == [120, 120, 120]
+    assert not cold["warm_start"].any()
+    for group in cold["group"]:
+        assert (prophet_script.BATCH_MODEL_DIR / f"{group}.init.json").exists()
+    assert len(list(prophet_script.BATCH_FORECAST_DIR.iterdir())) == 3
+
+    warm = prophet_script.run_batch(site_panel(), max_workers=2)
+    assert warm["warm_start"].all()
+    assert warm["group"].tolist() == cold["group"].tolist()
+
+
+def test_fit_group_passes_the_saved_parameters_as_init(workdir, monkeypatch):
+    group = site_panel(sites=("S1",))
+    task = ("mixed", ("Residential", "S1"), group[["timestamp", "energy_kWh"]].rename(
+        columns={"timestamp": "ds", "energy_kWh": "y"}))
+    prophet_script.BATCH_MODEL_DIR.mkdir(parents=True)
+    prophet_script._fit_group(task)
+    with open(prophet_script.BATCH_MODEL_DIR / "prophet_model_mixed_Residential_S1.init.json") as f:
+        saved = json.load(f)
+
+    inits = []
+    original_fit = Prophet.fit
+
+    def recording_fit(self, df, **kwargs):
+        inits.append(kwargs.get("init"))
+        return original_fit(self, df, **kwargs)
+
+    monkeypatch.setattr(Prophet, "fit", recording_fit)
+    result = prophet_script._fit_group(task)
+
+    assert result["warm_start"]
+    assert len(inits) == 1
+    assert inits[0].keys() == saved.keys()
+    for name, value in saved.items():
+        np.testing.assert_allclose(np.asarray(inits[0][name], dtype=float), np.asarray(value, dtype=float))
@@ -0,0 +1,81 @@
+# tests/test_train_xgboost.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load_script
+
+xgb_script = load_script("04_train_xgboost")
+
+
+def feature_panel(sites=("A", "B"), days=10, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for offset, site in enumerate(sites):
+        # Sites start at different times, so a per-series split would not line up
+        timestamps = pd.date_range("2024-01-01", periods=days * 24, freq="h") + pd.Timedelta(hours=5 * offset)
+        frame = pd.DataFrame(rng.uniform(0, 1, (len(timestamps), len(xgb_script.FEATURE_COLS))),
+                             columns=xgb_script.FEATURE_COLS)
+        frames.append(frame.assign(timestamp=timestamps, site_id=site, sector="Residential",
+                                   energy_kWh=frame["lag_1h"] * 2 + rng.normal(0, 0.1, len(frame))))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_holdout_cutoff_is_the_last_fifth_of_timestamps():
+    timestamps = pd.date_range("2024-01-01", periods=100, freq="h")
+    cutoff = xgb_script.holdout_cutoff(np.concatenate([timestamps, timestamps[:50]]))
+    assert cutoff == timestamps[80]
+
+
+def test_global_holdout_is_time_ordered(workdir):
+    df = feature_panel()
+    xgb_script.run_global(df, num_boost_round=5, n_jobs=1)
+
+    preds = pd.read_csv(workdir / "phase_2_modeling_pipeline/results/predictions/xgboost_predictions_global.csv",
+                        parse_dates=["timestamp"])
+    cutoff = xgb_script.holdout_cutoff(df["timestamp"])
+    assert (preds["timestamp"] >= cutoff).all()
+    assert len(preds) == (df["timestamp"] >= cutoff).sum()
+
+
+def test_external_memory_holdout_uses_the_timestamp_cutoff(workdir):
+    df = feature_panel()
+    partitions = workdir / "features"
+    partitions.mkdir()
+    for site, group in df.groupby("site_id"):
+        group.to_csv(partitions / f"site_{site}.csv", index=False)
+
+    files = xgb_script.feature_partitions(partitions)
+    cutoff = xgb_script.holdout_cutoff(df["timestamp"])
+    levels = {"site_id": ["A", "B"], "sector": ["Residential"]}
+    train = pd.concat(xgb_script.FeatureChunkIter(files, levels, cutoff, chunksize=50).chunks())
+    test = pd.concat(xgb_script.FeatureChunkIter(files, levels, cutoff, chunksize=50, holdout=True).chunks())
+
+    assert (pd.to_datetime(train["timestamp"]) < cutoff).all()
+    assert (pd.to_datetime(test["timestamp"]) >= cutoff).all()
+    assert len(train) + len(test) == len(df)
+
+    booster = xgb_script.run_external_memory(partitions, chunksize=100, n_jobs=1, num_boost_round=5)
+    assert booster.num_boosted_rounds() == 5
+
+
+def test_update_keeps_the_training_hyperparameters(workdir):
+    import json
+
+    df = feature_panel(sites=("A",), days=20).drop(columns=["site_id", "sector"])
+    cut = df["timestamp"].iloc[-48]
+    xgb_script.run(df[df["timestamp"] < cut].copy())
+    model = xgb_script.update(df[df["timestamp"] >= cut].copy(), num_boost_round=7)
+
+    assert model.get_booster().num_boosted_rounds() == xgb_script.XGB_PARAMS["n_estimators"] + 7
+    train_param = json.loads(model.get_booster().save_config())["learner"]["gradient_booster"]["tree_train_param"]
+    assert float(train_param["eta"]) == pytest.approx(0.1)
+    assert int(train_param["max_depth"]) == 5
+    assert xgb_script.load_state()["last_timestamp"] == str(df["timestamp"].max())